@@ -165,6 +165,12 @@ _C.TRAIN.CHECKPOINT_CLEAR_NAME_PATTERN = ()  # ("backbone.",)
 # If True, use FP16 for activations
 _C.TRAIN.MIXED_PRECISION = False
 
+# Names of the submodules to freeze for training, e.g. ["resnet"] for the
+# backbone of the PD region model or ["s1", "s2", "s3", "s4", "s5"]. They are
+# left out of the optimizer, and a frozen prefix of the network runs without
+# autograd.
+_C.TRAIN.FROZEN_MODULES = []
+
 # ---------------------------------------------------------------------------- #
 # Augmentation options.
 # ---------------------------------------------------------------------------- #
@@ -251,6 +257,72 @@ _C.TEST.NUM_SPATIAL_CROPS = 3
 _C.TEST.CHECKPOINT_TYPE = "pytorch"
 # Path to saving prediction results file.
 _C.TEST.SAVE_RESULTS_PATH = ""
+
+# Post training int8 quantization for CPU testing, options include `dynamic`
+# (linear layers) and `static` (linear layers and the PD backbone). Empty
+# tests the float model.
+_C.TEST.QUANTIZE = ""
+
+# Number of val batches used to calibrate the static quantization.
+_C.TEST.QUANTIZE_CALIB_BATCHES = 10
+
+# If True, fold the BatchNorm layers into the preceding convolutions before
+# testing. The outputs are unchanged up to float rounding.
+_C.TEST.FUSE_CONV_BN = False
+
+# If True, the views of a video are tested from the center out and the video
+# stops being tested once the ensemble of its views is confident enough.
+_C.TEST.EARLY_EXIT = False
+
+# Confidence of the running ensemble, `margin` (difference of the two highest
+# class probabilities) or `posterior` (highest class probability).
+_C.TEST.EARLY_EXIT_CRITERION = "margin"
+
+# A video exits once its confidence reaches this threshold.
+_C.TEST.EARLY_EXIT_THRESHOLD = 0.8
+
+# Minimum number of views tested per video before it can exit.
+_C.TEST.EARLY_EXIT_MIN_VIEWS = 1
+
+# Number of bootstrap resamples of the test videos used to report confidence
+# intervals of the AUROC, AUPRC and accuracy of binary tests, logged on their
+# own "bootstrap:" line. 0 disables them; the PD configs turn them on.
+_C.TEST.BOOTSTRAP_SAMPLES = 0
+
+# Confidence level of the bootstrap intervals.
+_C.TEST.BOOTSTRAP_LEVEL = 0.95
+
+# If True, every resample keeps the numbers of positive and negative videos,
+# or subjects. A subject with any positive video is a positive subject.
+_C.TEST.BOOTSTRAP_STRATIFY = True
+
+# Path to a file with one `<video id> <subject>` line per test video. If set,
+# the subjects are resampled instead of the videos, so that the videos of a
+# subject stay together. If empty, the subjects are the `person` column of
+# SUBGROUP.MANIFEST when it is set. tools/compile_manifest.py writes both.
+_C.TEST.SUBJECTS_FILE = ""
+
+# -----------------------------------------------------------------------------
+# Binary metrics options
+# -----------------------------------------------------------------------------
+_C.BINARY_METRICS = CfgNode()
+
+# If True, log the AUROC, AUPRC, F1, sensitivity and specificity of the
+# positive (label > 0) class every validation epoch. The test metrics are
+# always computed; the PD configs turn the validation ones on.
+_C.BINARY_METRICS.ENABLE = False
+
+# Number of histogram bins the positive scores are counted in.
+_C.BINARY_METRICS.NUM_BINS = 1000
+
+# If True, keep every score and compute the exact curves instead of the
+# binned ones.
+_C.BINARY_METRICS.EXACT = False
+
+# Positive score above which a clip or video is predicted positive, for the
+# F1, sensitivity and specificity.
+_C.BINARY_METRICS.THRESHOLD = 0.5
+
 # -----------------------------------------------------------------------------
 # ResNet options
 # -----------------------------------------------------------------------------
@@ -390,7 +462,10 @@ _C.MODEL.FC_INIT_STD = 0.01
 # Activation layer for the output head.
 _C.MODEL.HEAD_ACT = "softmax"
 
-# Activation checkpointing enabled or not to save GPU memory.
+# Activation checkpointing enabled or not to save GPU memory. It covers the
+# MViT blocks, the ResStages of SlowFast and X3D, the TimeSformer blocks, and
+# the backbone stages and temporal / region attention of the PD region model.
+# The stages and blocks in TRAIN.FROZEN_MODULES are not checkpointed.
 _C.MODEL.ACT_CHECKPOINT = False
 
 # If True, detach the final fc layer from the network, by doing so, only the
@@ -509,6 +584,121 @@ _C.SLOWFAST.FUSION_CONV_CHANNEL_RATIO = 2
 _C.SLOWFAST.FUSION_KERNEL_SZ = 5
 
 
+# -----------------------------------------------------------------------------
+# PD region model options
+# -----------------------------------------------------------------------------
+_C.PD = CfgNode()
+
+# Features fed to the classifier, options include `video`, `region` and
+# `video+region`. If empty, the aggregated region token goes through cls_head.
+_C.PD.IMAGE_VARIANT = "video+region"
+
+# Spatio-temporal aggregation of the region features. Two entries out of
+# `temporal_pool`, `temporal_attention`, `region_pool` and `region_attention`,
+# applied in the given order.
+_C.PD.ST_CONFIG = ["temporal_attention", "region_attention"]
+
+# Dimension of a region feature after RoI align (layer3 channels x RoI size).
+_C.PD.FEATURE_SIZE = 9216
+
+# Output size of RoI align on the backbone feature maps.
+_C.PD.ROI_ALIGN_SIZE = [3, 3]
+
+# Number of facial regions per frame.
+_C.PD.NUM_REGIONS = 14
+
+# How the region features are computed. `roi` runs the backbone on the full
+# frames and RoI aligns the regions out of the layer3 feature maps. `crop`
+# crops the regions from the frames, resizes them to REGION_CROP_SIZE and only
+# runs the backbone on the crops, their layer3 maps being pooled to
+# ROI_ALIGN_SIZE. `crop` is not a drop-in replacement of `roi`: its features
+# diverge (cosine about 0.8 at 48 pixel crops), so it needs its own training.
+_C.PD.REGION_MODE = "roi"
+
+# Size in pixels of the region crops in the `crop` region mode. The backbone
+# cost is NUM_REGIONS * REGION_CROP_SIZE^2 instead of 224^2 pixels per frame:
+# only 1.56x cheaper at 48 pixels and 3.5x at 32 pixels with 14 regions, and
+# the attention head keeps the whole model saving lower.
+_C.PD.REGION_CROP_SIZE = 48
+
+# If True, merge the boxes of a region over every window of PD.TUBE_WINDOW
+# frames into one tube box, and compute one region feature per tube from the
+# temporally pooled window instead of one per frame. The head then sees
+# NUM_FRAMES / TUBE_WINDOW time steps.
+_C.PD.ROI_TUBE = False
+
+# Number of frames per RoI tube, 0 for one tube over the whole clip.
+_C.PD.TUBE_WINDOW = 0
+
+# If True, use max pooling in the pooled aggregations, otherwise avg pooling.
+_C.PD.USE_MAX_POOL = True
+
+# If True, cls_head is a MLP, otherwise a single linear layer.
+_C.PD.USE_MLP = True
+
+# If True, apply BatchNorm on the output logits.
+_C.PD.USE_BN = True
+
+# If True, apply softmax on the output logits.
+_C.PD.USE_SOFTMAX = True
+
+# If True, add a learnable positional embedding to the region tokens.
+_C.PD.USE_POS_EMBED = True
+
+# If True, add a learnable time embedding to the frame tokens.
+_C.PD.USE_TIME_EMBED = True
+
+# If True, the attention blocks use torch scaled_dot_product_attention instead
+# of materializing the attention matrix. It saves memory, but its outputs
+# differ from those of the default path by float rounding.
+_C.PD.USE_SDPA = False
+
+# If True, antialias the frames when resizing them to 256. The tensor Resize of
+# torchvision < 0.17, which the existing checkpoints were trained with, does
+# not.
+_C.PD.RESIZE_ANTIALIAS = False
+
+# If > 0, project the region features to this dimension before the
+# spatio-temporal aggregation. Must be divisible by the 3 attention heads.
+_C.PD.TOKEN_PROJ_DIM = 0
+
+# If False, the backbone keeps random weights, and neither
+# BACKBONE_CHECKPOINT nor the ImageNet weights are loaded, e.g. to benchmark
+# offline.
+_C.PD.BACKBONE_PRETRAINED = True
+
+# Path to the face recognition ResNet-50 weights used for the backbone. If
+# empty, ImageNet weights are used.
+_C.PD.BACKBONE_CHECKPOINT = (
+    "/home/andyz3/PD/FSPD/slowfast/configs/PD/flr_r50_vgg_face.pth"
+)
+
+
+# -----------------------------------------------------------------------------
+# Keypoint model options
+# -----------------------------------------------------------------------------
+_C.KPT = CfgNode()
+
+# Frame rate of the videos the keypoints were extracted from. The keypoint
+# clips cover the same frames as the RGB clips sampled at DATA.TARGET_FPS.
+_C.KPT.FPS = 20
+
+# Temporal encoder of the keypoint model, `conv` or `transformer`.
+_C.KPT.ARCH = "conv"
+
+# Width of the temporal encoder.
+_C.KPT.HIDDEN_DIM = 128
+
+# Number of temporal conv blocks or transformer layers.
+_C.KPT.NUM_LAYERS = 3
+
+# Temporal kernel size of the conv blocks.
+_C.KPT.KERNEL_SIZE = 3
+
+# Number of attention heads of the transformer layers.
+_C.KPT.NUM_HEADS = 4
+
+
 # -----------------------------------------------------------------------------
 # Data options
 # -----------------------------------------------------------------------------
@@ -517,6 +707,10 @@ _C.DATA = CfgNode()
 # The path to the data directory.
 _C.DATA.PATH_TO_DATA_DIR = ""
 
+# The path to the directory of the per video keypoint files (video<id>_kpts)
+# the facial regions are computed from.
+_C.DATA.PATH_TO_KPTS_DIR = "./data"
+
 # The separator used between path and label.
 _C.DATA.PATH_LABEL_SEPARATOR = " "
 
@@ -766,6 +960,232 @@ _C.BENCHMARK.LOG_PERIOD = 100
 # If True, shuffle dataloader for epoch during benchmark.
 _C.BENCHMARK.SHUFFLE = True
 
+# Number of timed iterations of the PD pipeline benchmark
+# (tools/benchmark_pipeline.py).
+_C.BENCHMARK.NUM_ITERS = 20
+
+# Number of untimed warm up iterations of the PD pipeline benchmark.
+_C.BENCHMARK.WARMUP_ITERS = 2
+
+# If True, the PD pipeline benchmark runs on random frames and boxes instead of
+# the train split, skipping the container open, decode and keypoint load
+# stages. The backbone then keeps random weights, as with
+# PD.BACKBONE_PRETRAINED False.
+_C.BENCHMARK.SYNTHETIC = False
+
+# Percentiles of the stage times reported by the PD pipeline benchmark.
+_C.BENCHMARK.PERCENTILES = [50, 90, 99]
+
+# Json file of the PD pipeline benchmark results, in OUTPUT_DIR.
+_C.BENCHMARK.OUTPUT_FILE = "pipeline_benchmark.json"
+
+# Train batch sizes of the PD model benchmark (tools/benchmark_models.py),
+# which also uses NUM_ITERS, WARMUP_ITERS and PERCENTILES. The models with
+# batch norm after pooling need at least 2 clips.
+_C.BENCHMARK.BATCH_SIZES = [2, 4]
+
+# Csv file of the PD model benchmark comparison table, in OUTPUT_DIR.
+_C.BENCHMARK.MODELS_FILE = "model_benchmark.csv"
+
+
+# ---------------------------------------------------------------------------- #
+# Profiler options
+# ---------------------------------------------------------------------------- #
+_C.PROFILER = CfgNode()
+
+# If True, profile a window of iterations with torch.profiler. The Chrome
+# traces and key averages tables are written to OUTPUT_DIR.
+_C.PROFILER.ENABLE = False
+
+# Phases to profile, among `train`, `val` and `test`.
+_C.PROFILER.PHASES = ["train", "val", "test"]
+
+# Epoch whose train and val iterations are profiled.
+_C.PROFILER.EPOCH = 0
+
+# Number of iterations skipped before the profiler warms up.
+_C.PROFILER.WAIT_ITERS = 5
+
+# Number of iterations the profiler warms up for, not recorded.
+_C.PROFILER.WARMUP_ITERS = 2
+
+# Number of recorded iterations.
+_C.PROFILER.ACTIVE_ITERS = 5
+
+# If True, record the input shapes of the ops.
+_C.PROFILER.RECORD_SHAPES = True
+
+# If True, record the memory allocated and freed by the ops.
+_C.PROFILER.PROFILE_MEMORY = True
+
+# If True, record the python stacks of the ops in the traces.
+_C.PROFILER.WITH_STACK = True
+
+# Column the key averages table is sorted by, e.g. `cpu_time_total`. The self
+# CUDA time if empty and on GPU, the self CPU time otherwise.
+_C.PROFILER.SORT_BY = ""
+
+# Number of rows of the key averages table.
+_C.PROFILER.ROW_LIMIT = 30
+
+
+# ---------------------------------------------------------------------------- #
+# Data loader monitor options
+# ---------------------------------------------------------------------------- #
+_C.LOADER_MONITOR = CfgNode()
+
+# If True, measure the data wait of the train iterations, the __getitem__
+# latency and RSS of every loader worker and the number of ready batches, and
+# report at the end of every epoch whether training is input-bound, with a
+# recommended DATA_LOADER.NUM_WORKERS and DATA_LOADER.PREFETCH_FACTOR.
+_C.LOADER_MONITOR.ENABLE = False
+
+# Fraction of the iteration time spent waiting for data above which training
+# is input-bound.
+_C.LOADER_MONITOR.INPUT_BOUND_RATIO = 0.1
+
+# Loading rate over step rate the recommended number of workers aims for.
+_C.LOADER_MONITOR.HEADROOM = 1.25
+
+# Percentiles of the data wait and __getitem__ latency reported.
+_C.LOADER_MONITOR.PERCENTILES = [50, 90, 99]
+
+# If True, time the train loader with every combination of AUTOTUNE_WORKERS
+# and AUTOTUNE_PREFETCH before training, and train with the cheapest one
+# loading at least AUTOTUNE_TOLERANCE of the best rate.
+_C.LOADER_MONITOR.AUTOTUNE = False
+
+# Numbers of workers tried by the auto-tune phase.
+_C.LOADER_MONITOR.AUTOTUNE_WORKERS = [2, 4, 8]
+
+# Prefetch factors tried by the auto-tune phase.
+_C.LOADER_MONITOR.AUTOTUNE_PREFETCH = [2, 4]
+
+# Number of timed batches of every setting tried, after the first one.
+_C.LOADER_MONITOR.AUTOTUNE_ITERS = 20
+
+# Fraction of the best loading rate that is good enough.
+_C.LOADER_MONITOR.AUTOTUNE_TOLERANCE = 0.95
+
+
+# ---------------------------------------------------------------------------- #
+# Inference export options
+# ---------------------------------------------------------------------------- #
+_C.EXPORT = CfgNode()
+
+# Path of the exported TorchScript model, relative to OUTPUT_DIR.
+_C.EXPORT.PATH = "pd_model.pt"
+
+# Batch size of the example clip the model is traced with.
+_C.EXPORT.BATCH_SIZE = 1
+
+# Number of forward passes to measure the steady state latency.
+_C.EXPORT.NUM_ITERS = 20
+
+
+# ---------------------------------------------------------------------------- #
+# Streaming inference options
+# ---------------------------------------------------------------------------- #
+_C.STREAM = CfgNode()
+
+# Number of sampled frames between the starts of two consecutive windows.
+# Windows are DATA.NUM_FRAMES frames sampled every DATA.SAMPLING_RATE frames.
+_C.STREAM.STRIDE = 2
+
+# Number of sampled frames decoded and run through the backbone at once.
+_C.STREAM.CHUNK_SIZE = 16
+
+# How the window scores are aggregated into a video score, `mean` or `max`.
+_C.STREAM.AGGREGATION = "mean"
+
+# Path to save the per window and video scores, relative to OUTPUT_DIR.
+# Empty to not save them.
+_C.STREAM.SAVE_RESULTS_PATH = ""
+
+
+# ---------------------------------------------------------------------------- #
+# Cascade inference options
+# ---------------------------------------------------------------------------- #
+_C.CASCADE = CfgNode()
+
+# Uncertainty band [low, high] of the screener positive score. Only the videos
+# the screener scores inside the band are run through the expensive model.
+_C.CASCADE.BAND = [0.2, 0.8]
+
+# How the scores of the escalated videos are merged: `replace` keeps the score
+# of the expensive model, `mean` averages the scores of both models.
+_C.CASCADE.MERGE = "replace"
+
+# Also run the expensive model on all the videos to compare the cascade with.
+_C.CASCADE.COMPARE_FULL = True
+
+# Path to save the per video scores of the cascade, relative to OUTPUT_DIR.
+# Empty to not save them.
+_C.CASCADE.SAVE_RESULTS_PATH = ""
+
+
+# ---------------------------------------------------------------------------- #
+# Knowledge distillation options
+# ---------------------------------------------------------------------------- #
+_C.DISTILL = CfgNode()
+
+# If True, train the model as a student of a frozen teacher model.
+_C.DISTILL.ENABLE = False
+
+# Path to the config file of the teacher model, e.g. the PD region model.
+_C.DISTILL.TEACHER_CFG = ""
+
+# Path to the teacher checkpoint. Empty to use the TEST.CHECKPOINT_FILE_PATH
+# of the teacher config.
+_C.DISTILL.TEACHER_CHECKPOINT = ""
+
+# Weight of the soft teacher loss, the hard label loss is weighted by
+# 1 - ALPHA.
+_C.DISTILL.ALPHA = 0.5
+
+# Softmax temperature of the teacher and student outputs in the soft loss.
+_C.DISTILL.TEMPERATURE = 4.0
+
+# Path to cache the teacher logits of every training clip, relative to
+# OUTPUT_DIR. The teacher runs on the first clip sampled from every video and
+# the cached logits are reused in the later epochs and runs. Empty to run the
+# teacher on every clip.
+_C.DISTILL.CACHE_PATH = ""
+
+# ---------------------------------------------------------------------------- #
+# Subgroup metrics options
+# ---------------------------------------------------------------------------- #
+_C.SUBGROUP = CfgNode()
+
+# Path to the video manifest compiled from the data sheet by
+# tools/compile_manifest.py, e.g. data/manifest.csv. If set, the test metrics
+# are also computed for the subgroups of the test videos. Empty disables them.
+_C.SUBGROUP.MANIFEST = ""
+
+# Manifest columns defining the subgroups, one subgroup per value, e.g.
+# `person`, `ood` (subjects without train videos), `severity` or `year`.
+_C.SUBGROUP.COLUMNS = ["ood", "person", "severity"]
+
+# ---------------------------------------------------------------------------- #
+# Results store options
+# ---------------------------------------------------------------------------- #
+_C.RESULTS_STORE = CfgNode()
+
+# If True, every train and test run appends a record of its config, dataset
+# manifest, epoch stats, final metrics and video predictions to the store,
+# instead of appending a line to experiments/results.txt. Requires pyarrow.
+_C.RESULTS_STORE.ENABLE = False
+
+# Path to the store directory, queried with tools/query_results.py.
+_C.RESULTS_STORE.PATH = "./experiments/results_store"
+
+# If True, test runs also record the prediction of every test video.
+_C.RESULTS_STORE.SAVE_PREDICTIONS = True
+
+# Number of part files of a table of the store above which they are merged
+# into one after a run is appended. 0 to never merge them.
+_C.RESULTS_STORE.MAX_PARTS = 64
+
 
 # ---------------------------------------------------------------------------- #
 # Common train/test data loader options
@@ -778,6 +1198,9 @@ _C.DATA_LOADER.NUM_WORKERS = 8
 # Load data to pinned host memory.
 _C.DATA_LOADER.PIN_MEMORY = True
 
+# Number of batches loaded in advance by each worker, if NUM_WORKERS > 0.
+_C.DATA_LOADER.PREFETCH_FACTOR = 2
+
 # Enable multi thread decoding.
 _C.DATA_LOADER.ENABLE_MULTI_THREAD_DECODE = False
 
@@ -9,7 +9,6 @@ import torch
 import torch.utils.data
 from torchvision import transforms
 from torchvision.utils import save_image
-import pickle
 
 import slowfast.utils.logging as logging
 from slowfast.utils.env import pathmgr
@@ -81,6 +80,12 @@ class Kinetics(torch.utils.data.Dataset):
         # video. For testing, NUM_ENSEMBLE_VIEWS clips are sampled from every
         # video. For every clip, NUM_SPATIAL_CROPS is cropped spatially from
         # the frames.
+        if self.mode in ["train", "val"]:
+            self._num_clips = 1
+        elif self.mode in ["test"]:
+            self._num_clips = (
+                cfg.TEST.NUM_ENSEMBLE_VIEWS * cfg.TEST.NUM_SPATIAL_CROPS
+            )
 
         logger.info("Constructing Kinetics {}...".format(mode))
         self._construct_loader()
@@ -163,12 +168,13 @@ class Kinetics(torch.utils.data.Dataset):
                     )
 
                 print("fetch_info: ", fetch_info)
-                self._path_to_videos.append(
-                    os.path.join(self.cfg.DATA.PATH_PREFIX, path)
-                )
-                self._labels.append(int(label))
-                self._spatial_temporal_idx.append(0)
-                self._video_meta[clip_idx] = {}
+                for idx in range(self._num_clips):
+                    self._path_to_videos.append(
+                        os.path.join(self.cfg.DATA.PATH_PREFIX, path)
+                    )
+                    self._labels.append(int(label))
+                    self._spatial_temporal_idx.append(idx)
+                    self._video_meta[clip_idx * self._num_clips + idx] = {}
 
             # self._path_to_videos.append(
             #     os.path.join(self.cfg.DATA.PATH_PREFIX, '/home/psriram2/SlowFast/data/video93_20fps_256.mp4')
@@ -300,22 +306,10 @@ class Kinetics(torch.utils.data.Dataset):
         # Try to decode and sample a clip from a video. If the video can not be
         # decoded, repeatly find a random video replacement that can be decoded.
         for i_try in range(self._num_retries):
-            video_container = None
             # print("index: ", index)
             # print("video path: ", self._path_to_videos[index])
 
-            try:
-                video_container = container.get_video_container(
-                    self._path_to_videos[index],
-                    self.cfg.DATA_LOADER.ENABLE_MULTI_THREAD_DECODE,
-                    self.cfg.DATA.DECODING_BACKEND,
-                )
-            except Exception as e:
-                logger.info(
-                    "Failed to load video from {} with error {}".format(
-                        self._path_to_videos[index], e
-                    )
-                )
+            video_container = self._open_video(index)
             # Select a random video if the current video was not able to access.
             if video_container is None:
                 logger.warning(
@@ -328,21 +322,6 @@ class Kinetics(torch.utils.data.Dataset):
                     index = random.randint(0, len(self._path_to_videos) - 1)
                 continue
 
-            frames_decoded, time_idx_decoded, bbox_index_decoded = (
-                [None] * num_decode,
-                [None] * num_decode,
-                [None] * num_decode
-            )
-
-            # for i in range(num_decode):
-            num_frames = [self.cfg.DATA.NUM_FRAMES]
-
-            sampling_rate = self.cfg.DATA.SAMPLING_RATE
-            sampling_rate = [sampling_rate]
-
-            # print("num_frames: ", num_frames)
-            # print("num_decode: ", num_decode)
-
             assert (
                 len(min_scale)
                 == len(max_scale)
@@ -350,37 +329,20 @@ class Kinetics(torch.utils.data.Dataset):
                 == num_decode
             )
 
-            target_fps = self.cfg.DATA.TARGET_FPS
-
-            # print("sampling_rate: ", sampling_rate)
-            # print("num_frames: ", num_frames)
             # print("temporal_sample_index: ", temporal_sample_index)
 
             # print("self._video_meta[index]: ", self._video_meta[index])
 
             # Decode video. Meta info is used to perform selective decoding.
-            frames, time_idx, tdiff, bbox_index = decoder.decode(
+            decoded = self._decode_video(
+                index,
                 video_container,
-                sampling_rate, # 8
-                num_frames,   # 8
                 temporal_sample_index,
-                self.cfg.TEST.NUM_ENSEMBLE_VIEWS,
-                video_meta=self._video_meta[index]
-                if len(self._video_meta) < 5e6
-                else {},  # do not cache on huge datasets
-                target_fps=target_fps,
-                backend=self.cfg.DATA.DECODING_BACKEND,
-                use_offset=self.cfg.DATA.USE_OFFSET_SAMPLING,
-                max_spatial_scale=min_scale[0]
+                min_scale[0]
                 if all(x == min_scale[0] for x in min_scale)
                 else 0,  # if self.mode in ["test"] else 0,
-                time_diff_prob=self.p_convert_dt
-                if self.mode in ["train"]
-                else 0.0,
-                temporally_rnd_clips=True,
-                min_delta=self.cfg.CONTRASTIVE.DELTA_CLIPS_MIN,
-                max_delta=self.cfg.CONTRASTIVE.DELTA_CLIPS_MAX,
             )
+            frames, time_idx, bbox_index = self._temporal_sample(decoded)
 
             frames_decoded = frames
             time_idx_decoded = time_idx
@@ -389,19 +351,6 @@ class Kinetics(torch.utils.data.Dataset):
             # print("frames_decoded.shape: ", frames_decoded[0].shape)
             # print("bbox_index_decoded: ", bbox_index_decoded)
 
-            if index not in self.kpts:
-                index_str = self._path_to_videos[index]
-                video_idx = index_str[40:-10] # ANDY, CHANGE THIS <--- 
-                # print("video idxxxxxx: ", video_idx)
-                with open(f"./data/video{video_idx}_kpts", 'rb') as handle:
-                    kpts = pickle.load(handle)
-                    self.kpts[index] = kpts
-
-
-            kpts = self.kpts[index]
-            bboxes = []
-
-            
 
             # try:
             #     dummy_var1 = bbox_index_decoded[0]
@@ -440,29 +389,9 @@ class Kinetics(torch.utils.data.Dataset):
                     index = random.randint(0, len(self._path_to_videos) - 1)
                 continue
 
-            for frame_num in bbox_index_decoded[0].cpu().detach().numpy():
-                frame_name = "frame" + str(frame_num)
-                vid_name = self._path_to_videos[index].split("/")[-1]
-                vid_name = vid_name[:-10] + ".mp4"
-                bounding_boxes = kpts[vid_name][frame_name]
-
-                
-                small_bboxes = []
-                for box in bounding_boxes:
-                    actual_pts = []
-                    x_pts = []
-                    y_pts = []
-                    for coord in box:
-                        # actual_pts.append([int(coord[0]), int(coord[1])])
-                        x_pts.append(int(coord[0]))
-                        y_pts.append(int(coord[1]))
-                    
-                    x_min, x_max = min(x_pts), max(x_pts)
-                    y_min, y_max = min(y_pts), max(y_pts)
-
-                    actual_pts = [[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]]
-                    small_bboxes.append(actual_pts)
-                bboxes.append(small_bboxes)
+            bboxes = self._get_region_boxes(
+                index, bbox_index_decoded[0].cpu().detach().numpy()
+            )
 
             num_aug = 1
             num_out = num_aug * num_decode
@@ -478,54 +407,17 @@ class Kinetics(torch.utils.data.Dataset):
             for i in range(num_decode):
                 for _ in range(num_aug):
                     idx += 1
-                    f_out[idx] = frames_decoded[i].clone()
                     time_idx_out[idx] = time_idx_decoded[i, :]
 
-                    f_out[idx] = f_out[idx].float()
-                    f_out[idx] = f_out[idx] / 255.0
-
-                    # print("f_out[idx].shape 0: ", f_out[idx].shape)
-                    # img_tensor = (f_out[idx].permute(0, 3, 1, 2))[0]
-                    # save_image(img_tensor, 'img_tensor.png')
-                    # 1/0
-
-                    # Perform color normalization.
-                    # f_out[idx] = utils.tensor_normalize(
-                    #     f_out[idx], self.cfg.DATA.MEAN, self.cfg.DATA.STD
-                    # )
-
-
-                    # T H W C -> C T H W.
-                    f_out[idx] = f_out[idx].permute(3, 0, 1, 2)
-
-                    relative_scales = None
-                    relative_aspect = None
-
-                    # print("f_out[idx].shape 1: ", f_out[idx].shape)
-
-                    f_out[idx] = utils.spatial_sampling(
-                        f_out[idx],
-                        spatial_idx=spatial_sample_index,
-                        min_scale=min_scale[i],
-                        max_scale=max_scale[i],
-                        crop_size=crop_size[i],
-                        random_horizontal_flip=self.cfg.DATA.RANDOM_FLIP,
-                        inverse_uniform_sampling=self.cfg.DATA.INV_UNIFORM_SAMPLE,
-                        aspect_ratio=relative_aspect,
-                        scale=relative_scales,
-                        motion_shift=self.cfg.DATA.TRAIN_JITTER_MOTION_SHIFT
-                        if self.mode in ["train"]
-                        else False,
-                    )
-
-
-                    # img_tensor = (f_out[idx].permute(1, 0, 2, 3))[0]
-                    # save_image(img_tensor, 'img_tensor.png')
-                    # 1/0
-
-                    # print("f_out[idx].shape 2: ", f_out[idx].shape)
+                    # print("f_out[idx].shape 0: ", frames_decoded[i].shape)
 
-                    f_out[idx] = utils.pack_pathway_output(self.cfg, f_out[idx])
+                    f_out[idx] = self._spatial_transform(
+                        frames_decoded[i],
+                        spatial_sample_index,
+                        min_scale[i],
+                        max_scale[i],
+                        crop_size[i],
+                    )
             frames = f_out[0] if num_out == 1 else f_out
             time_idx = np.array(time_idx_out)
             if num_aug > 1:
@@ -545,6 +437,208 @@ class Kinetics(torch.utils.data.Dataset):
                 )
             )
 
+    def _open_video(self, index):
+        """
+        Open the container of a video.
+        Args:
+            index (int): the video index.
+        Returns:
+            video_container (container): the container, None if the video
+                cannot be opened.
+        """
+        try:
+            return container.get_video_container(
+                self._path_to_videos[index],
+                self.cfg.DATA_LOADER.ENABLE_MULTI_THREAD_DECODE,
+                self.cfg.DATA.DECODING_BACKEND,
+            )
+        except Exception as e:
+            logger.info(
+                "Failed to load video from {} with error {}".format(
+                    self._path_to_videos[index], e
+                )
+            )
+            return None
+
+    def _decode_video(
+        self, index, video_container, temporal_sample_index, max_spatial_scale
+    ):
+        """
+        Decode the frames spanning a clip of a video, before its temporal
+        sampling.
+        Args:
+            index (int): the video index.
+            video_container (container): the container of the video.
+            temporal_sample_index (int): -1 for a random clip, else the index
+                of the clip among TEST.NUM_ENSEMBLE_VIEWS uniform ones.
+            max_spatial_scale (int): size of the shorter edge of the decoded
+                frames, 0 to keep the original size.
+        Returns:
+            decoded (tuple): the outputs of decoder.decode_frames, the decoded
+                frames being None if the video cannot be decoded.
+        """
+        return decoder.decode_frames(
+            video_container,
+            [self.cfg.DATA.SAMPLING_RATE],
+            [self.cfg.DATA.NUM_FRAMES],
+            temporal_sample_index,
+            self.cfg.TEST.NUM_ENSEMBLE_VIEWS,
+            video_meta=self._video_meta[index]
+            if len(self._video_meta) < 5e6
+            else {},  # do not cache on huge datasets
+            target_fps=self.cfg.DATA.TARGET_FPS,
+            backend=self.cfg.DATA.DECODING_BACKEND,
+            max_spatial_scale=max_spatial_scale,
+            use_offset=self.cfg.DATA.USE_OFFSET_SAMPLING,
+            min_delta=self.cfg.CONTRASTIVE.DELTA_CLIPS_MIN,
+            max_delta=self.cfg.CONTRASTIVE.DELTA_CLIPS_MAX,
+        )
+
+    def _temporal_sample(self, decoded):
+        """
+        Sample the frames of a clip out of its decoded frames.
+        Args:
+            decoded (tuple): the outputs of _decode_video.
+        Returns:
+            frames (list): the sampled frames, None if the video could not be
+                decoded.
+            time_idx (ndarray): start and end frame of the clip in the decoded
+                frames.
+            frame_nums (list): indices of the sampled frames in the video.
+        """
+        frames_decoded, fps, decode_all_video, start_end_delta_time = decoded
+        if frames_decoded is None:
+            return None, None, None
+        frames, frame_nums = decoder.sample_clips(
+            frames_decoded,
+            fps,
+            decode_all_video,
+            start_end_delta_time,
+            [self.cfg.DATA.SAMPLING_RATE],
+            [self.cfg.DATA.NUM_FRAMES],
+            self.cfg.DATA.TARGET_FPS,
+            time_diff_prob=self.p_convert_dt
+            if self.mode in ["train"]
+            else 0.0,
+        )
+        return frames, start_end_delta_time, frame_nums
+
+    def _spatial_transform(
+        self, frames, spatial_sample_index, min_scale, max_scale, crop_size
+    ):
+        """
+        Scale, crop and flip the sampled frames of a clip into the input of
+        the model.
+        Args:
+            frames (tensor): sampled frames of the clip. The dimension is
+                `num frames` x `height` x `width` x `channel`.
+            spatial_sample_index (int): -1 for a random crop, else 0, 1 or 2
+                for the left / top, center or right / bottom crop.
+            min_scale (int): the minimal size of scaling.
+            max_scale (int): the maximal size of scaling.
+            crop_size (int): the size of the crop.
+        Returns:
+            frames (list): the clip of every pathway. The dimension is
+                `channel` x `num frames` x `height` x `width`.
+        """
+        return utils.transform_clip(
+            self.cfg,
+            frames,
+            spatial_sample_index,
+            min_scale,
+            max_scale,
+            crop_size,
+            motion_shift=self.cfg.DATA.TRAIN_JITTER_MOTION_SHIFT
+            if self.mode in ["train"]
+            else False,
+        )
+
+    def _get_kpts(self, index):
+        """
+        Load the keypoints of a video, cached per video as the test views of
+        a video share them.
+        Args:
+            index (int): the video index.
+        Returns:
+            kpts (dict): the region points of every frame of the video.
+        """
+        path_to_video = self._path_to_videos[index]
+        if path_to_video not in self.kpts:
+            self.kpts[path_to_video] = utils.load_video_kpts(
+                path_to_video, self.cfg.DATA.PATH_TO_KPTS_DIR
+            )
+        return self.kpts[path_to_video]
+
+    def _get_region_boxes(self, index, frame_nums):
+        """
+        Load the face region boxes of the given frames of a video from its
+        keypoints file.
+        Args:
+            index (int): the video index.
+            frame_nums (list): indices of the frames in the video.
+        Returns:
+            bboxes (list): for every frame, the corners (top left, top right,
+                bottom right, bottom left) of every region.
+        """
+        return utils.region_boxes(self._get_kpts(index), frame_nums)
+
+    def iter_video(self, index, chunk_size):
+        """
+        Decode a whole video sequentially and yield it in chunks of frames
+        sampled every `SAMPLING_RATE` frames at `TARGET_FPS`, transformed like
+        the center view of a test clip. Only one chunk is kept in memory, so
+        videos of any length can be streamed.
+        Args:
+            index (int): the video index.
+            chunk_size (int): number of sampled frames per chunk.
+        Yields:
+            frames (tensor): sampled frames of shape
+                `channel` x `num frames` x `height` x `width`, with at most
+                chunk_size frames.
+            bboxes (tensor): region corners of the frames, of shape
+                `num frames` x `num regions` x 4 x 2.
+            frame_nums (list): indices of the frames in the video.
+        """
+        video_container = container.get_video_container(
+            self._path_to_videos[index],
+            self.cfg.DATA_LOADER.ENABLE_MULTI_THREAD_DECODE,
+            "pyav",
+        )
+        stream = video_container.streams.video[0]
+        step = (
+            self.cfg.DATA.SAMPLING_RATE
+            * float(stream.average_rate)
+            / self.cfg.DATA.TARGET_FPS
+        )
+        scale = self.cfg.DATA.TRAIN_JITTER_SCALES[0]
+
+        def _to_chunk(frames, frame_nums):
+            frames = torch.as_tensor(np.stack(frames)).float() / 255.0
+            # T H W C -> C T H W.
+            frames = utils.spatial_sampling(
+                frames.permute(3, 0, 1, 2),
+                spatial_idx=1,
+                min_scale=scale,
+                max_scale=scale,
+                crop_size=self.cfg.DATA.TEST_CROP_SIZE,
+            )
+            bboxes = torch.Tensor(self._get_region_boxes(index, frame_nums))
+            return frames, bboxes, frame_nums
+
+        frames, frame_nums, next_frame = [], [], 0.0
+        for frame_num, frame in enumerate(video_container.decode(stream)):
+            if frame_num < next_frame:
+                continue
+            next_frame += step
+            frames.append(frame.to_ndarray(format="rgb24"))
+            frame_nums.append(frame_num)
+            if len(frames) == chunk_size:
+                yield _to_chunk(frames, frame_nums)
+                frames, frame_nums = [], []
+        video_container.close()
+        if len(frames) > 0:
+            yield _to_chunk(frames, frame_nums)
+
     def _frame_to_list_img(self, frames):
         img_list = [
             transforms.ToPILImage()(frames[i]) for i in range(frames.size(0))
@@ -4,7 +4,11 @@
 """Data loader."""
 
 import itertools
+import multiprocessing as mp
 import numpy as np
+import os
+import psutil
+import time
 from functools import partial
 from typing import List
 import torch
@@ -84,6 +88,85 @@ def detection_collate(batch):
     return inputs, labels, video_idx, time, collated_extra_data
 
 
+# Upper edges (s) of the bins of the __getitem__ latency histograms of
+# TimedDataset, 20 bins per decade from 10us to 100s, the last bin counting the
+# longer ones.
+LATENCY_EDGES = np.logspace(-5, 2, 141)
+# Columns of the row of a worker in the stats of TimedDataset: the latency
+# histogram, then the total latency (s), the last RSS and the max RSS (bytes).
+LATENCY_SUM = len(LATENCY_EDGES) + 1
+RSS = LATENCY_SUM + 1
+MAX_RSS = RSS + 1
+STATS_SIZE = MAX_RSS + 1
+
+
+class TimedDataset(torch.utils.data.Dataset):
+    """
+    Wrap a dataset to record the `__getitem__` latency distribution and the
+    RSS of every loader worker, in memory shared with the main process. The
+    other attributes are the ones of the wrapped dataset.
+    """
+
+    def __init__(self, dataset, num_workers):
+        """
+        Args:
+            dataset (torch.utils.data.Dataset): the dataset to time.
+            num_workers (int): number of loader workers, 0 to load in the
+                main process.
+        """
+        self.dataset = dataset
+        self.stats = mp.RawArray("d", max(num_workers, 1) * STATS_SIZE)
+        self._process = None
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getattr__(self, name):
+        # Only called for the attributes missing from the wrapper.
+        if "dataset" not in self.__dict__:
+            raise AttributeError(name)
+        return getattr(self.dataset, name)
+
+    def __getitem__(self, index):
+        start = time.perf_counter()
+        item = self.dataset[index]
+        latency = time.perf_counter() - start
+        worker_info = torch.utils.data.get_worker_info()
+        row = self.worker_stats()[0 if worker_info is None else worker_info.id]
+        row[np.searchsorted(LATENCY_EDGES, latency)] += 1
+        row[LATENCY_SUM] += latency
+        # The process of the workers is not the one of the wrapper.
+        if self._process is None or self._process.pid != os.getpid():
+            self._process = psutil.Process()
+        row[RSS] = self._process.memory_info().rss
+        row[MAX_RSS] = max(row[MAX_RSS], row[RSS])
+        return item
+
+    def worker_stats(self):
+        """
+        Returns:
+            stats (ndarray): view of the stats, one row of STATS_SIZE columns
+                per worker.
+        """
+        return np.frombuffer(self.stats, dtype=np.float64).reshape(
+            -1, STATS_SIZE
+        )
+
+
+def _worker_kwargs(cfg):
+    """
+    Worker arguments of the data loaders. The prefetch factor is only given
+    with workers, as older PyTorch versions require.
+    """
+    kwargs = {
+        "num_workers": cfg.DATA_LOADER.NUM_WORKERS,
+        "pin_memory": cfg.DATA_LOADER.PIN_MEMORY,
+    }
+    if cfg.DATA_LOADER.NUM_WORKERS > 0:
+        kwargs["prefetch_factor"] = cfg.DATA_LOADER.PREFETCH_FACTOR
+    return kwargs
+
+
 def construct_loader(cfg, split, is_precise_bn=False):
     """
     Constructs the data loader for the given dataset.
@@ -112,13 +195,19 @@ def construct_loader(cfg, split, is_precise_bn=False):
 
     # Construct the dataset
     dataset = build_dataset(dataset_name, cfg, split)
+    if (
+        cfg.LOADER_MONITOR.ENABLE
+        and split in ["train"]
+        and not is_precise_bn
+        and not isinstance(dataset, torch.utils.data.IterableDataset)
+    ):
+        dataset = TimedDataset(dataset, cfg.DATA_LOADER.NUM_WORKERS)
 
     if isinstance(dataset, torch.utils.data.IterableDataset):
         loader = torch.utils.data.DataLoader(
             dataset,
             batch_size=batch_size,
-            num_workers=cfg.DATA_LOADER.NUM_WORKERS,
-            pin_memory=cfg.DATA_LOADER.PIN_MEMORY,
+            **_worker_kwargs(cfg),
             drop_last=drop_last,
             collate_fn=detection_collate if cfg.DETECTION.ENABLE else None,
             worker_init_fn=utils.loader_worker_init_fn(dataset),
@@ -138,8 +227,7 @@ def construct_loader(cfg, split, is_precise_bn=False):
             loader = torch.utils.data.DataLoader(
                 dataset,
                 batch_sampler=batch_sampler,
-                num_workers=cfg.DATA_LOADER.NUM_WORKERS,
-                pin_memory=cfg.DATA_LOADER.PIN_MEMORY,
+                **_worker_kwargs(cfg),
                 worker_init_fn=utils.loader_worker_init_fn(dataset),
             )
         else:
@@ -160,8 +248,7 @@ def construct_loader(cfg, split, is_precise_bn=False):
                 batch_size=batch_size,
                 shuffle=(False if sampler else shuffle),
                 sampler=sampler,
-                num_workers=cfg.DATA_LOADER.NUM_WORKERS,
-                pin_memory=cfg.DATA_LOADER.PIN_MEMORY,
+                **_worker_kwargs(cfg),
                 drop_last=drop_last,
                 collate_fn=collate_func,
                 worker_init_fn=utils.loader_worker_init_fn(dataset),
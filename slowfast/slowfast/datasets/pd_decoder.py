@@ -429,6 +429,64 @@ def decode(
 
         # print("ind_clips: ", ind_clips)
         # 1/0
+    frames_decoded, fps, decode_all_video, start_end_delta_time = (
+        decode_frames(
+            container,
+            sampling_rate,
+            num_frames,
+            clip_idx,
+            num_clips_uniform,
+            video_meta,
+            target_fps,
+            backend,
+            max_spatial_scale,
+            use_offset=use_offset,
+            min_delta=min_delta,
+            max_delta=max_delta,
+        )
+    )
+    if frames_decoded is None:
+        return None, None, None, None
+    frames_out, index = sample_clips(
+        frames_decoded,
+        fps,
+        decode_all_video,
+        start_end_delta_time,
+        sampling_rate,
+        num_frames,
+        target_fps,
+        time_diff_prob=time_diff_prob,
+        gaussian_prob=gaussian_prob,
+    )
+    return frames_out, start_end_delta_time, [None] * num_decode, index
+
+
+def decode_frames(
+    container,
+    sampling_rate,
+    num_frames,
+    clip_idx=-1,
+    num_clips_uniform=10,
+    video_meta=None,
+    target_fps=30,
+    backend="pyav",
+    max_spatial_scale=0,
+    use_offset=False,
+    min_delta=-math.inf,
+    max_delta=math.inf,
+):
+    """
+    Decode the frames spanning the clips of a video, the first stage of
+    decode. The arguments are the ones of decode.
+    Returns:
+        frames_decoded (list): decoded frames of every clip, or of the whole
+            video, None if the video could not be decoded.
+        fps (float): frame rate of the video.
+        decode_all_video (bool): whether the whole video was decoded.
+        start_end_delta_time (ndarray): start and end frame of every clip in
+            the decoded frames, None with the pyav backend.
+    """
+    start_end_delta_time = None
     try:
         if backend == "pyav":
             assert min_delta == -math.inf and max_delta == math.inf, \
@@ -476,6 +534,37 @@ def decode(
 
     if not isinstance(frames_decoded, list):
         frames_decoded = [frames_decoded]
+    return frames_decoded, fps, decode_all_video, start_end_delta_time
+
+
+def sample_clips(
+    frames_decoded,
+    fps,
+    decode_all_video,
+    start_end_delta_time,
+    sampling_rate,
+    num_frames,
+    target_fps=30,
+    time_diff_prob=0.0,
+    gaussian_prob=0.0,
+):
+    """
+    Temporally sample the clips out of the decoded frames, the second stage
+    of decode.
+    Args:
+        frames_decoded (list): decoded frames, as returned by decode_frames.
+        fps (float): frame rate of the video.
+        decode_all_video (bool): whether the whole video was decoded.
+        start_end_delta_time (ndarray): start and end frame of every clip in
+            the decoded frames, used if the whole video was decoded.
+        sampling_rate (list of ints): frame sampling rate of every clip.
+        num_frames (list of ints): number of frames to sample of every clip.
+        target_fps (int): frame rate the sampling rate is given at.
+    Returns:
+        frames_out (list): sampled frames of every clip.
+        index (list): indices of the sampled frames in the decoded frames.
+    """
+    num_decode = len(num_frames)
     num_decoded = len(frames_decoded)
     clip_sizes = [
         np.maximum(
@@ -558,4 +647,4 @@ def decode(
     # print("time_diff_aug: ", time_diff_aug)
     # print("index: ", index)
     # print("called rn")
-    return frames_out, start_end_delta_time, time_diff_aug, index
+    return frames_out, index
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+
+import numpy as np
+import torch
+
+import slowfast.utils.logging as logging
+
+from . import pd_decoder as decoder
+from .build import DATASET_REGISTRY
+from .kinetics import Kinetics
+
+logger = logging.get_logger(__name__)
+
+
+@DATASET_REGISTRY.register()
+class Pdkeypoints(Kinetics):
+    """
+    PD keypoint loader. Reads the same split csv files as the Kinetics loader
+    but never decodes the videos: clips are sampled from the keypoint files
+    only, over the same frames as the RGB clips, and every frame is described
+    by the points of its facial regions. For testing, the NUM_ENSEMBLE_VIEWS
+    temporal clips are sampled like for the RGB clips, the spatial crops of a
+    clip being identical.
+    """
+
+    def __init__(self, cfg, mode, num_retries=100):
+        """
+        Args:
+            cfg (CfgNode): configs.
+            mode (string): Options includes `train`, `val`, or `test` mode.
+            num_retries (int): unused, the keypoint files are read directly.
+        """
+        super(Pdkeypoints, self).__init__(cfg, mode, num_retries)
+        self._points = {}
+        # Number of frames of the keypoint sequences spanned by a clip.
+        self._clip_size = max(
+            1.0,
+            np.ceil(
+                cfg.DATA.SAMPLING_RATE
+                * (cfg.DATA.NUM_FRAMES - 1)
+                / cfg.DATA.TARGET_FPS
+                * cfg.KPT.FPS
+            ),
+        )
+
+    def _sample_frame_nums(self, index, num_video_frames):
+        """
+        Sample the indices of the frames of a clip, like the decoder does for
+        the RGB clips.
+        """
+        if self.mode in ["train", "val"]:
+            clip_idx = -1
+        else:
+            clip_idx = (
+                self._spatial_temporal_idx[index]
+                // self.cfg.TEST.NUM_SPATIAL_CROPS
+            )
+        start_idx, end_idx, _ = decoder.get_start_end_idx(
+            num_video_frames,
+            self._clip_size,
+            clip_idx,
+            self.cfg.TEST.NUM_ENSEMBLE_VIEWS,
+            use_offset=self.cfg.DATA.USE_OFFSET_SAMPLING,
+        )
+        frame_nums = torch.linspace(
+            start_idx, end_idx, self.cfg.DATA.NUM_FRAMES
+        )
+        return torch.clamp(frame_nums, 0, num_video_frames - 1).long()
+
+    def _get_points(self, index):
+        """
+        Summarize the points of every region of every frame of a video by the
+        region corners and center, cached per video.
+        Args:
+            index (int): the video index.
+        Returns:
+            points (ndarray): array of shape (num_video_frames, num_regions,
+                3, 2), the top left and bottom right corners and the mean of
+                the points of every region.
+        """
+        path_to_video = self._path_to_videos[index]
+        if path_to_video not in self._points:
+            kpts = self._get_kpts(index)
+            points = np.zeros(
+                (len(kpts), self.cfg.PD.NUM_REGIONS, 3, 2), dtype=np.float32
+            )
+            for frame_num in range(len(kpts)):
+                for i, region in enumerate(kpts["frame" + str(frame_num)]):
+                    region = np.asarray(region, dtype=np.float32)
+                    points[frame_num, i] = (
+                        region.min(axis=0),
+                        region.max(axis=0),
+                        region.mean(axis=0),
+                    )
+            self._points[path_to_video] = points
+        return self._points[path_to_video]
+
+    def __getitem__(self, index):
+        """
+        Given the video index, return the keypoints of a clip, the label, the
+        video index, the frame indices, an empty meta and the region boxes.
+        Returns:
+            points (list): a single tensor of shape
+                (num_frames, num_regions, 3, 2) with, for every region, its
+                top left and bottom right corners and the mean of its points,
+                in the 256 pixel frame.
+            label (int): the label of the current video.
+            index (int): the video index.
+            frame_nums (ndarray): indices of the clip frames in the video.
+            meta (dict): empty.
+            bboxes (tensor): region corners of shape
+                (num_frames, num_regions, 4, 2), as for the RGB clips.
+        """
+        points = self._get_points(index)
+        frame_nums = self._sample_frame_nums(index, len(points))
+        points = torch.from_numpy(points[frame_nums.numpy()])
+
+        top_left, bottom_right = points[:, :, 0], points[:, :, 1]
+        top_right = torch.stack((bottom_right[..., 0], top_left[..., 1]), -1)
+        bottom_left = torch.stack((top_left[..., 0], bottom_right[..., 1]), -1)
+        # Integer corners, like the boxes of the RGB clips.
+        bboxes = torch.stack(
+            (top_left, top_right, bottom_right, bottom_left), dim=2
+        ).trunc()
+
+        label = self._labels[index]
+        if self.cfg.MODEL.NUM_CLASSES == 2 and label > 0:
+            label = 1
+        return [points], label, index, frame_nums.numpy(), {}, bboxes
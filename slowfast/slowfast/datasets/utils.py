@@ -3,6 +3,7 @@
 import logging
 import numpy as np
 import os
+import pickle
 import random
 import time
 from collections import defaultdict
@@ -295,6 +296,100 @@ def tensor_normalize(tensor, mean, std, func=None):
     return tensor
 
 
+def load_video_kpts(path_to_video, kpts_dir):
+    """
+    Load the per frame keypoints of a video, extracted offline into a
+    `video<id>_kpts` pickle file. The video `.../video<id>_final.mp4` has the
+    keypoints `video<id>.mp4` of the file `video<id>_kpts`.
+    Args:
+        path_to_video (str): path to the video, as listed in the split csv.
+        kpts_dir (str): directory of the keypoint files.
+    Returns:
+        kpts (dict): for every `frame<frame index>` of the video, the list of
+            the points (x, y) of every facial region, in the 256 pixel frame.
+    """
+    # Drop the 10 character suffix of the video name, e.g. `_final.mp4`.
+    name = os.path.basename(path_to_video)[:-10]
+    path_to_kpts = os.path.join(kpts_dir, "{}_kpts".format(name))
+    with pathmgr.open(path_to_kpts, "rb") as f:
+        kpts = pickle.load(f)
+    return kpts[name + ".mp4"]
+
+
+def region_boxes(kpts, frame_nums):
+    """
+    Build the region boxes of the given frames of a video from its keypoints,
+    the smallest boxes containing the points of every region.
+    Args:
+        kpts (dict): the region points of every frame, as returned by
+            load_video_kpts.
+        frame_nums (list): indices of the frames in the video.
+    Returns:
+        bboxes (list): for every frame, the corners (top left, top right,
+            bottom right, bottom left) of every region.
+    """
+    bboxes = []
+    for frame_num in frame_nums:
+        small_bboxes = []
+        for box in kpts["frame" + str(frame_num)]:
+            x_pts = [int(coord[0]) for coord in box]
+            y_pts = [int(coord[1]) for coord in box]
+            x_min, x_max = min(x_pts), max(x_pts)
+            y_min, y_max = min(y_pts), max(y_pts)
+            small_bboxes.append(
+                [
+                    [x_min, y_min],
+                    [x_max, y_min],
+                    [x_max, y_max],
+                    [x_min, y_max],
+                ]
+            )
+        bboxes.append(small_bboxes)
+    return bboxes
+
+
+def transform_clip(
+    cfg,
+    frames,
+    spatial_idx,
+    min_scale,
+    max_scale,
+    crop_size,
+    motion_shift=False,
+):
+    """
+    Turn the decoded frames of a clip into the input of the model: scale them
+    to [0, 1], spatially sample them and pack them into pathways.
+    Args:
+        cfg (CfgNode): configs. Details can be found in
+            slowfast/config/defaults.py
+        frames (tensor): decoded frames of the clip. The dimension is
+            `num frames` x `height` x `width` x `channel`.
+        spatial_idx (int): spatial sampling index, see spatial_sampling.
+        min_scale (int): the minimal size of scaling.
+        max_scale (int): the maximal size of scaling.
+        crop_size (int): the size of height and width used to crop the
+            frames.
+        motion_shift (bool): Whether to apply motion shift for resizing.
+    Returns:
+        frames (list): the clip of every pathway. The dimension is
+            `channel` x `num frames` x `height` x `width`.
+    """
+    frames = frames.float() / 255.0
+    # T H W C -> C T H W.
+    frames = spatial_sampling(
+        frames.permute(3, 0, 1, 2),
+        spatial_idx=spatial_idx,
+        min_scale=min_scale,
+        max_scale=max_scale,
+        crop_size=crop_size,
+        random_horizontal_flip=cfg.DATA.RANDOM_FLIP,
+        inverse_uniform_sampling=cfg.DATA.INV_UNIFORM_SAMPLE,
+        motion_shift=motion_shift,
+    )
+    return pack_pathway_output(cfg, frames)
+
+
 def get_random_sampling_rate(long_cycle_sampling_rate, sampling_rate):
     """
     When multigrid training uses a fewer number of frames, we randomly
@@ -307,6 +402,30 @@ def get_random_sampling_rate(long_cycle_sampling_rate, sampling_rate):
         return sampling_rate
 
 
+def get_view_order(num_ensemble_views, num_spatial_crops):
+    """
+    Order the test views of a video from the most to the least informative:
+    the center crops first, each from the temporal center of the video out,
+    then the side crops in the same temporal order.
+    Args:
+        num_ensemble_views (int): number of temporal clips per video.
+        num_spatial_crops (int): number of spatial crops per clip.
+    Returns:
+        order (list): spatial temporal indices of the views, a view with
+            temporal index t and spatial index s having the index
+            t * num_spatial_crops + s.
+    """
+    temporal = sorted(
+        range(num_ensemble_views),
+        key=lambda t: abs(t - (num_ensemble_views - 1) / 2.0),
+    )
+    spatial = sorted(
+        range(num_spatial_crops),
+        key=lambda s: abs(s - (num_spatial_crops - 1) / 2.0),
+    )
+    return [t * num_spatial_crops + s for s in spatial for t in temporal]
+
+
 def revert_tensor_normalize(tensor, mean, std):
     """
     Revert normalization for a given tensor by multiplying by the std and adding the mean.
@@ -4,6 +4,7 @@
 from .build import MODEL_REGISTRY, build_model  # noqa
 from .contrastive import ContrastiveModel  # noqa
 from .custom_video_model_builder import *  # noqa
+from .keypoint_model import KeypointModel  # noqa
 from .video_model_builder import ResNet, SlowFast  # noqa
 
 try:
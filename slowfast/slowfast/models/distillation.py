@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+
+"""Knowledge distillation from a frozen teacher model."""
+
+import os
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+import slowfast.utils.checkpoint as cu
+import slowfast.utils.distributed as du
+import slowfast.utils.logging as logging
+from slowfast.config.defaults import get_cfg
+from slowfast.utils.binary_metrics import outputs_probabilities
+from slowfast.utils.env import pathmgr
+
+from .build import build_model
+
+logger = logging.get_logger(__name__)
+
+
+def to_logits(outputs, is_prob):
+    """
+    Logits of the model outputs, up to a constant per sample if the outputs
+    are probabilities.
+    """
+    if is_prob:
+        return torch.log(outputs.float().clamp(min=1e-12))
+    return outputs.float()
+
+
+class DistillationLoss(nn.Module):
+    """
+    Weighted sum of the KL divergence between the temperature scaled teacher
+    and student distributions, and of the loss on the hard labels.
+    """
+
+    def __init__(self, hard_loss_fun, alpha, temperature, student_probs):
+        """
+        Args:
+            hard_loss_fun (nn.Module): loss on the labels.
+            alpha (float): weight of the soft loss, the hard loss is weighted
+                by 1 - alpha.
+            temperature (float): softmax temperature of the soft loss.
+            student_probs (bool): whether the student outputs probabilities.
+        """
+        super(DistillationLoss, self).__init__()
+        self.hard_loss_fun = hard_loss_fun
+        self.alpha = alpha
+        self.temperature = temperature
+        self.student_probs = student_probs
+
+    def forward(self, preds, teacher_logits, labels):
+        logits = to_logits(preds, self.student_probs)
+        # Scaled by T^2 to keep the gradient magnitude of the soft loss
+        # independent of the temperature.
+        soft_loss = F.kl_div(
+            F.log_softmax(logits / self.temperature, dim=1),
+            F.softmax(teacher_logits / self.temperature, dim=1),
+            reduction="batchmean",
+        ) * (self.temperature ** 2)
+        hard_loss = self.hard_loss_fun(preds, labels)
+        return self.alpha * soft_loss + (1.0 - self.alpha) * hard_loss
+
+
+class Teacher:
+    """
+    Frozen teacher model giving the logits of the training clips. The teacher
+    runs on the clips of the student, temporally resampled to its number of
+    frames. With DISTILL.CACHE_PATH, the logits of every training clip are
+    cached by dataset index: the teacher only runs on the clips missing from
+    the cache, and is not even built once the cache is complete.
+    """
+
+    def __init__(self, cfg, num_clips):
+        """
+        Args:
+            cfg (CfgNode): configs of the student, with the DISTILL options.
+            num_clips (int): number of clips of the training dataset.
+        """
+        assert cfg.DISTILL.TEACHER_CFG != "", "Set DISTILL.TEACHER_CFG."
+        self.cfg = get_cfg()
+        self.cfg.merge_from_file(cfg.DISTILL.TEACHER_CFG)
+        self.cfg.NUM_GPUS = min(cfg.NUM_GPUS, 1)
+        assert self.cfg.MODEL.NUM_CLASSES == cfg.MODEL.NUM_CLASSES
+        self.checkpoint = (
+            cfg.DISTILL.TEACHER_CHECKPOINT
+            or self.cfg.TEST.CHECKPOINT_FILE_PATH
+        )
+        assert self.checkpoint != "", "Set DISTILL.TEACHER_CHECKPOINT."
+        self.model = None
+        self.num_shards = cfg.NUM_GPUS * cfg.NUM_SHARDS
+
+        self.cache_path = None
+        if cfg.DISTILL.CACHE_PATH != "":
+            assert (
+                not cfg.MIXUP.ENABLE
+            ), "The teacher logits of mixed clips can not be cached."
+            self.cache_path = os.path.join(
+                cfg.OUTPUT_DIR, cfg.DISTILL.CACHE_PATH
+            )
+            self.logits = torch.zeros(num_clips, cfg.MODEL.NUM_CLASSES)
+            self.cached = torch.zeros(num_clips, dtype=torch.bool)
+            if pathmgr.exists(self.cache_path):
+                with pathmgr.open(self.cache_path, "rb") as f:
+                    cache = torch.load(f, map_location="cpu")
+                assert (
+                    cache["logits"].shape == self.logits.shape
+                ), "The teacher cache does not match the training dataset."
+                self.logits, self.cached = cache["logits"], cache["cached"]
+                logger.info(
+                    "Loaded the teacher logits of {}/{} clips from {}".format(
+                        int(self.cached.sum()), num_clips, self.cache_path
+                    )
+                )
+            self.dirty = False
+
+    def build(self):
+        """
+        Build the frozen teacher model and load its checkpoint.
+        """
+        logger.info("Build the teacher from {}".format(self.checkpoint))
+        model = build_model(self.cfg)
+        cu.load_checkpoint(
+            self.checkpoint,
+            model,
+            False,
+            None,
+            inflation=False,
+            convert_from_caffe2=self.cfg.TEST.CHECKPOINT_TYPE == "caffe2",
+        )
+        for param in model.parameters():
+            param.requires_grad_(False)
+        self.model = model.eval()
+
+    def teacher_inputs(self, inputs, bboxes):
+        """
+        Resample the student clips to the frames and pathways of the teacher.
+        Args:
+            inputs (list): student pathways of shape (B, C, T, H, W).
+            bboxes (tensor): region boxes of shape (B, T, num_regions, 4, 2).
+        """
+        frames = max(inputs, key=lambda x: x.shape[2])
+        num_frames = self.cfg.DATA.NUM_FRAMES
+        if frames.shape[2] != num_frames:
+            index = torch.linspace(0, frames.shape[2] - 1, num_frames)
+            index = index.round().long()
+            frames = frames[:, :, index]
+            bboxes = bboxes[:, index]
+        if self.cfg.MODEL.ARCH in self.cfg.MODEL.MULTI_PATHWAY_ARCH:
+            index = torch.linspace(
+                0, num_frames - 1, num_frames // self.cfg.SLOWFAST.ALPHA
+            ).long()
+            return [frames[:, :, index], frames], bboxes
+        return [frames], bboxes
+
+    @torch.no_grad()
+    def run(self, inputs, bboxes):
+        """
+        Run the teacher on a batch of student clips.
+        """
+        if self.model is None:
+            self.build()
+        outputs = self.model(*self.teacher_inputs(inputs, bboxes))
+        return to_logits(outputs, outputs_probabilities(self.cfg, False))
+
+    @torch.no_grad()
+    def __call__(self, inputs, bboxes, index):
+        """
+        Args:
+            inputs (list): student pathways of shape (B, C, T, H, W).
+            bboxes (tensor): region boxes of shape (B, T, num_regions, 4, 2).
+            index (tensor): dataset indices of the clips.
+        Returns:
+            logits (tensor): teacher logits of shape (B, num_classes), on the
+                device of the inputs.
+        """
+        device = inputs[0].device
+        if self.cache_path is None:
+            return self.run(inputs, bboxes)
+
+        index = index.cpu()
+        missing = ~self.cached[index]
+        if missing.any():
+            rows = missing.nonzero().flatten()
+            logits = self.run(
+                [x[rows.to(device)] for x in inputs], bboxes[rows.to(device)]
+            )
+            self.logits[index[rows]] = logits.cpu()
+            self.cached[index[rows]] = True
+            self.dirty = True
+        if self.num_shards > 1:
+            # Keep the caches of all the processes identical.
+            gathered_index, gathered_logits = du.all_gather(
+                [index.to(device), self.logits[index].to(device)]
+            )
+            self.logits[gathered_index.cpu()] = gathered_logits.cpu()
+            self.cached[gathered_index.cpu()] = True
+            self.dirty = True
+        return self.logits[index].to(device)
+
+    def save(self):
+        """
+        Save the cached teacher logits if they changed.
+        """
+        if self.cache_path is None or not self.dirty:
+            return
+        if du.is_master_proc(self.num_shards):
+            with pathmgr.open(self.cache_path, "wb") as f:
+                torch.save({"logits": self.logits, "cached": self.cached}, f)
+            logger.info(
+                "Saved the teacher logits of {}/{} clips to {}".format(
+                    int(self.cached.sum()), len(self.cached), self.cache_path
+                )
+            )
+        self.dirty = False
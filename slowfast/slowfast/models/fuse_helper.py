@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+
+"""Fold BatchNorm layers into the preceding convolutions for inference."""
+
+import torch.nn as nn
+import torchvision
+from torch.nn.utils.fusion import fuse_conv_bn_eval
+
+import slowfast.utils.logging as logging
+
+from . import head_helper, resnet_helper, stem_helper
+from .video_model_builder import FuseFastToSlow
+
+logger = logging.get_logger(__name__)
+
+# (conv, bn) attribute pairs where the bn directly consumes the conv output.
+_CONV_BN_PAIRS = {
+    resnet_helper.BasicTransform: [("a", "a_bn"), ("b", "b_bn")],
+    resnet_helper.X3DTransform: [("a", "a_bn"), ("b", "b_bn"), ("c", "c_bn")],
+    resnet_helper.BottleneckTransform: [
+        ("a", "a_bn"),
+        ("b", "b_bn"),
+        ("c", "c_bn"),
+    ],
+    resnet_helper.ResBlock: [("branch1", "branch1_bn")],
+    stem_helper.ResNetBasicStem: [("conv", "bn")],
+    stem_helper.X3DStem: [("conv", "bn")],
+    head_helper.X3DHead: [("conv_5", "conv_5_bn"), ("lin_5", "lin_5_bn")],
+    FuseFastToSlow: [("conv_f2s", "bn")],
+    # 2D backbone of the PD region model.
+    torchvision.models.resnet.ResNet: [("conv1", "bn1")],
+    torchvision.models.resnet.Bottleneck: [
+        ("conv1", "bn1"),
+        ("conv2", "bn2"),
+        ("conv3", "bn3"),
+    ],
+    torchvision.models.resnet.BasicBlock: [("conv1", "bn1"), ("conv2", "bn2")],
+}
+
+
+def fuse_conv_bn(model):
+    """
+    Fold every BatchNorm that directly follows a convolution into the weights
+    and bias of the convolution, and replace it with an identity. The model
+    must be in eval mode since the running statistics are used. Only the
+    plain BatchNorm layers are folded, sub batchnorms are left untouched.
+    Args:
+        model (model): model built by build_model, in eval mode.
+    Returns:
+        num_fused (int): number of folded BatchNorm layers.
+    """
+    assert not model.training, "BatchNorm can only be folded in eval mode."
+    num_fused = 0
+    for module in model.modules():
+        pairs = _CONV_BN_PAIRS.get(type(module), [])
+        if isinstance(module, nn.Sequential):
+            # Downsample branches of the torchvision blocks.
+            names = [name for name, _ in module.named_children()]
+            pairs = list(zip(names[:-1], names[1:]))
+        for conv_name, bn_name in pairs:
+            conv = getattr(module, conv_name, None)
+            bn = getattr(module, bn_name, None)
+            if not isinstance(conv, nn.modules.conv._ConvNd) or not isinstance(
+                bn, nn.modules.batchnorm._BatchNorm
+            ):
+                continue
+            setattr(module, conv_name, fuse_conv_bn_eval(conv, bn))
+            setattr(module, bn_name, nn.Identity())
+            num_fused += 1
+    logger.info("Folded {} BatchNorm layers.".format(num_fused))
+    return num_fused
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+
+"""Landmark only PD model."""
+
+import torch
+import torch.nn as nn
+
+from .build import MODEL_REGISTRY
+
+
+class TemporalConvBlock(nn.Module):
+    """
+    Residual block of a temporal convolution, BatchNorm and ReLU.
+    """
+
+    def __init__(self, dim, kernel_size, dropout_rate):
+        """
+        Args:
+            dim (int): number of channels.
+            kernel_size (int): temporal kernel size.
+            dropout_rate (float): dropout rate after the activation.
+        """
+        super(TemporalConvBlock, self).__init__()
+        self.conv = nn.Conv1d(
+            dim, dim, kernel_size, padding=kernel_size // 2, bias=False
+        )
+        self.bn = nn.BatchNorm1d(dim)
+        self.relu = nn.ReLU(inplace=True)
+        self.dropout = nn.Dropout(dropout_rate)
+
+    def forward(self, x):
+        return x + self.dropout(self.relu(self.bn(self.conv(x))))
+
+
+@MODEL_REGISTRY.register()
+class KeypointModel(nn.Module):
+    """
+    Classifies a clip from the keypoints of its facial regions only, without
+    any video decoding or image backbone. Every frame is described by the
+    corners and the center of its regions, normalized by the face box of the
+    frame, their velocities, and the velocity and scale change of the face
+    box. A small temporal conv or transformer encoder runs over the frames.
+    The inputs come from the Pdkeypoints dataset.
+    """
+
+    def __init__(self, cfg):
+        """
+        Args:
+            cfg (CfgNode): model building configs, details are in the
+                comments of the config file.
+        """
+        super(KeypointModel, self).__init__()
+        self.arch = cfg.KPT.ARCH
+        assert self.arch in ["conv", "transformer"]
+        hidden_dim = cfg.KPT.HIDDEN_DIM
+        # Positions and velocities of 3 points per region, plus the velocity
+        # and log scale change of the face box.
+        in_dim = cfg.PD.NUM_REGIONS * 3 * 2 * 2 + 3
+        self.embed = nn.Linear(in_dim, hidden_dim)
+
+        if self.arch == "conv":
+            self.encoder = nn.Sequential(
+                *[
+                    TemporalConvBlock(
+                        hidden_dim, cfg.KPT.KERNEL_SIZE, cfg.MODEL.DROPOUT_RATE
+                    )
+                    for _ in range(cfg.KPT.NUM_LAYERS)
+                ]
+            )
+            self.time_embed = None
+        else:
+            layer = nn.TransformerEncoderLayer(
+                hidden_dim,
+                cfg.KPT.NUM_HEADS,
+                dim_feedforward=2 * hidden_dim,
+                dropout=cfg.MODEL.DROPOUT_RATE,
+                batch_first=True,
+            )
+            self.encoder = nn.TransformerEncoder(layer, cfg.KPT.NUM_LAYERS)
+            self.time_embed = nn.Parameter(
+                torch.zeros(1, cfg.DATA.NUM_FRAMES, hidden_dim)
+            )
+            nn.init.trunc_normal_(self.time_embed, std=0.02)
+
+        self.dropout = nn.Dropout(cfg.MODEL.DROPOUT_RATE)
+        self.projection = nn.Linear(hidden_dim, cfg.MODEL.NUM_CLASSES)
+        # Softmax for evaluation and testing.
+        if cfg.MODEL.HEAD_ACT == "softmax":
+            self.act = nn.Softmax(dim=1)
+        elif cfg.MODEL.HEAD_ACT == "sigmoid":
+            self.act = nn.Sigmoid()
+        else:
+            raise NotImplementedError(
+                "{} is not supported as an activation"
+                "function.".format(cfg.MODEL.HEAD_ACT)
+            )
+
+    def frame_features(self, points):
+        """
+        Normalizes the region points of every frame and adds their velocities.
+
+        Args:
+            points (tensor): region points of shape
+                (batch_size, num_frames, num_regions, 3, 2), the top left and
+                bottom right corners and the center of every region.
+        Returns:
+            features (tensor): features of shape (batch_size, num_frames,
+                num_regions * 12 + 3).
+        """
+        top_left = points[:, :, :, 0].amin(dim=2)
+        bottom_right = points[:, :, :, 1].amax(dim=2)
+        center = (top_left + bottom_right) / 2
+        scale = (bottom_right - top_left).amax(dim=-1).clamp(min=1.0)
+
+        x = (points.flatten(2, 3) - center[:, :, None]) / scale[:, :, None, None]
+        x = x.flatten(2)
+        velocity = torch.diff(x, dim=1, prepend=x[:, :1])
+        # Motion of the whole face, removed by the normalization above.
+        face_velocity = (
+            torch.diff(center, dim=1, prepend=center[:, :1]) / scale[..., None]
+        )
+        log_scale = torch.log(scale)
+        scale_change = torch.diff(log_scale, dim=1, prepend=log_scale[:, :1])
+        return torch.cat(
+            (x, velocity, face_velocity, scale_change[..., None]), dim=-1
+        )
+
+    def forward(self, x, bboxes=None):
+        x = self.embed(self.frame_features(x[0]))
+        if self.arch == "conv":
+            # (B, T, C) -> (B, C, T).
+            x = self.encoder(x.transpose(1, 2)).mean(dim=2)
+        else:
+            x = self.encoder(x + self.time_embed).mean(dim=1)
+        x = self.projection(self.dropout(x))
+        if not self.training:
+            x = self.act(x)
+        return x
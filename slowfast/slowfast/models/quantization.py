@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+
+"""Post training int8 quantization of the PD region model for CPU inference."""
+
+import torch
+import torch.nn as nn
+from torch.ao.quantization import get_default_qconfig_mapping, quantize_dynamic
+from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+import slowfast.utils.logging as logging
+import slowfast.utils.misc as misc
+
+logger = logging.get_logger(__name__)
+
+# Backbone stages that are statically quantized, in execution order.
+_BACKBONE_STAGES = ["conv1", "layer1", "layer2", "layer3"]
+
+
+def quantize_model(cfg, model, calib_loader=None):
+    """
+    Quantize a model according to cfg.TEST.QUANTIZE. `dynamic` quantizes the
+    weights of every nn.Linear to int8, activations being quantized on the
+    fly. `static` additionally quantizes the frozen PD backbone with
+    activation ranges calibrated on calib_loader.
+    Args:
+        cfg (CfgNode): configs. Details can be found in
+            slowfast/config/defaults.py
+        model (model): float model on CPU, with its weights loaded.
+        calib_loader (loader): loader used to calibrate the static
+            quantization.
+    Returns:
+        model (model): the quantized model, in eval mode.
+    """
+    assert cfg.TEST.QUANTIZE in ["dynamic", "static"]
+    assert cfg.NUM_GPUS == 0, "Quantized models only run on CPU."
+    model.eval()
+    if cfg.TEST.QUANTIZE == "static":
+        assert calib_loader is not None
+        quantize_backbone_static(
+            model, calib_loader, cfg.TEST.QUANTIZE_CALIB_BATCHES
+        )
+    quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8, inplace=True)
+    logger.info(
+        "Quantized model ({}): {}".format(
+            cfg.TEST.QUANTIZE, misc.model_size(model)
+        )
+    )
+    return model
+
+
+def quantize_backbone_static(model, calib_loader, num_batches):
+    """
+    Statically quantize the stages of the PD ResNet-50 backbone. Each stage
+    is quantized separately with float inputs and outputs, so the model
+    forward is unchanged.
+    Args:
+        model (model): PD region model in eval mode.
+        calib_loader (loader): loader to calibrate the activation ranges.
+        num_batches (int): number of calibration batches.
+    """
+    assert hasattr(model, "resnet"), "Only the PD backbone is supported."
+    resnet = model.resnet.module
+    qconfig_mapping = get_default_qconfig_mapping(
+        torch.backends.quantized.engine
+    )
+    # bn1 is folded into conv1 when quantized together.
+    stages = {
+        "conv1": nn.Sequential(resnet.conv1, resnet.bn1),
+        "layer1": resnet.layer1,
+        "layer2": resnet.layer2,
+        "layer3": resnet.layer3,
+    }
+    resnet.bn1 = nn.Identity()
+
+    x = torch.rand(1, 3, model.crop_size, model.crop_size)
+    with torch.no_grad():
+        for name in _BACKBONE_STAGES:
+            if name == "layer1":
+                x = resnet.maxpool(x)
+            stage = stages[name]
+            prepared = prepare_fx(stage, qconfig_mapping, (x,))
+            x = stage(x)
+            setattr(resnet, name, prepared)
+
+    calibrate(model, calib_loader, num_batches)
+    for name in _BACKBONE_STAGES:
+        setattr(resnet, name, convert_fx(getattr(resnet, name)))
+
+
+@torch.no_grad()
+def calibrate(model, calib_loader, num_batches):
+    """
+    Run forward passes to collect the activation statistics of the observers.
+    Args:
+        model (model): model with observers inserted.
+        calib_loader (loader): loader yielding
+            (inputs, labels, index, time, meta, bboxes).
+        num_batches (int): number of batches to run.
+    """
+    for cur_iter, (inputs, _, _, _, _, bboxes) in enumerate(calib_loader):
+        if cur_iter >= num_batches:
+            break
+        model(inputs, bboxes)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+
+"""Sliding window streaming inference of the PD region model."""
+
+from collections import deque
+import torch
+
+
+class StreamingPDModel(object):
+    """
+    Runs the PD region model over a video of any length with a sliding
+    window. The backbone and RoI features of every sampled frame are computed
+    once and kept in a ring buffer of `num_frames` frames, and only the
+    temporal / region attention head is run on each window. A window is
+    scored every `stride` frames, so neighboring windows share their frame
+    features instead of recomputing them.
+    """
+
+    def __init__(self, model, num_frames, stride):
+        """
+        Args:
+            model (model): PD region model (video_model_builder.ResNet) in
+                eval mode.
+            num_frames (int): number of frames per window, the clip length
+                the model was trained with.
+            stride (int): number of frames between the starts of two
+                consecutive windows.
+        """
+        assert model.image_variant != "video", (
+            "Streaming needs the per frame region features, the video "
+            "variant is not supported."
+        )
+        assert not model.roi_tube, "Streaming scores per frame RoI features."
+        self.model = model
+        self.num_frames = num_frames
+        self.stride = stride
+        self.reset()
+
+    def reset(self):
+        """
+        Clear the buffer before streaming a new video.
+        """
+        self.features = deque(maxlen=self.num_frames)
+        self.frame_nums = deque(maxlen=self.num_frames)
+        self.num_seen = 0
+
+    @torch.no_grad()
+    def push(self, frames, bboxes, frame_nums):
+        """
+        Add the next frames of the video and score the windows they complete.
+        Args:
+            frames (tensor): frames of shape (3, num_new_frames, H, W).
+            bboxes (tensor): region corners of the frames, of shape
+                (num_new_frames, num_regions, 4, 2).
+            frame_nums (list): indices of the frames in the video.
+        Returns:
+            windows (list): (first frame index, last frame index) of every
+                completed window.
+            scores (tensor): class probabilities of the windows, of shape
+                (len(windows), num_classes), or None if no window completed.
+        """
+        features = self.model.frame_region_features(
+            frames.unsqueeze(0), bboxes.unsqueeze(0)
+        )
+
+        windows, clips = [], []
+        for feature, frame_num in zip(features[0], frame_nums):
+            self.features.append(feature)
+            self.frame_nums.append(frame_num)
+            self.num_seen += 1
+            if (
+                self.num_seen >= self.num_frames
+                and (self.num_seen - self.num_frames) % self.stride == 0
+            ):
+                windows.append((self.frame_nums[0], self.frame_nums[-1]))
+                clips.append(torch.stack(list(self.features)))
+        if len(clips) == 0:
+            return windows, None
+        # Score all the windows completed by this chunk as one batch.
+        return windows, self.model.head(torch.stack(clips))
+
+    @torch.no_grad()
+    def flush(self):
+        """
+        Score the buffered frames of a video shorter than a window, repeating
+        its last frame like the temporal sampling of the test clips does.
+        Returns:
+            windows (list): the padded window, if any.
+            scores (tensor): class probabilities of the window, or None.
+        """
+        if self.num_seen == 0 or self.num_seen >= self.num_frames:
+            return [], None
+        features = list(self.features)
+        features += [features[-1]] * (self.num_frames - len(features))
+        windows = [(self.frame_nums[0], self.frame_nums[-1])]
+        return windows, self.model.head(torch.stack(features).unsqueeze(0))
@@ -1,9 +1,13 @@
 # Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
 
+import torch
+
 import slowfast.utils.logging as logging
 
 logger = logging.get_logger(__name__)
 
+TORCH_MAJOR = int(torch.__version__.split(".")[0])
+
 
 def round_width(width, multiplier, min_width=1, divisor=1, verbose=False):
     if not multiplier:
@@ -27,3 +31,78 @@ def validate_checkpoint_wrapper_import(checkpoint_wrapper):
     """
     if checkpoint_wrapper is None:
         raise ImportError("Please install fairscale.")
+
+
+def is_frozen(name, frozen_modules):
+    """
+    Check if a submodule is one of the frozen modules or inside one of them.
+    Args:
+        name (str): name of the submodule in the model, e.g. `s2` or
+            `resnet.module.layer1`.
+        frozen_modules (list): names of the frozen modules, e.g.
+            TRAIN.FROZEN_MODULES.
+    """
+    return any(
+        name == frozen or name.startswith(frozen + ".")
+        for frozen in frozen_modules
+    )
+
+
+def _requires_grad(inputs):
+    """
+    Check if any tensor of a (nested) list or tuple of inputs requires grad.
+    """
+    if isinstance(inputs, torch.Tensor):
+        return inputs.requires_grad
+    if isinstance(inputs, (list, tuple)):
+        return any(_requires_grad(x) for x in inputs)
+    return False
+
+
+def _frozen_pre_hook(module, inputs):
+    module._frozen_grad_enabled.append(torch.is_grad_enabled())
+    if not _requires_grad(inputs):
+        torch.set_grad_enabled(False)
+
+
+def _frozen_hook(module, inputs, output):
+    # Also called when the forward raises, from torch 2.0 on.
+    torch.set_grad_enabled(module._frozen_grad_enabled.pop())
+
+
+def freeze_modules(model, module_names):
+    """
+    Freeze submodules of a model. Their parameters stop requiring grad, and
+    every module inside them runs without recording the autograd graph when
+    none of its inputs requires grad, i.e. when all the modules before it are
+    frozen too. The outputs of such a frozen prefix are detached and its
+    activations are not kept for backward. A frozen module after a trainable
+    one still records the graph, so the gradients reach the trainable one.
+    Args:
+        model (model): model to freeze, without its DistributedDataParallel
+            wrapper.
+        module_names (list): names of the submodules to freeze, e.g.
+            `resnet` or `s1`.
+    Returns:
+        num_frozen (int): number of frozen parameters.
+    """
+    num_frozen = 0
+    for name in module_names:
+        frozen = model.get_submodule(name)
+        for param in frozen.parameters():
+            param.requires_grad_(False)
+            num_frozen += param.numel()
+        # Hook every submodule, the model may call them directly instead of
+        # the frozen module itself (e.g. the PD backbone stages).
+        for module in frozen.modules():
+            module._frozen_grad_enabled = []
+            module.register_forward_pre_hook(_frozen_pre_hook)
+            if TORCH_MAJOR >= 2:
+                # Restore the grad mode even if the forward raises.
+                module.register_forward_hook(_frozen_hook, always_call=True)
+            else:
+                module.register_forward_hook(_frozen_hook)
+    logger.info(
+        "Frozen {}: {:,} parameters.".format(", ".join(module_names), num_frozen)
+    )
+    return num_frozen
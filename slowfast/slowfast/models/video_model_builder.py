@@ -7,7 +7,9 @@ import math
 from functools import partial
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
 from torch.nn.init import trunc_normal_
+import torchvision
 import torchvision.ops.roi_align as roi_align
 import matplotlib.pyplot as plt
 import os
@@ -27,11 +29,11 @@ from slowfast.models.modulator import Modulator
 from slowfast.models.resnet import ResNet, resnet50
 from slowfast.models.stem_helper import PatchEmbed
 from slowfast.models.utils import (
+    is_frozen,
     round_width,
     validate_checkpoint_wrapper_import,
 )
 
-from slowfast.models.vit import TimeSformer
 from torchvision import transforms
 
 from . import head_helper, resnet_helper, stem_helper
@@ -117,13 +119,47 @@ _POOL1 = {
     "x3d": [[1, 1, 1]],
 }
 
+def _resize_center_crop(
+    x: torch.Tensor, resize_size: int, crop_size: int, antialias: bool
+):
+    """
+    Resizes the shorter side of frames of shape (batch_size, 3, H, W) to
+    resize_size and center crops them to crop_size, as transforms Resize and
+    CenterCrop do. Without antialias, the frames are resized as by the tensor
+    Resize of torchvision < 0.17. The export path scripts it, so that the
+    output sizes follow the input shape in a traced graph.
+    """
+    height, width = x.shape[-2], x.shape[-1]
+    if width <= height:
+        size = [int(resize_size * height / width), resize_size]
+    else:
+        size = [resize_size, int(resize_size * width / height)]
+    if antialias:
+        x = F.interpolate(
+            x, size=size, mode="bilinear", align_corners=False, antialias=True
+        )
+    else:
+        x = F.interpolate(x, size=size, mode="bilinear", align_corners=False)
+    top = int(round((size[0] - crop_size) / 2.0))
+    left = int(round((size[1] - crop_size) / 2.0))
+    return x[..., top : top + crop_size, left : left + crop_size]
+
+
 class Attention(nn.Module):
-    def __init__(self, dim, num_heads=8, qkv_bias=False, qk_scale=None, attn_drop=0., proj_drop=0., with_qkv=True):
+    def __init__(self, dim, num_heads=8, qkv_bias=False, qk_scale=None, attn_drop=0., proj_drop=0., with_qkv=True, use_sdpa=False):
         super().__init__()
         self.num_heads = num_heads
         head_dim = dim // num_heads
         self.scale = qk_scale or head_dim ** -0.5
         self.with_qkv = with_qkv
+        # scaled_dot_product_attention never materializes the full attention
+        # matrix on the memory efficient backends.
+        self.use_sdpa = use_sdpa and hasattr(F, "scaled_dot_product_attention")
+        # The scale argument of scaled_dot_product_attention needs torch 2.1,
+        # so q is rescaled from its default 1 / sqrt(head_dim) instead.
+        self.sdpa_q_scale = None
+        if qk_scale:
+            self.sdpa_q_scale = qk_scale * head_dim ** 0.5
         if self.with_qkv:
            self.qkv = nn.Linear(dim, dim * 3, bias=qkv_bias)
            self.proj = nn.Linear(dim, dim)
@@ -142,11 +178,22 @@ class Attention(nn.Module):
         # print("q shape: ", q.shape)
         # print("k shape: ", k.shape)
         # print("v shape: ", v.shape)
-        attn = (q @ k.transpose(-2, -1)) * self.scale
-        attn = attn.softmax(dim=-1)
-        attn = self.attn_drop(attn)
+        if self.use_sdpa:
+            if self.sdpa_q_scale is not None:
+                q = q * self.sdpa_q_scale
+            x = F.scaled_dot_product_attention(
+                q,
+                k,
+                v,
+                dropout_p=self.attn_drop.p if self.training else 0.0,
+            )
+        else:
+            attn = (q @ k.transpose(-2, -1)) * self.scale
+            attn = attn.softmax(dim=-1)
+            attn = self.attn_drop(attn)
+            x = attn @ v
 
-        x = (attn @ v).transpose(1, 2).reshape(B, N, C)
+        x = x.transpose(1, 2).reshape(B, N, C)
         if self.with_qkv:
            x = self.proj(x)
            x = self.proj_drop(x)
@@ -417,6 +464,15 @@ class SlowFast(nn.Module):
             norm_module=self.norm_module,
         )
 
+        if cfg.MODEL.ACT_CHECKPOINT:
+            validate_checkpoint_wrapper_import(checkpoint_wrapper)
+            # Frozen stages keep no activations for backward.
+            for name in ["s2", "s3", "s4", "s5"]:
+                if not is_frozen(name, cfg.TRAIN.FROZEN_MODULES):
+                    setattr(
+                        self, name, checkpoint_wrapper(getattr(self, name))
+                    )
+
         if cfg.DETECTION.ENABLE:
             self.head = head_helper.ResNetRoIHead(
                 dim_in=[
@@ -539,135 +595,187 @@ class ResNet(nn.Module):
 
         ########### Config Parameters ###########
         self.num_classes = cfg.MODEL.NUM_CLASSES
-        self.use_max_pool = True
-        self.use_s5 = False
-        self.roi_align_size = (3, 3)
-        self.use_softmax = True
-        self.vit_embed_dim = 768
-        self.use_vit = True
-        self.use_mlp = True
-        self.use_bn = True
-        self.st_config = ["temporal_attention", "region_attention"]
-        self.use_pos_embed = True
-        self.use_time_embed = True
-        self.image_variant = "video+region"
-        self.use_imagenet_resnet = True
+        self.use_max_pool = cfg.PD.USE_MAX_POOL
+        self.roi_align_size = tuple(cfg.PD.ROI_ALIGN_SIZE)
+        self.use_softmax = cfg.PD.USE_SOFTMAX
+        self.use_mlp = cfg.PD.USE_MLP
+        self.use_bn = cfg.PD.USE_BN
+        self.st_config = list(cfg.PD.ST_CONFIG)
+        self.use_pos_embed = cfg.PD.USE_POS_EMBED
+        self.use_time_embed = cfg.PD.USE_TIME_EMBED
+        self.image_variant = cfg.PD.IMAGE_VARIANT
         self.batch_size = cfg.TRAIN.BATCH_SIZE
-        self.feature_size = 9216
+        self.feature_size = cfg.PD.FEATURE_SIZE
+        self.num_regions = cfg.PD.NUM_REGIONS
+        self.region_mode = cfg.PD.REGION_MODE
+        self.region_crop_size = cfg.PD.REGION_CROP_SIZE
+        self.roi_tube = cfg.PD.ROI_TUBE
+        self.num_frames = cfg.DATA.NUM_FRAMES
+        self.tube_window = cfg.PD.TUBE_WINDOW or self.num_frames
+        # Number of time steps of the region features seen by the head.
+        self.num_time_steps = self.num_frames
+        if self.roi_tube:
+            self.num_time_steps = self.num_frames // self.tube_window
+        self.use_sdpa = cfg.PD.USE_SDPA
+        # Width of the tokens seen by the attention blocks and classifiers.
+        self.embed_dim = cfg.PD.TOKEN_PROJ_DIM or self.feature_size
         ########################################
 
+        self.st_name = "_".join(self.st_config)
+        assert self.st_name in self.st_func, "Unsupported ST_CONFIG {}".format(
+            self.st_config
+        )
+        assert self.image_variant in ["", "video", "region", "video+region"]
+        assert self.region_mode in ["roi", "crop"]
+        assert (
+            self.region_mode == "roi" or self.image_variant != "video"
+        ), "The video variant needs the full frame feature maps."
+        if self.roi_tube:
+            assert self.image_variant != "video", "RoI tubes need a region variant."
+            assert self.num_frames % self.tube_window == 0
+            # region_attention_temporal_pool averages over time instead.
+            assert self.st_name not in [
+                "temporal_pool_region_attention",
+                "temporal_pool_region_pool",
+            ], (
+                "temporal_pool halves exactly NUM_FRAMES time steps, use an "
+                "attention or average over time with RoI tubes."
+            )
+
         self.cls_head = None
-        self.vit_proj = None
-        self.vit = None
+        self.proj = None
+        self.token_proj = None
         self.temporal_pool = None
         self.region_pool = None
         self.temporal_attention = None
         self.region_attention = None
+        self.cls_token = None
         self.pos_embed = None
-        self.pos_drop = None
         self.time_embed = None
-        self.time_drop = None
         self.image_mlp = None
+        self.out_batchnorm = None
         self.resnet = None
-        self.img_preprocess = None
-        
-        self.proj = nn.Linear(14336, self.feature_size)
-        if self.image_variant is not None:
-            self.resnet = torch.hub.load('pytorch/vision:v0.10.0', 'resnet50', pretrained=True)
-            self.resnet = torch.nn.DataParallel(self.resnet).cuda()
-            #self.resnet = resnet50()
-            
-            backbone = torch.load("/home/andyz3/PD/FSPD/slowfast/configs/PD/flr_r50_vgg_face.pth")
-            for key in list(backbone['state_dict']):
-                newKeyName = key.replace(".base_net", "")
-                backbone['state_dict'][newKeyName] = backbone['state_dict'].pop(key)
-            
-            backbone['state_dict']["module.projection_net.net.0.weight"] = torch.rand(1000, 2048)
-            backbone['state_dict']['module.projection_net.net.0.bias'] = torch.rand(1000)
-            backbone['state_dict']['module.fc.weight'] = backbone['state_dict']["module.projection_net.net.0.weight"]
-            backbone['state_dict']['module.fc.bias'] = backbone['state_dict']['module.projection_net.net.0.bias']
-            backbone['state_dict'] = {k: v for k, v in backbone['state_dict'].items() if '.projection_net' not in k}
-            backbone['state_dict'] = {k: v for k, v in backbone['state_dict'].items() if '.prototypes' not in k}
-            self.resnet.load_state_dict(backbone['state_dict'])
-            
-            '''
-            self.resnet = efficient_face()
-            self.resnet.fc = nn.Linear(1024, 8)
-            self.resnet = torch.nn.DataParallel(self.resnet).cuda()
-            #checkpoint = torch.load("/home/andyz3/PD/FSPD/slowfast/configs/PD/resnet50_pretrained_on_msceleb.pth.tar")
-            checkpoint = torch.load("/home/andyz3/PD/FSPD/slowfast/configs/PD/EfficientFace_Trained_on_AffectNet8.pth.tar")
-            dic = checkpoint['state_dict']
-            self.resnet.load_state_dict(dic)
-            self.resnet.module.fc = nn.Linear(1024, 7).cuda()
-            '''
-            '''
-            self.resnet.fc = nn.Linear(1024, 12666)
-            self.resnet = torch.nn.DataParallel(self.resnet).cuda()
-            checkpoint = torch.load("/home/andyz3/PD/FSPD/slowfast/configs/PD/resnet50_pretrained_on_msceleb.pth.tar")
-            pre_trained_dict = checkpoint['state_dict']
-            self.resnet.load_state_dict(pre_trained_dict)
-            self.resnet.module.fc = nn.Linear(1024, 2).cuda()
-            self.resnet = torch.load("/home/andyz3/PD/FSPD/slowfast/configs/PD/resnet50_pretrained_on_msceleb.pth.tar")
-            '''
-            self.img_preprocess = transforms.Compose([
-                transforms.Resize(256),
-                transforms.CenterCrop(224),
-                transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
-            ])
-
-            # self.image_mlp = nn.Sequential(nn.Linear(262144, sel.f), nn.ReLU(), nn.Linear(4608, self.num_classes))
-            if self.image_variant == "video":
-                #self.image_mlp = nn.Sequential(nn.Linear(1048576, 2408), nn.ReLU(), nn.Linear(2408, self.num_classes))
-                #self.image_mlp = nn.Linear(100352, self.num_classes) 
-                self.image_mlp = nn.Sequential(nn.Linear(9216, 4816), nn.ReLU(), nn.Linear(4816, 2408), nn.ReLU(), nn.Linear(2408, self.num_classes))
-            elif self.image_variant == "region":
-                self.image_mlp = nn.Sequential(nn.Linear(self.feature_size, 4816), nn.ReLU(), nn.Linear(4816, 2408), nn.ReLU(), nn.Linear(2408, self.num_classes))
-                
-                #self.image_mlp = nn.Linear(2064384, self.num_classes)
-                #self.image_mlp = nn.Sequential(nn.Linear(18432, 4816), nn.ReLU(), nn.Linear(4816, 2408), nn.ReLU(), nn.Linear(2408, self.num_classes))
-                
-            else:
-                # self.image_mlp = nn.Linear(262144 + 129024, self.num_classes)
-                #self.image_mlp = nn.Linear(1146880, self.num_classes) 
-                self.image_mlp = nn.Sequential(nn.Linear(18432, 2408), nn.ReLU(), nn.Linear(2408, self.num_classes))
 
-        if self.use_mlp:
-            self.cls_head = nn.Sequential(nn.Linear(9216, 4608), nn.ReLU(), nn.Linear(4608, 2408), nn.ReLU(), nn.Linear(2408, self.num_classes))
+        self.resnet = self._construct_backbone(cfg)
+        # Frames are resized to 256, center cropped to 224 and normalized
+        # with the ImageNet statistics before the backbone.
+        self.resize_size = 256
+        self.crop_size = 224
+        self.resize_antialias = cfg.PD.RESIZE_ANTIALIAS
+        self.resize_center_crop = _resize_center_crop
+        self.pixel_mean = [0.485, 0.456, 0.406]
+        self.pixel_std = [0.229, 0.224, 0.225]
+
+        # Only the classifier of the configured variant is reachable from
+        # forward, build nothing else.
+        if self.image_variant == "video":
+            # Flattened layer3 feature maps (1024 channels x 14 columns).
+            self.proj = nn.Linear(14336, self.embed_dim)
+            self.image_mlp = nn.Sequential(nn.Linear(self.embed_dim, 4816), nn.ReLU(), nn.Linear(4816, 2408), nn.ReLU(), nn.Linear(2408, self.num_classes))
+        elif self.image_variant == "region":
+            self.image_mlp = nn.Sequential(nn.Linear(self.embed_dim, 4816), nn.ReLU(), nn.Linear(4816, 2408), nn.ReLU(), nn.Linear(2408, self.num_classes))
+        elif self.image_variant == "video+region":
+            self.image_mlp = nn.Sequential(nn.Linear(2 * self.embed_dim, 2408), nn.ReLU(), nn.Linear(2408, self.num_classes))
+        elif self.use_mlp:
+            self.cls_head = nn.Sequential(nn.Linear(self.embed_dim, 4608), nn.ReLU(), nn.Linear(4608, 2408), nn.ReLU(), nn.Linear(2408, self.num_classes))
         else:
-            #self.cls_head = nn.Linear(9216, self.num_classes)
-            self.cls_head = None
+            self.cls_head = nn.Linear(self.embed_dim, self.num_classes)
 
-        if self.use_vit:
-            self.vit_proj = nn.Linear(23552, self.vit_embed_dim)
-            self.vit = TimeSformer(img_size=256, num_classes=2, num_frames=8, attention_type='divided_space_time', depth=1, embed_dim=768, pretrained_model='')
-
-        if self.use_max_pool:
-            self.temporal_pool = nn.MaxPool3d((1, 1, 2), stride=(1, 1, 2))
-            self.region_pool = nn.MaxPool2d((1, 2), stride=(1, 2))
-        else:
-            self.temporal_pool = nn.AvgPool3d((1, 1, 2), stride=(1, 1, 2))
-            self.region_pool = nn.AvgPool2d((1, 2), stride=(1, 2))
-        
-        if self.st_config is not None:
-            self.temporal_attention = Attention(self.feature_size, num_heads=3) if "temporal_attention" in self.st_config else None
-            self.region_attention = Attention(self.feature_size, num_heads=3) if "region_attention" in self.st_config else None
-            self.cls_token = nn.Parameter(torch.zeros(1, 1, self.feature_size))
+        if "temporal_pool" in self.st_config:
+            if self.use_max_pool:
+                self.temporal_pool = nn.MaxPool3d((1, 1, 2), stride=(1, 1, 2))
+            else:
+                self.temporal_pool = nn.AvgPool3d((1, 1, 2), stride=(1, 1, 2))
+        if "region_pool" in self.st_config:
+            if self.use_max_pool:
+                self.region_pool = nn.MaxPool2d((1, 2), stride=(1, 2))
+            else:
+                self.region_pool = nn.AvgPool2d((1, 2), stride=(1, 2))
+
+        # Low rank projection of the RoI features, so that the cost of the
+        # attention and classifiers does not scale with the raw feature size.
+        if cfg.PD.TOKEN_PROJ_DIM and self.image_variant != "video":
+            self.token_proj = nn.Linear(self.feature_size, self.embed_dim)
+
+        if "temporal_attention" in self.st_config:
+            self.temporal_attention = Attention(self.embed_dim, num_heads=3, use_sdpa=self.use_sdpa)
+        if "region_attention" in self.st_config:
+            self.region_attention = Attention(self.embed_dim, num_heads=3, use_sdpa=self.use_sdpa)
+        # The attention maps over B x T x R tokens of the full feature size
+        # are the largest activations of the head, recompute them in backward.
+        if cfg.MODEL.ACT_CHECKPOINT:
+            validate_checkpoint_wrapper_import(checkpoint_wrapper)
+            if self.temporal_attention is not None:
+                self.temporal_attention = checkpoint_wrapper(self.temporal_attention)
+            if self.region_attention is not None:
+                self.region_attention = checkpoint_wrapper(self.region_attention)
+        if self.st_name != "temporal_pool_region_pool":
+            self.cls_token = nn.Parameter(torch.zeros(1, 1, self.embed_dim))
             # trunc_normal_(self.cls_token, std=.02)
 
-        if self.use_pos_embed:
-            self.pos_embed = nn.Parameter(torch.zeros(1, 14+1, self.feature_size))
+        # Embeddings are added only to the tokens of an attention over regions
+        # (pooled over time first) or over frames respectively.
+        if self.use_pos_embed and self.st_name in [
+            "temporal_pool_region_attention",
+            "region_attention_temporal_pool",
+        ]:
+            self.pos_embed = nn.Parameter(torch.zeros(1, self.num_regions + 1, self.embed_dim))
             # trunc_normal_(self.pos_embed, std=.02)
-        
+
         if self.use_time_embed:
-            if "temporal_attention" in self.st_config and "region_attention" in self.st_config:
-                self.time_embed = nn.Parameter(torch.zeros(1, 8, self.feature_size))
-            else:
-                self.time_embed = nn.Parameter(torch.zeros(1, 8+1, self.feature_size))
+            if self.st_name == "temporal_attention_region_attention":
+                self.time_embed = nn.Parameter(torch.zeros(1, self.num_time_steps, self.embed_dim))
+            elif self.st_name in [
+                "region_pool_temporal_attention",
+                "temporal_attention_region_pool",
+            ]:
+                self.time_embed = nn.Parameter(torch.zeros(1, self.num_time_steps + 1, self.embed_dim))
 
         self.act = nn.Softmax(dim=1)
-        self.out_batchnorm = nn.BatchNorm1d(self.num_classes)
+        if self.use_bn:
+            self.out_batchnorm = nn.BatchNorm1d(self.num_classes)
         self.relu = nn.ReLU()
 
+    def _construct_backbone(self, cfg):
+        """
+        Builds the 2D ResNet-50 that extracts per frame feature maps. Only the
+        layers up to layer3 are used, layer4 and fc are dropped.
+
+        Args:
+            cfg (CfgNode): model building configs, details are in the
+                comments of the config file.
+        """
+        if cfg.PD.BACKBONE_CHECKPOINT or not cfg.PD.BACKBONE_PRETRAINED:
+            resnet = torchvision.models.resnet50()
+        else:
+            resnet = torch.hub.load('pytorch/vision:v0.10.0', 'resnet50', pretrained=True)
+        resnet = torch.nn.DataParallel(resnet)
+        if cfg.NUM_GPUS:
+            resnet = resnet.cuda()
+
+        resnet.module.layer4 = nn.Identity()
+        resnet.module.fc = nn.Identity()
+
+        if cfg.PD.BACKBONE_CHECKPOINT and cfg.PD.BACKBONE_PRETRAINED:
+            backbone = torch.load(cfg.PD.BACKBONE_CHECKPOINT, map_location="cpu")
+            for key in list(backbone['state_dict']):
+                newKeyName = key.replace(".base_net", "")
+                backbone['state_dict'][newKeyName] = backbone['state_dict'].pop(key)
+
+            unused = ('.projection_net', '.prototypes', 'module.layer4.', 'module.fc.')
+            backbone['state_dict'] = {k: v for k, v in backbone['state_dict'].items() if not any(u in k for u in unused)}
+            resnet.load_state_dict(backbone['state_dict'])
+
+        if cfg.MODEL.ACT_CHECKPOINT:
+            validate_checkpoint_wrapper_import(checkpoint_wrapper)
+            # Frozen stages keep no activations for backward.
+            for name in ["layer1", "layer2", "layer3"]:
+                if is_frozen("resnet.module." + name, cfg.TRAIN.FROZEN_MODULES):
+                    continue
+                stage = getattr(resnet.module, name)
+                setattr(resnet.module, name, checkpoint_wrapper(stage))
+        return resnet
+
     def _construct_network(self, cfg):
         """
         Builds a single pathway ResNet model.
@@ -699,7 +807,8 @@ class ResNet(nn.Module):
         x = self.region_pool(x)
         x = self.region_pool(x)
 
-        x = torch.squeeze(x)
+        # Only squeeze the pooled regions, a tube clip has a single time step.
+        x = x.squeeze(-1)
         cls_tokens = self.cls_token.expand(batch_size, -1, -1)
         x = torch.cat((cls_tokens, x), dim=1)
 
@@ -808,171 +917,275 @@ class ResNet(nn.Module):
 
 
         
-    def forward(self, x, bboxes): 
-        x = x[:]  # avoid pass by reference
-        batch_size = x[0].shape[0]
-        if self.use_imagenet_resnet:
-            x = torch.squeeze(x[0])
-            #x = self.img_preprocess(x)
-            # x = self.resnet(x)
-            print(x.shape)
-            a, b, c, d, e = x.shape
-            x = torch.chunk(x, c, dim=2)
-            print(len(x))
-            print(x[0].shape)
-            #x = x.reshape(a * c, b, d, e)
-            '''
-            x = self.resnet.module.conv1(x)
-            x = self.resnet.module.bn1(x)
-            x = self.relu(x)
-            x = self.resnet.module.maxpool(x)
-            x = self.resnet.module.layer1(x)
-            x = self.resnet.module.layer2(x)
-            x = self.resnet.module.layer3(x)
-            x = self.resnet.module.layer4(x)
-            '''
-            '''
-            x = self.resnet.module.conv1(x)
-            x = self.resnet.module.maxpool(x)
-            x = self.resnet.module.modulator(self.resnet.module.stage2(x))
-            a, b, c, d = x.shape
-            print(x.shape)
-            x = x.reshape(a*4, 29, c, d)
-            x = x + self.resnet.module.local(x)
-            x = self.resnet.module.stage3(x)
-            x = self.resnet.module.stage4(x)
-            x = self.resnet.module.conv5(x)
-            x = x.mean([2, 3])
-            '''
-            y = []
-            for i in x:
-                x = torch.squeeze(i)
-                x = self.img_preprocess(x)
-                # x = self.resnet(x)
-                x = self.resnet.module.conv1(x)
-                x = self.resnet.module.bn1(x)
-                x = self.resnet.module.maxpool(x)
-                x = self.resnet.module.layer1(x)
-                x = self.resnet.module.layer2(x)
-                x = self.resnet.module.layer3(x)
-                #x = self.resnet.module.layer4(x)
-                x = torch.unsqueeze(x, 2)
-                print(x.shape)
-                y.append(x)
-            # output is of shape [64, 2048, 7, 7]
-            x = torch.cat(y, dim=2)
-            print("x shape", x.shape)
-            #x = torch.unsqueeze(x, 2)
-            x = [x]
-
-
-        fmap_dim = x[0].shape[4]
-        batch_size = x[0].shape[0]
-        print("x shape", x[0].shape)
-        
-        # shape of z: (batch_size, num_frames, num_feature_maps, fmap_dim, fmap_dim)
-        z_shape = x[0].shape
-        z = [x[0].permute((0, 2, 1, 3, 4))]
-        print("z shape", z[0].shape)
+    def preprocess(self, x):
+        """
+        Same as transforms Resize(256), CenterCrop(224) and Normalize. The
+        resize and crop are scripted by script_preprocess before exporting,
+        so that a traced model still handles frames of any size.
+
+        Args:
+            x (tensor): frames of shape (batch_size, 3, H, W).
+        """
+        x = self.resize_center_crop(
+            x, self.resize_size, self.crop_size, self.resize_antialias
+        )
+        return transforms.functional.normalize(x, self.pixel_mean, self.pixel_std)
+
+    def script_preprocess(self):
+        """
+        Scripts the resize and center crop of preprocess, for tracing.
+        """
+        self.resize_center_crop = torch.jit.script(_resize_center_crop)
+
+    def extract_features(self, frames):
+        """
+        Runs the 2D backbone on every frame of a clip.
+
+        Args:
+            frames (tensor): clip of shape (batch_size, 3, num_frames, H, W).
+        Returns:
+            features (tensor): layer3 feature maps of shape
+                (batch_size, 1024, num_frames, fmap_dim, fmap_dim).
+        """
+        y = []
+        for x in frames.unbind(dim=2):
+            y.append(self.backbone(self.preprocess(x)))
+        return torch.stack(y, dim=2)
+
+    def backbone(self, x):
+        """
+        Runs the 2D ResNet-50 up to layer3.
+
+        Args:
+            x (tensor): normalized images of shape (N, 3, H, W).
+        Returns:
+            x (tensor): feature maps of shape (N, 1024, H / 16, W / 16).
+        """
+        x = self.resnet.module.conv1(x)
+        x = self.resnet.module.bn1(x)
+        x = self.resnet.module.maxpool(x)
+        x = self.resnet.module.layer1(x)
+        x = self.resnet.module.layer2(x)
+        return self.resnet.module.layer3(x)
+
+    def format_boxes(self, bboxes, fmap_dim):
+        """
+        Converts the region corners to RoI align boxes on the feature maps.
+
+        Args:
+            bboxes (tensor): region corners of shape
+                (batch_size, num_frames, num_regions, 4, 2) in the 256 pixel
+                frame, the first and third corners are the top left and bottom
+                right ones.
+            fmap_dim (int): width of the feature maps.
+        Returns:
+            boxes (tensor): RoI boxes of shape
+                (batch_size * num_frames * num_regions, 5), each box being
+                (frame index, x_min, y_min, x_max, y_max).
+        """
+        batch_size, num_frames, num_regions = bboxes.shape[:3]
+        scale_factor = 256 / fmap_dim
+        corners = bboxes[:, :, :, [0, 2]].float().reshape(-1, 4)
+        corners = torch.div(corners, scale_factor, rounding_mode="floor")
+        frame_idx = torch.arange(
+            batch_size * num_frames, dtype=corners.dtype, device=corners.device
+        ).repeat_interleave(num_regions)
+        return torch.cat((frame_idx[:, None], corners), dim=1)
+
+    def region_features(self, features, bboxes):
+        """
+        RoI aligns every region of every frame.
+
+        Args:
+            features (tensor): backbone feature maps of shape
+                (batch_size, channels, num_frames, fmap_dim, fmap_dim).
+            bboxes (tensor): region corners of shape
+                (batch_size, num_frames, num_regions, 4, 2).
+        Returns:
+            feature_maps (tensor): region features of shape
+                (batch_size, num_frames, num_regions, feature_size).
+        """
+        batch_size, frames, regions = bboxes.shape[:3]
+        boxes = self.format_boxes(bboxes, features.shape[4]).to(features.device)
+        z = features.permute((0, 2, 1, 3, 4)).flatten(0, 1)
+        feature_maps = roi_align(z, boxes, self.roi_align_size)
+        return feature_maps.reshape((batch_size, frames, regions, -1))
+
+    def tube_boxes(self, bboxes):
+        """
+        Merges the boxes of every region over windows of tube_window frames
+        into tube boxes, the smallest boxes containing all of them.
+
+        Args:
+            bboxes (tensor): region corners of shape
+                (batch_size, num_frames, num_regions, 4, 2).
+        Returns:
+            tubes (tensor): tube corners of shape
+                (batch_size, num_frames / tube_window, num_regions, 4, 2), in
+                the same corner order as the frame boxes.
+        """
+        batch_size, num_frames, num_regions = bboxes.shape[:3]
+        corners = bboxes.reshape(
+            (batch_size, -1, self.tube_window, num_regions, 4, 2)
+        )
+        top_left = corners[:, :, :, :, 0].amin(dim=2)
+        bottom_right = corners[:, :, :, :, 2].amax(dim=2)
+        x_min, y_min = top_left.unbind(-1)
+        x_max, y_max = bottom_right.unbind(-1)
+        return torch.stack(
+            (
+                top_left,
+                torch.stack((x_max, y_min), dim=-1),
+                bottom_right,
+                torch.stack((x_min, y_max), dim=-1),
+            ),
+            dim=3,
+        )
+
+    def tube_region_features(self, frames, bboxes):
+        """
+        Computes one region feature per RoI tube. In the `roi` region mode the
+        backbone feature maps are averaged over every window and RoI aligned
+        once with the tube boxes. In the `crop` mode the pixel crops of the
+        tube boxes are averaged over every window before the backbone.
+
+        Args:
+            frames (tensor): clip of shape (batch_size, 3, num_frames, H, W).
+            bboxes (tensor): region corners of shape
+                (batch_size, num_frames, num_regions, 4, 2).
+        Returns:
+            feature_maps (tensor): region features of shape
+                (batch_size, num_frames / tube_window, num_regions,
+                feature_size).
+        """
+        tubes = self.tube_boxes(bboxes)
+        batch_size, num_tubes, regions = tubes.shape[:3]
+        if self.region_mode == "crop":
+            crops = self.crop_regions(
+                frames,
+                tubes.repeat_interleave(self.tube_window, dim=1),
+                self.region_crop_size,
+            )
+            crops = crops.reshape(
+                (batch_size, num_tubes, self.tube_window, regions)
+                + crops.shape[1:]
+            )
+            feature_maps = F.adaptive_avg_pool2d(
+                self.backbone(crops.mean(2).flatten(0, 2)), self.roi_align_size
+            )
+            return feature_maps.reshape((batch_size, num_tubes, regions, -1))
+
+        features = self.extract_features(frames)
+        batch_size, channels, _, height, width = features.shape
+        features = features.reshape(
+            (batch_size, channels, num_tubes, self.tube_window, height, width)
+        ).mean(3)
+        return self.region_features(features, tubes)
+
+    def crop_regions(self, frames, bboxes, crop_size):
+        """
+        Crops every region out of the frames and resizes it bilinearly.
+
+        Args:
+            frames (tensor): clip of shape (batch_size, 3, num_frames, H, W),
+                with H == W, the region corners being given for a 256 pixel
+                wide frame.
+            bboxes (tensor): region corners of shape
+                (batch_size, num_frames, num_regions, 4, 2).
+            crop_size (int): size of the crops in pixels.
+        Returns:
+            crops (tensor): normalized crops of shape
+                (batch_size * num_frames * num_regions, 3, crop_size,
+                crop_size).
+        """
+        x = frames.permute((0, 2, 1, 3, 4)).flatten(0, 1)
+        x = transforms.functional.normalize(x, self.pixel_mean, self.pixel_std)
+        boxes = self.format_boxes(bboxes, 256).to(x.device)
+        return roi_align(
+            x, boxes, crop_size, spatial_scale=x.shape[-1] / 256, aligned=True
+        )
+
+    def crop_region_features(self, frames, bboxes):
+        """
+        Runs the backbone on region_crop_size pixel crops of the regions
+        only, instead of on the full frames.
+
+        Args:
+            frames (tensor): clip of shape (batch_size, 3, num_frames, H, W).
+            bboxes (tensor): region corners of shape
+                (batch_size, num_frames, num_regions, 4, 2).
+        Returns:
+            feature_maps (tensor): region features of shape
+                (batch_size, num_frames, num_regions, feature_size).
+        """
+        batch_size, frames_per_clip, regions = bboxes.shape[:3]
+        crops = self.crop_regions(frames, bboxes, self.region_crop_size)
+        feature_maps = F.adaptive_avg_pool2d(
+            self.backbone(crops), self.roi_align_size
+        )
+        return feature_maps.reshape((batch_size, frames_per_clip, regions, -1))
+
+    def frame_region_features(self, frames, bboxes):
+        """
+        Computes the region features of a clip with the configured region
+        mode, per frame or per RoI tube.
+
+        Args:
+            frames (tensor): clip of shape (batch_size, 3, num_frames, H, W).
+            bboxes (tensor): region corners of shape
+                (batch_size, num_frames, num_regions, 4, 2).
+        Returns:
+            feature_maps (tensor): region features of shape
+                (batch_size, num_time_steps, num_regions, feature_size).
+        """
+        if self.roi_tube:
+            return self.tube_region_features(frames, bboxes)
+        if self.region_mode == "crop":
+            return self.crop_region_features(frames, bboxes)
+        return self.region_features(self.extract_features(frames), bboxes)
+
+    def head(self, feature_maps):
+        """
+        Aggregates the region features over regions and time and classifies
+        them.
+
+        Args:
+            feature_maps (tensor): region features of shape
+                (batch_size, num_time_steps, num_regions, feature_size).
+        """
+        batch_size = feature_maps.shape[0]
+        if self.token_proj is not None:
+            feature_maps = self.token_proj(feature_maps)
+        x = self.st_func[self.st_name](feature_maps)
 
-        # shape of bboxes: (16, 8, 14, 4, 2) ---> (batch_size, frames, regions, bounding box corners, coordinattes)
-        batch_size = bboxes.shape[0]
-        print("bs", bboxes.shape)
-        frames = bboxes.shape[1]
-        regions = bboxes.shape[2]
-        corners = bboxes.shape[3]
-        coords = bboxes.shape[4]
-
-        formatted_bboxes = []
-        for elt in range(batch_size):
-            for frame in range(frames):
-                for region in range(regions):
-                    x_min, y_min = bboxes[elt][frame][region][0][0], bboxes[elt][frame][region][0][1]
-                    x_max, y_max = bboxes[elt][frame][region][2][0], bboxes[elt][frame][region][2][1]
-
-                    scale_factor = 256 / fmap_dim
-
-                    ### DEBUG ###
-                    # assert scale_factor == 36.5714285714
-                    #############
-
-                    x_min, y_min = x_min // scale_factor, y_min // scale_factor
-                    x_max, y_max = x_max // scale_factor, y_max // scale_factor
-
-                    formatted_bboxes.append([elt*frames + frame, x_min, y_min, x_max, y_max])
-
-        formatted_bboxes = torch.Tensor(formatted_bboxes)
-        formatted_bboxes = formatted_bboxes.to(device='cuda')
-        print("bbox size formatted", formatted_bboxes.shape)
-        batch_size = z[0].shape[0]
-        num_frames = z[0].shape[1]
-        z = [z[0].reshape((batch_size*num_frames, z[0].shape[2], z[0].shape[3], z[0].shape[4]))]
-        print("Z", z[0].shape)
-        # feature maps size: (batch_size*frames*regions, num_feature_maps, fmap_dim, fmap_dim)
-        feature_maps = roi_align(z[0], formatted_bboxes, self.roi_align_size)
-        feature_maps = feature_maps.reshape((batch_size, frames, regions, -1))
-        print("Feature map size", feature_maps.shape)
-        
-        if self.image_variant == "video":
-            video_level_features = x[0].reshape((batch_size, frames, regions, -1))
-            print("yas", video_level_features.shape)
-            video_level_features = self.proj(video_level_features)
-            video_level_features = self.st_func["_".join(self.st_config)](video_level_features)
-            video_level_features = video_level_features.reshape((batch_size, -1))
-            x = torch.squeeze(video_level_features)
-            x = x.reshape((batch_size, -1))
-            print(x.shape)
-            out = self.image_mlp(x)
-            out = self.out_batchnorm(out)
-            out = self.act(out)
-            return out
-       
         if self.image_variant == "region":
-            feature_maps = self.st_func["_".join(self.st_config)](feature_maps)
-            print(feature_maps.shape)
-            feature_maps = feature_maps.reshape((batch_size, -1))
-            out = self.image_mlp(feature_maps)
-            out = self.out_batchnorm(out)
-            out = self.act(out)
-            return out
-        
-        if self.image_variant == "video+region":
-            # final_cls = self.region_attention_temporal_pool(feature_maps)
-            print(x[0].shape)
-            #video_level_features = self.temporal_pool(x[0])
-            #video_level_features = self.temporal_pool(video_level_features)
-            #video_level_features = self.temporal_pool(video_level_features)
-            #print("pooled", video_level_features.shape)
-            video_level_features = x[0].reshape((batch_size, frames, regions, -1))
-            #video_level_features = torch.cat((video_level_features, feature_maps), dim=3)
-            print("concated", video_level_features.shape)
-            video_level_features = self.proj(video_level_features)
-            video_level_features = self.st_func["_".join(self.st_config)](video_level_features)
-            feature_maps = self.st_func["_".join(self.st_config)](feature_maps)
-            print(feature_maps.shape)
-            feature_maps = feature_maps.reshape((batch_size, -1))
-            video_level_features = feature_maps.reshape((batch_size, -1))
-            feature_maps = torch.cat((video_level_features, feature_maps), dim=1)
-            print(feature_maps.shape)
-            out = self.image_mlp(feature_maps)
-            out = self.out_batchnorm(out)
-            out = self.act(out)
-            
-            return out
+            out = self.image_mlp(x.reshape((batch_size, -1)))
+        elif self.image_variant == "video+region":
+            # The video level features have always been overwritten by the
+            # region features here, so the classifier sees the aggregated
+            # region features twice and the video branch is not computed.
+            x = x.reshape((batch_size, -1))
+            out = self.image_mlp(torch.cat((x, x), dim=1))
+        else:
+            out = self.cls_head(x)
+        return self._output(out)
 
-        if self.st_config is not None:
-            final_cls = self.st_func["_".join(self.st_config)](feature_maps)
-            
-        
+    def forward(self, x, bboxes):
+        if self.image_variant != "video":
+            return self.head(self.frame_region_features(x[0], bboxes))
+
+        features = self.extract_features(x[0])
+
+        # shape of bboxes: (16, 8, 14, 4, 2) ---> (batch_size, frames, regions, bounding box corners, coordinattes)
+        batch_size, frames, regions = bboxes.shape[:3]
 
-        #################################### DEBUG ####################################
-        if torch.equal(final_cls[0], final_cls[1]) and torch.equal(final_cls[1], final_cls[2]) and torch.equal(final_cls[2], final_cls[3]):
-            # raise error 
-            1/0
-        ###############################################################################
- 
-        out = self.cls_head(final_cls)
+        video_level_features = features.reshape((batch_size, frames, regions, -1))
+        video_level_features = self.proj(video_level_features)
+        video_level_features = self.st_func[self.st_name](video_level_features)
+        out = self.image_mlp(video_level_features.reshape((batch_size, -1)))
+        return self._output(out)
 
+    def _output(self, out):
         if self.use_bn:
             out = self.out_batchnorm(out)
 
@@ -1105,6 +1318,11 @@ class X3D(nn.Module):
                 / (len(self.block_basis) + 1),
             )
             dim_in = dim_out
+            if cfg.MODEL.ACT_CHECKPOINT and not is_frozen(
+                prefix, cfg.TRAIN.FROZEN_MODULES
+            ):
+                validate_checkpoint_wrapper_import(checkpoint_wrapper)
+                s = checkpoint_wrapper(s)
             self.add_module(prefix, s)
 
         if self.enable_detection:
@@ -1295,7 +1513,9 @@ class MViT(nn.Module):
                 has_cls_embed=self.cls_embed_on,
                 pool_first=pool_first,
             )
-            if cfg.MODEL.ACT_CHECKPOINT:
+            if cfg.MODEL.ACT_CHECKPOINT and not is_frozen(
+                "blocks.{}".format(i), cfg.TRAIN.FROZEN_MODULES
+            ):
                 attention_block = checkpoint_wrapper(attention_block)
             self.blocks.append(attention_block)
 
@@ -3,16 +3,30 @@
 Functions for benchmarks.
 """
 
+import json
 import numpy as np
+import os
 import pprint
+import psutil
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
 import torch
 import tqdm
 from fvcore.common.timer import Timer
+from torch.utils.data._utils.collate import default_collate
 
+import slowfast.models.losses as losses
 import slowfast.utils.logging as logging
 import slowfast.utils.misc as misc
 from slowfast.datasets import loader
-from slowfast.utils.env import setup_environment
+from slowfast.datasets import pd_decoder as decoder
+from slowfast.datasets import utils as data_utils
+from slowfast.datasets.build import build_dataset
+from slowfast.models import build_model
+from slowfast.models.utils import freeze_modules
+from slowfast.utils.env import pathmgr, setup_environment
 
 logger = logging.get_logger(__name__)
 
@@ -101,3 +115,342 @@ def benchmark_data_loading(cfg):
             np.std(epoch_times),
         )
     )
+
+
+# Stages of the PD pipeline timed per sample and per batch, in order.
+SAMPLE_STAGES = [
+    "container_open",
+    "decode",
+    "temporal_sampling",
+    "keypoint_load",
+    "box_build",
+    "spatial_transform",
+]
+BATCH_STAGES = [
+    "collate",
+    "h2d_copy",
+    "backbone_forward",
+    "roi_align",
+    "attention_head",
+    "backward",
+]
+
+# Width of the frames the region boxes are given in.
+_BOX_FRAME_SIZE = 256
+
+
+class PeakRss(object):
+    """
+    Samples the RSS of the process in a thread, to measure the peak RSS of a
+    block alone: ru_maxrss also counts the peaks before the block, e.g. while
+    building the model.
+    """
+
+    def __init__(self, interval=0.002):
+        """
+        Args:
+            interval (float): time (s) between two samples.
+        """
+        self.interval = interval
+        self.peak = 0
+        self._process = psutil.Process()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while True:
+            self.peak = max(self.peak, self._process.memory_info().rss)
+            if self._done.wait(self.interval):
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._done.set()
+        self._thread.join()
+        # The last sample, in case the block ended at its peak.
+        self.peak = max(self.peak, self._process.memory_info().rss)
+
+
+class StageTimer(object):
+    """
+    Collects the wall clock times of the stages of a pipeline. Cuda is
+    synchronized around every stage so that the asynchronous kernels are
+    counted in the stage that launched them.
+    """
+
+    def __init__(self, device):
+        """
+        Args:
+            device (torch.device): device the stages run on.
+        """
+        self.device = device
+        self.times = defaultdict(list)
+        # Warm up iterations are run but not recorded.
+        self.enabled = True
+
+    def _synchronize(self):
+        if self.device.type == "cuda":
+            torch.cuda.synchronize(self.device)
+
+    @contextmanager
+    def stage(self, name):
+        self._synchronize()
+        start = time.perf_counter()
+        yield
+        self._synchronize()
+        if self.enabled:
+            self.times[name].append(time.perf_counter() - start)
+
+    def summary(self, percentiles):
+        """
+        Args:
+            percentiles (list): percentiles of the times to report.
+        Returns:
+            stats (dict): number of runs, mean, std and percentiles (ms) of
+                every timed stage.
+        """
+        stats = {}
+        for name, times in self.times.items():
+            times = np.asarray(times) * 1000
+            stats[name] = {
+                "count": len(times),
+                "mean_ms": float(times.mean()),
+                "std_ms": float(times.std()),
+            }
+            for p in percentiles:
+                stats[name]["p{}_ms".format(p)] = float(np.percentile(times, p))
+        return stats
+
+
+def forward_latency(model, inputs, num_iters, device, num_warmup=1):
+    """
+    Mean forward latency of a model, in ms, after warm up passes. Cuda is
+    synchronized around every pass.
+    Args:
+        model (model): the model to time.
+        inputs (list): arguments of the model forward.
+        num_iters (int): number of timed passes.
+        device (torch.device): device the model runs on.
+        num_warmup (int): number of untimed passes.
+    """
+    timer = StageTimer(device)
+    for cur_iter in range(num_warmup + num_iters):
+        timer.enabled = cur_iter >= num_warmup
+        with timer.stage("forward"):
+            model(*inputs)
+    return timer.summary([])["forward"]["mean_ms"]
+
+
+def _synthetic_video(cfg):
+    """
+    Random decoded frames of a video long enough for one clip, and random
+    keypoints of its regions.
+    """
+    num_frames = cfg.DATA.NUM_FRAMES * cfg.DATA.SAMPLING_RATE
+    size = cfg.DATA.TRAIN_JITTER_SCALES[0]
+    frames = torch.randint(
+        0, 256, (num_frames, size, size, 3), dtype=torch.uint8
+    )
+    points = np.random.randint(
+        0, _BOX_FRAME_SIZE, (num_frames, cfg.PD.NUM_REGIONS, 4, 2)
+    )
+    kpts = {
+        "frame{}".format(i): points[i].tolist() for i in range(num_frames)
+    }
+    return frames, kpts
+
+
+def _load_sample(cfg, dataset, index, timer):
+    """
+    Loads a train sample with the stages of Kinetics.__getitem__, timing every
+    stage. With BENCHMARK.SYNTHETIC, the decoded frames and keypoints are
+    random and the container open, decode and keypoint load stages are
+    skipped.
+    Args:
+        cfg (CfgNode): configs.
+        dataset (Dataset): train dataset, None if synthetic.
+        index (int): index of the video.
+        timer (StageTimer): timer of the stages.
+    Returns:
+        sample (tuple): the sample, as returned by the dataset.
+    """
+    scale = cfg.DATA.TRAIN_JITTER_SCALES[0]
+    if dataset is None:
+        frames, kpts = _synthetic_video(cfg)
+        label = index % cfg.MODEL.NUM_CLASSES
+        with timer.stage("temporal_sampling"):
+            frames, frame_nums = decoder.sample_clips(
+                [frames],
+                cfg.DATA.TARGET_FPS,
+                False,
+                None,
+                [cfg.DATA.SAMPLING_RATE],
+                [cfg.DATA.NUM_FRAMES],
+                cfg.DATA.TARGET_FPS,
+            )
+        with timer.stage("box_build"):
+            bboxes = data_utils.region_boxes(kpts, frame_nums[0].tolist())
+        with timer.stage("spatial_transform"):
+            frames = data_utils.transform_clip(
+                cfg,
+                frames[0],
+                -1,
+                scale,
+                scale,
+                _BOX_FRAME_SIZE,
+                motion_shift=cfg.DATA.TRAIN_JITTER_MOTION_SHIFT,
+            )
+    else:
+        path = dataset._path_to_videos[index]
+        label = dataset._labels[index]
+        with timer.stage("container_open"):
+            video_container = dataset._open_video(index)
+        assert video_container is not None, "Failed to open {}".format(path)
+        with timer.stage("decode"):
+            decoded = dataset._decode_video(index, video_container, -1, scale)
+        with timer.stage("temporal_sampling"):
+            frames, _, frame_nums = dataset._temporal_sample(decoded)
+        assert frames is not None, "Failed to decode {}".format(path)
+        # Time the load of the keypoints, not their cache.
+        dataset.kpts.pop(path, None)
+        with timer.stage("keypoint_load"):
+            dataset._get_kpts(index)
+        with timer.stage("box_build"):
+            bboxes = dataset._get_region_boxes(index, frame_nums[0].tolist())
+        with timer.stage("spatial_transform"):
+            frames = dataset._spatial_transform(
+                frames[0], -1, scale, scale, _BOX_FRAME_SIZE
+            )
+    if cfg.MODEL.NUM_CLASSES == 2 and label > 0:
+        label = 1
+    bboxes = torch.Tensor(bboxes)
+    return frames, label, index, frame_nums[0].numpy(), {}, bboxes
+
+
+def _model_step(model, loss_fun, inputs, labels, bboxes, timer):
+    """
+    Runs a train step of a PD region model one stage at a time: backbone,
+    RoI align, attention head, then the loss and backward. With ROI_TUBE the
+    window pooling and RoI align of the tubes are counted in the backbone.
+    """
+    frames = inputs[0]
+    if model.roi_tube:
+        with timer.stage("backbone_forward"):
+            feature_maps = model.tube_region_features(frames, bboxes)
+    elif model.region_mode == "crop":
+        # The regions are RoI aligned out of the pixels before the backbone.
+        with timer.stage("roi_align"):
+            crops = model.crop_regions(frames, bboxes, model.region_crop_size)
+        with timer.stage("backbone_forward"):
+            feature_maps = torch.nn.functional.adaptive_avg_pool2d(
+                model.backbone(crops), model.roi_align_size
+            ).reshape(bboxes.shape[:3] + (-1,))
+    else:
+        with timer.stage("backbone_forward"):
+            features = model.extract_features(frames)
+        with timer.stage("roi_align"):
+            feature_maps = model.region_features(features, bboxes)
+    with timer.stage("attention_head"):
+        preds = model.head(feature_maps)
+    with timer.stage("backward"):
+        loss_fun(preds, labels).backward()
+    model.zero_grad(set_to_none=True)
+
+
+def benchmark_pipeline(cfg):
+    """
+    Time every stage of the PD train path separately, from opening the video
+    container to the backward pass, on the train split or on synthetic
+    frames and boxes (BENCHMARK.SYNTHETIC), with a random backbone then. The
+    samples are loaded in the main process, one stage at a time. The times
+    are logged and written as json to BENCHMARK.OUTPUT_FILE in OUTPUT_DIR.
+    Args:
+        cfg (CfgNode): configs. Details can be found in
+            slowfast/config/defaults.py
+    Returns:
+        stats (dict): settings and per stage times (ms) of the benchmark.
+    """
+    setup_environment()
+    np.random.seed(cfg.RNG_SEED)
+    torch.manual_seed(cfg.RNG_SEED)
+    logging.setup_logging(cfg.OUTPUT_DIR)
+    logger.info("Benchmark the PD pipeline with config:")
+    logger.info(pprint.pformat(cfg))
+
+    cfg.NUM_GPUS = min(cfg.NUM_GPUS, 1)
+    if cfg.BENCHMARK.SYNTHETIC:
+        # The times do not depend on the weights, run offline.
+        cfg.PD.BACKBONE_PRETRAINED = False
+    device = torch.device("cuda" if cfg.NUM_GPUS else "cpu")
+    model = build_model(cfg)
+    assert (
+        hasattr(model, "frame_region_features")
+        and model.image_variant != "video"
+    ), "The pipeline benchmark needs a PD region model."
+    if cfg.TRAIN.FROZEN_MODULES:
+        freeze_modules(model, cfg.TRAIN.FROZEN_MODULES)
+    model.train()
+    loss_fun = losses.get_loss_func(cfg.MODEL.LOSS_FUNC)(reduction="mean")
+    dataset = None
+    if not cfg.BENCHMARK.SYNTHETIC:
+        dataset = build_dataset(cfg.TRAIN.DATASET, cfg, "train")
+
+    timer = StageTimer(device)
+    batch_size = cfg.TRAIN.BATCH_SIZE
+    num_warmup = cfg.BENCHMARK.WARMUP_ITERS
+    for cur_iter in tqdm.tqdm(range(num_warmup + cfg.BENCHMARK.NUM_ITERS)):
+        timer.enabled = cur_iter >= num_warmup
+        if dataset is None:
+            indices = range(batch_size)
+        else:
+            indices = np.random.randint(0, len(dataset), batch_size)
+        samples = [
+            _load_sample(cfg, dataset, int(index), timer) for index in indices
+        ]
+        with timer.stage("collate"):
+            inputs, labels, _, _, _, bboxes = default_collate(samples)
+        if device.type == "cuda":
+            with timer.stage("h2d_copy"):
+                inputs = [x.cuda(non_blocking=True) for x in inputs]
+                labels = labels.cuda(non_blocking=True)
+                bboxes = bboxes.cuda(non_blocking=True)
+        _model_step(model, loss_fun, inputs, labels, bboxes, timer)
+
+    summary = timer.summary(cfg.BENCHMARK.PERCENTILES)
+    stats = {
+        "model": cfg.MODEL.MODEL_NAME,
+        "device": device.type,
+        "torch_version": torch.__version__,
+        "synthetic": cfg.BENCHMARK.SYNTHETIC,
+        "batch_size": batch_size,
+        "num_frames": cfg.DATA.NUM_FRAMES,
+        "num_iters": cfg.BENCHMARK.NUM_ITERS,
+        "time": time.time(),
+        "sample_stages": {
+            name: summary[name] for name in SAMPLE_STAGES if name in summary
+        },
+        "batch_stages": {
+            name: summary[name] for name in BATCH_STAGES if name in summary
+        },
+    }
+    for unit in ["sample", "batch"]:
+        for name, times in stats[unit + "_stages"].items():
+            logger.info(
+                "{:>18} (per {}): {:9.2f} ms mean, {}".format(
+                    name,
+                    unit,
+                    times["mean_ms"],
+                    ", ".join(
+                        "p{} {:.2f}".format(p, times["p{}_ms".format(p)])
+                        for p in cfg.BENCHMARK.PERCENTILES
+                    ),
+                )
+            )
+    path = os.path.join(cfg.OUTPUT_DIR, cfg.BENCHMARK.OUTPUT_FILE)
+    with pathmgr.open(path, "w") as f:
+        json.dump(stats, f, indent=2)
+    logger.info("Wrote the pipeline benchmark to {}".format(path))
+    return stats
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+
+"""Streaming binary classification metrics."""
+
+import torch
+
+import slowfast.utils.distributed as du
+
+
+def outputs_probabilities(cfg, training):
+    """
+    Whether a model outputs class probabilities rather than logits. The PD
+    region model applies its softmax in training too, the other models only
+    in evaluation.
+    Args:
+        cfg (CfgNode): configs of the model.
+        training (bool): whether the model is in training mode.
+    """
+    if cfg.MODEL.MODEL_NAME == "ResNet":
+        return cfg.PD.USE_SOFTMAX
+    return not training
+
+
+def positive_scores(preds, is_prob=True):
+    """
+    Score of the positive class, i.e. of the labels above 0, of class
+    predictions.
+    Args:
+        preds (tensor): predictions of shape (N, num_classes), probabilities
+            or sums of probabilities if is_prob, logits otherwise.
+        is_prob (bool): whether the predictions are probabilities.
+    Returns:
+        scores (tensor): positive scores of shape (N,), in [0, 1].
+    """
+    preds = preds.detach().float()
+    if is_prob:
+        probs = preds / preds.sum(dim=1, keepdim=True).clamp(min=1e-12)
+    else:
+        probs = preds.softmax(dim=1)
+    return 1.0 - probs[:, 0]
+
+
+def _curve_areas(tps, fps):
+    """
+    Areas under the ROC and precision recall curves, given the numbers of
+    true and false positives at decreasing thresholds. As with sklearn's
+    roc_curve / precision_recall_curve and auc, the areas are integrated with
+    the trapezoidal rule and the PR curve starts at a precision of 1.
+    """
+    tps, fps = tps.double(), fps.double()
+    zero = tps.new_zeros(1)
+    tpr = torch.cat((zero, tps / tps[-1]))
+    fpr = torch.cat((zero, fps / fps[-1]))
+    auroc = torch.trapz(tpr, fpr).item()
+
+    seen = (tps + fps) > 0
+    precision = torch.cat((zero + 1, tps[seen] / (tps + fps)[seen]))
+    recall = torch.cat((zero, tps[seen] / tps[-1]))
+    auprc = torch.trapz(precision, recall).item()
+    return auroc, auprc
+
+
+class BinaryMetrics(object):
+    """
+    Accumulates the positive scores and labels of batches and computes the
+    AUROC, AUPRC and the F1, sensitivity and specificity at a threshold. By
+    default the scores are counted in a histogram on the device of the
+    predictions, so that the update costs a single index_add_ and the state
+    of all the processes is merged with a single all-reduce. The curves are
+    then exact up to the ties within a bin. In the exact mode, all the scores
+    are kept and gathered instead.
+    """
+
+    def __init__(self, num_bins=1000, threshold=0.5, exact=False, device=None):
+        """
+        Args:
+            num_bins (int): number of histogram bins of the scores.
+            threshold (float): positive score above which a sample is
+                predicted positive.
+            exact (bool): if True, keep all the scores to compute the exact
+                curves.
+            device (torch.device): device of the counts, the one of the
+                predictions.
+        """
+        self.num_bins = num_bins
+        self.threshold = threshold
+        self.exact = exact
+        self.device = device
+        self.reset()
+
+    def reset(self):
+        """
+        Reset the metrics.
+        """
+        # Histogram of the scores of the negatives and the positives,
+        # followed by the confusion matrix at the threshold, indexed by
+        # 2 * label + prediction.
+        self.counts = torch.zeros(
+            2 * self.num_bins + 4, dtype=torch.long, device=self.device
+        )
+        self.scores = []
+        self.labels = []
+
+    def update(self, scores, labels):
+        """
+        Add a batch.
+        Args:
+            scores (tensor): positive scores of shape (N,), in [0, 1].
+            labels (tensor): labels of shape (N,), positive if above 0.
+        """
+        scores = scores.detach().float().clamp(0.0, 1.0).to(self.counts.device)
+        labels = (labels.detach() > 0).long().to(self.counts.device)
+        bins = (scores * self.num_bins).long().clamp(max=self.num_bins - 1)
+        preds = (scores > self.threshold).long()
+        index = torch.cat(
+            (
+                labels * self.num_bins + bins,
+                2 * self.num_bins + 2 * labels + preds,
+            )
+        )
+        self.counts.index_add_(0, index, torch.ones_like(index))
+        if self.exact:
+            self.scores.append(scores)
+            self.labels.append(labels)
+
+    def merge(self):
+        """
+        Merge the metrics of all the processes. Must be called by all of
+        them.
+        """
+        if du.get_world_size() == 1:
+            return
+        du.all_reduce([self.counts], average=False)
+        if self.exact:
+            scores = torch.cat(self.scores).cpu() if self.scores else None
+            labels = torch.cat(self.labels).cpu() if self.labels else None
+            gathered = du.all_gather_unaligned((scores, labels))
+            self.scores = [s for s, _ in gathered if s is not None]
+            self.labels = [l for _, l in gathered if l is not None]
+
+    def compute(self):
+        """
+        Returns:
+            stats (dict): the AUROC and AUPRC, if both classes were seen, and
+                the accuracy, precision, sensitivity, specificity and F1 at
+                the threshold. The rates are in [0, 1].
+        """
+        counts = self.counts.cpu()
+        tn, fp, fn, tp = counts[2 * self.num_bins :].double().tolist()
+        stats = {
+            "accuracy": (tp + tn) / max(tp + tn + fp + fn, 1),
+            "precision": tp / max(tp + fp, 1),
+            "sensitivity": tp / max(tp + fn, 1),
+            "specificity": tn / max(tn + fp, 1),
+            "f1": 2 * tp / max(2 * tp + fp + fn, 1),
+        }
+        if tp + fn == 0 or tn + fp == 0:
+            return stats
+
+        if self.exact:
+            scores = torch.cat([s.cpu() for s in self.scores])
+            labels = torch.cat([l.cpu() for l in self.labels])
+            scores, order = scores.sort(descending=True)
+            tps = labels[order].cumsum(0)
+            # Last sample of every distinct score.
+            last = torch.cat(
+                (
+                    (scores[1:] != scores[:-1]).nonzero().flatten(),
+                    torch.tensor([len(scores) - 1]),
+                )
+            )
+            tps = tps[last]
+            fps = last + 1 - tps
+        else:
+            hist = counts[: 2 * self.num_bins].view(2, self.num_bins)
+            # From the highest to the lowest bin.
+            tps = hist[1].flip(0).cumsum(0)
+            fps = hist[0].flip(0).cumsum(0)
+        stats["auroc"], stats["auprc"] = _curve_areas(tps, fps)
+        return stats
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+
+"""Bootstrap confidence intervals of binary classification metrics."""
+
+import os
+import re
+import torch
+
+
+def resample_weights(
+    labels, num_samples, groups=None, stratify=True, generator=None
+):
+    """
+    Draw bootstrap resamples of a test set as weights, the number of times
+    every video is drawn in every resample.
+    Args:
+        labels (tensor): binary labels of shape (N,).
+        num_samples (int): number of resamples.
+        groups (tensor): group, e.g. subject, index of every video, of shape
+            (N,). The groups are resampled as a whole. None to resample the
+            videos.
+        stratify (bool): if True, resample the positive and negative groups
+            separately, so that every resample keeps their numbers. A group
+            with a positive video is a positive one.
+        generator (torch.Generator): random generator.
+    Returns:
+        weights (tensor): weights of shape (num_samples, N).
+    """
+    labels = labels.long()
+    if groups is None:
+        groups = torch.arange(len(labels))
+    _, groups = torch.unique(groups, return_inverse=True)
+    num_groups = int(groups.max()) + 1
+    # Label of every group, positive if any of its videos is.
+    group_labels = (
+        torch.zeros(num_groups, dtype=torch.long).index_add_(0, groups, labels)
+        > 0
+    ).long()
+    strata = group_labels if stratify else torch.zeros_like(group_labels)
+
+    counts = torch.zeros(num_samples, num_groups)
+    for stratum in strata.unique():
+        members = (strata == stratum).nonzero().flatten()
+        draws = torch.randint(
+            len(members),
+            (num_samples, len(members)),
+            generator=generator,
+        )
+        counts.scatter_add_(
+            1, members[draws], torch.ones(num_samples, len(members))
+        )
+    return counts[:, groups]
+
+
+def weighted_metrics(scores, labels, weights, threshold=0.5):
+    """
+    AUROC, AUPRC and accuracy of every weighting of a test set at once. The
+    AUROC is the rank based (Mann-Whitney) one with the tied pairs counted
+    half, and the AUPRC is the trapezoidal area under the precision recall
+    curve, as in test_net.
+    Args:
+        scores (tensor): positive scores of shape (N,).
+        labels (tensor): binary labels of shape (N,).
+        weights (tensor): weights of shape (B, N).
+        threshold (float): positive score above which a video is predicted
+            positive.
+    Returns:
+        metrics (dict): the auroc, auprc and accuracy tensors of shape (B,),
+            NaN where a resample misses a class.
+    """
+    scores, labels = scores.double(), labels.double()
+    weights = weights.double()
+    accuracy = (weights * ((scores > threshold).double() == labels)).sum(
+        1
+    ) / weights.sum(1)
+
+    scores, order = scores.sort(descending=True)
+    labels, weights = labels[order], weights[:, order]
+    # Rank of every video among the distinct scores, from the highest one.
+    _, ranks = torch.unique_consecutive(scores, return_inverse=True)
+    num_ranks = int(ranks.max()) + 1
+    pos = weights.new_zeros(len(weights), num_ranks)
+    neg = weights.new_zeros(len(weights), num_ranks)
+    pos.index_add_(1, ranks, weights * labels)
+    neg.index_add_(1, ranks, weights * (1.0 - labels))
+    tps, fps = pos.cumsum(1), neg.cumsum(1)
+    num_pos, num_neg = tps[:, -1], fps[:, -1]
+
+    # Negatives ranked below every positive, plus half of the tied ones.
+    wins = (pos * (num_neg[:, None] - fps + 0.5 * neg)).sum(1)
+    auroc = wins / (num_pos * num_neg)
+
+    seen = tps + fps
+    precision = torch.where(seen > 0, tps / seen.clamp(min=1e-12), 1.0)
+    recall = tps / num_pos[:, None]
+    auprc = torch.trapz(
+        torch.cat((precision.new_ones(len(weights), 1), precision), 1),
+        torch.cat((recall.new_zeros(len(weights), 1), recall), 1),
+        dim=1,
+    )
+    undefined = (num_pos == 0) | (num_neg == 0)
+    return {
+        "auroc": auroc.masked_fill(undefined, float("nan")),
+        "auprc": auprc.masked_fill(undefined, float("nan")),
+        "accuracy": accuracy,
+    }
+
+
+def bootstrap_intervals(
+    scores,
+    labels,
+    num_samples=10000,
+    level=0.95,
+    groups=None,
+    stratify=True,
+    threshold=0.5,
+    seed=0,
+):
+    """
+    Percentile bootstrap confidence intervals of the test metrics.
+    Args:
+        scores (tensor): positive scores of shape (N,).
+        labels (tensor): labels of shape (N,), positive if above 0.
+        num_samples (int): number of resamples.
+        level (float): confidence level of the intervals.
+        groups (tensor): subject index of every video to resample the
+            subjects, or None to resample the videos.
+        stratify (bool): if True, keep the numbers of positive and negative
+            videos, or subjects, of the test set. The subjects with both
+            positive and negative videos are in the positive stratum, so
+            only the numbers of subjects are kept then.
+        threshold (float): positive score above which a video is predicted
+            positive.
+        seed (int): seed of the resampling.
+    Returns:
+        intervals (dict): (point estimate, lower bound, upper bound) of the
+            auroc, auprc and accuracy.
+    """
+    scores = torch.as_tensor(scores).cpu()
+    labels = (torch.as_tensor(labels).cpu() > 0).long()
+    generator = torch.Generator().manual_seed(seed)
+    weights = resample_weights(
+        labels, num_samples, groups, stratify, generator
+    )
+    points = weighted_metrics(
+        scores, labels, torch.ones(1, len(labels)), threshold
+    )
+    samples = weighted_metrics(scores, labels, weights, threshold)
+    alpha = (1.0 - level) / 2
+    quantiles = torch.tensor([alpha, 1.0 - alpha], dtype=torch.float64)
+    intervals = {}
+    for name, values in samples.items():
+        low, high = torch.nanquantile(values, quantiles).tolist()
+        intervals[name] = (points[name].item(), low, high)
+    return intervals
+
+
+def load_video_subjects(paths_to_videos, subjects_file):
+    """
+    Subject index of every video. The subjects file has one
+    `<video id> <subject>` line per video, the video id being the number of
+    the `video<id>_...` file names.
+    Args:
+        paths_to_videos (list): paths to the videos.
+        subjects_file (str): path to the subjects file.
+    Returns:
+        groups (tensor): subject index of every video.
+    """
+    subjects = {}
+    with open(subjects_file, "r") as f:
+        for line in f.read().splitlines():
+            if line.strip():
+                video_id, subject = line.split(maxsplit=1)
+                subjects[int(video_id)] = subject.strip()
+    names = []
+    for path in paths_to_videos:
+        video_id = re.match(r"video(\d+)", os.path.basename(path)).group(1)
+        names.append(subjects[int(video_id)])
+    return subject_index(names)
+
+
+def subject_index(names):
+    """
+    Index of the subject of every video among the sorted subjects.
+    Args:
+        names (list): subject of every video.
+    Returns:
+        groups (tensor): subject index of every video.
+    """
+    index = {name: i for i, name in enumerate(sorted(set(names)))}
+    return torch.tensor([index[name] for name in names])
+
+
+def format_intervals(intervals, level=0.95):
+    """
+    One line summary of the confidence intervals.
+    """
+    return "{:.0f}% CI {}".format(
+        level * 100,
+        ", ".join(
+            "{}: {:.3f} [{:.3f}, {:.3f}]".format(name, *interval)
+            for name, interval in intervals.items()
+        ),
+    )
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+
+"""Detect the train iterations stalled by the data loader and tune it."""
+
+import math
+import numpy as np
+import os
+import time
+
+import slowfast.utils.logging as logging
+from slowfast.datasets import loader
+from slowfast.datasets.loader import (
+    LATENCY_EDGES,
+    LATENCY_SUM,
+    MAX_RSS,
+    RSS,
+    TimedDataset,
+)
+
+logger = logging.get_logger(__name__)
+
+
+def histogram_percentiles(hist, percentiles):
+    """
+    Percentiles of a latency histogram of TimedDataset.
+    Args:
+        hist (ndarray): counts of the bins of LATENCY_EDGES.
+        percentiles (list): percentiles to compute.
+    Returns:
+        values (list): upper edge (s) of the bin of every percentile, None if
+            the histogram is empty.
+    """
+    cumulative = np.cumsum(hist)
+    if cumulative[-1] == 0:
+        return [None] * len(percentiles)
+    bins = np.searchsorted(
+        cumulative, np.asarray(percentiles) / 100 * cumulative[-1]
+    )
+    return LATENCY_EDGES[np.minimum(bins, len(LATENCY_EDGES) - 1)].tolist()
+
+
+def _queue_depth(iterator):
+    """
+    Number of batches ready in the queue of a multi-process loader iterator,
+    None if unknown.
+    """
+    queue = getattr(iterator, "_data_queue", None)
+    if queue is None:
+        return None
+    try:
+        return queue.qsize()
+    except NotImplementedError:
+        return None
+
+
+def _num_cpus():
+    """
+    Number of CPUs the process can run on.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count()
+
+
+class LoaderMonitor(object):
+    """
+    Measure the data wait and the ready batches of every iteration over a
+    loader, and the per worker __getitem__ latency and RSS when its dataset is
+    a TimedDataset, to report whether the iterations are input-bound.
+    """
+
+    def __init__(self, data_loader, cfg):
+        """
+        Args:
+            data_loader (loader): the monitored loader.
+            cfg (CfgNode): configs. Details can be found in
+                slowfast/config/defaults.py
+        """
+        self.loader = data_loader
+        self._cfg = cfg
+        self.reset()
+
+    def reset(self):
+        """
+        Reset the measures, including the ones of the workers.
+        """
+        # Data wait and compute time (s) and ready batches of every iteration.
+        self.waits = []
+        self.steps = []
+        self.depths = []
+        if isinstance(self.loader.dataset, TimedDataset):
+            self.loader.dataset.worker_stats()[:] = 0
+
+    def iterate(self):
+        """
+        Iterate over the loader, measuring every iteration.
+        Yields:
+            batch: the batches of the loader.
+        """
+        iterator = iter(self.loader)
+        last_end = None
+        while True:
+            depth = _queue_depth(iterator)
+            start = time.perf_counter()
+            if last_end is not None:
+                self.steps.append(start - last_end)
+            batch = next(iterator, None)
+            if batch is None:
+                return
+            last_end = time.perf_counter()
+            self.waits.append(last_end - start)
+            self.depths.append(depth)
+            yield batch
+
+    def _batch_size(self):
+        if self.loader.batch_size is not None:
+            return self.loader.batch_size
+        return int(self._cfg.TRAIN.BATCH_SIZE / max(1, self._cfg.NUM_GPUS))
+
+    def summary(self):
+        """
+        Returns:
+            stats (dict): data wait and compute time of the iterations, the
+                fraction of them waiting for data, the ready batches, the
+                __getitem__ latency and RSS of the workers, whether the
+                iterations are input-bound, and the recommended number of
+                workers and prefetch factor.
+        """
+        cfg = self._cfg
+        percentiles = cfg.LOADER_MONITOR.PERCENTILES
+        num_workers = cfg.DATA_LOADER.NUM_WORKERS
+        stats = {
+            "num_workers": num_workers,
+            "prefetch_factor": cfg.DATA_LOADER.PREFETCH_FACTOR,
+            "num_iters": len(self.waits),
+        }
+        if len(self.steps) == 0:
+            return stats
+        # The first wait includes the start of the workers.
+        stats["startup_s"] = self.waits[0]
+        waits = np.array(self.waits[1:] or self.waits)
+        steps = np.array(self.steps)
+        stats["wait_ms_mean"] = waits.mean() * 1000
+        for p, value in zip(percentiles, np.percentile(waits, percentiles)):
+            stats["wait_ms_p{}".format(p)] = value * 1000
+        stats["step_ms_mean"] = steps.mean() * 1000
+        wait_fraction = waits.sum() / (waits.sum() + steps.sum())
+        stats["wait_fraction"] = wait_fraction
+        stats["input_bound"] = bool(
+            wait_fraction > cfg.LOADER_MONITOR.INPUT_BOUND_RATIO
+        )
+        depths = [d for d in self.depths[1:] if d is not None]
+        if depths:
+            stats["ready_batches_mean"] = float(np.mean(depths))
+            # Iterations asking for a batch while none is ready.
+            stats["stall_fraction"] = float(np.mean(np.array(depths) == 0))
+
+        if not isinstance(self.loader.dataset, TimedDataset):
+            return stats
+        rows = self.loader.dataset.worker_stats()
+        hists = rows[:, : len(LATENCY_EDGES) + 1]
+        counts = hists.sum(1)
+        if counts.sum() == 0:
+            return stats
+        hist = hists.sum(0)
+        item_percentiles = histogram_percentiles(hist, percentiles)
+        item_mean = rows[:, LATENCY_SUM].sum() / counts.sum()
+        stats["getitem_ms_mean"] = item_mean * 1000
+        for p, value in zip(percentiles, item_percentiles):
+            stats["getitem_ms_p{}".format(p)] = value * 1000
+        active = counts > 0
+        stats["worker_items"] = counts[active].astype(int).tolist()
+        stats["worker_getitem_ms_mean"] = np.round(
+            rows[active, LATENCY_SUM] / counts[active] * 1000, 2
+        ).tolist()
+        stats["worker_getitem_ms_p{}".format(percentiles[-1])] = [
+            round(histogram_percentiles(h, percentiles[-1:])[0] * 1000, 2)
+            for h in hists[active]
+        ]
+        stats["worker_rss_mb_max"] = np.round(
+            rows[active, MAX_RSS] / 1024 ** 2, 1
+        ).tolist()
+        stats["workers_rss_mb"] = rows[active, RSS].sum() / 1024 ** 2
+
+        # Workers to load a batch per step with headroom. A batch with a slow
+        # item is late by the extra time of the item, which the batches ready
+        # in advance, one per step, have to cover.
+        batch_ms = self._batch_size() * stats["getitem_ms_mean"]
+        extra_ms = (item_percentiles[-1] - item_mean) * 1000
+        step_ms = max(stats["step_ms_mean"], 1e-3)
+        workers = max(
+            math.ceil(cfg.LOADER_MONITOR.HEADROOM * batch_ms / step_ms), 1
+        )
+        # The latency of the items grows with the contention of the workers,
+        # so an input-bound loader never needs fewer workers than it runs.
+        if stats["input_bound"]:
+            workers = max(workers, num_workers)
+        prefetch_factor = 1 + math.ceil(extra_ms / step_ms / workers)
+        prefetch_factor = max(prefetch_factor, 2)
+        # Without enough CPUs the loader is slower than the steps whatever its
+        # settings. The CPUs are shared by the processes of the GPUs.
+        stats["num_cpus"] = max(_num_cpus() // max(1, cfg.NUM_GPUS), 1)
+        stats["cpu_bound"] = workers > stats["num_cpus"]
+        stats["recommended_num_workers"] = workers
+        stats["recommended_prefetch_factor"] = prefetch_factor
+        return stats
+
+    def log_epoch_stats(self, cur_epoch):
+        """
+        Log the summary of the epoch and whether it was input-bound.
+        Args:
+            cur_epoch (int): the number of current epoch.
+        """
+        stats = self.summary()
+        if "input_bound" in stats:
+            logger.info(
+                "Epoch {}: {:.1%} of the train time waiting for data, {}."
+                " Recommended DATA_LOADER.NUM_WORKERS {} and"
+                " DATA_LOADER.PREFETCH_FACTOR {}.".format(
+                    cur_epoch + 1,
+                    stats["wait_fraction"],
+                    "input-bound"
+                    if stats["input_bound"]
+                    else "not input-bound",
+                    stats.get("recommended_num_workers", "unknown"),
+                    stats.get("recommended_prefetch_factor", "unknown"),
+                )
+            )
+        if stats.get("cpu_bound"):
+            logger.warning(
+                "The train steps need {} loader workers, more than the {} CPUs"
+                " of this process: the loader stays slower than the steps"
+                " until it gets more CPUs or cheaper samples.".format(
+                    stats["recommended_num_workers"], stats["num_cpus"]
+                )
+            )
+        stats["_type"] = "train_loader"
+        stats["epoch"] = "{}/{}".format(
+            cur_epoch + 1, self._cfg.SOLVER.MAX_EPOCH
+        )
+        logging.log_json_stats(stats, self._cfg.OUTPUT_DIR)
+
+
+def autotune(cfg):
+    """
+    Time the train loader with every combination of
+    LOADER_MONITOR.AUTOTUNE_WORKERS and LOADER_MONITOR.AUTOTUNE_PREFETCH, and
+    set DATA_LOADER.NUM_WORKERS and DATA_LOADER.PREFETCH_FACTOR to the
+    cheapest one loading at least LOADER_MONITOR.AUTOTUNE_TOLERANCE of the
+    best rate. The loader runs alone, so the rates are upper bounds of the
+    ones of training.
+    Args:
+        cfg (CfgNode): configs. Details can be found in
+            slowfast/config/defaults.py
+    Returns:
+        results (list): the number of workers, prefetch factor and rate
+            (batches per second) of every setting tried.
+    """
+    results = []
+    for num_workers in cfg.LOADER_MONITOR.AUTOTUNE_WORKERS:
+        for prefetch_factor in cfg.LOADER_MONITOR.AUTOTUNE_PREFETCH:
+            trial_cfg = cfg.clone()
+            trial_cfg.DATA_LOADER.NUM_WORKERS = num_workers
+            trial_cfg.DATA_LOADER.PREFETCH_FACTOR = prefetch_factor
+            trial_cfg.LOADER_MONITOR.ENABLE = False
+            iterator = iter(loader.construct_loader(trial_cfg, "train"))
+            # The first batch waits for the workers to start.
+            next(iterator, None)
+            num_batches = 0
+            start = time.perf_counter()
+            for _ in range(cfg.LOADER_MONITOR.AUTOTUNE_ITERS):
+                if next(iterator, None) is None:
+                    break
+                num_batches += 1
+            rate = num_batches / (time.perf_counter() - start)
+            del iterator
+            result = {
+                "_type": "loader_autotune",
+                "num_workers": num_workers,
+                "prefetch_factor": prefetch_factor,
+                "batches_per_s": rate,
+            }
+            logging.log_json_stats(result, cfg.OUTPUT_DIR)
+            results.append(result)
+            # Prefetching has no effect without workers.
+            if num_workers == 0:
+                break
+
+    best = max(result["batches_per_s"] for result in results)
+    chosen = min(
+        (
+            result
+            for result in results
+            if result["batches_per_s"]
+            >= cfg.LOADER_MONITOR.AUTOTUNE_TOLERANCE * best
+        ),
+        key=lambda result: (result["num_workers"], result["prefetch_factor"]),
+    )
+    cfg.DATA_LOADER.NUM_WORKERS = chosen["num_workers"]
+    cfg.DATA_LOADER.PREFETCH_FACTOR = chosen["prefetch_factor"]
+    logger.info(
+        "Auto-tuned the train loader to {} workers prefetching {} batches, "
+        "{:.2f} batches/s.".format(
+            chosen["num_workers"],
+            chosen["prefetch_factor"],
+            chosen["batches_per_s"],
+        )
+    )
+    return results
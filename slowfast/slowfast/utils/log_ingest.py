@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+
+"""
+Ingest the `json_stats: {...}` records of train and test logs into the
+results store. The logs are split into byte ranges scanned in parallel. Only
+the records of the selected types are matched, by a compiled regex over whole
+blocks of bytes, and their numeric stats are extracted by pyarrow string
+kernels over all the records at once instead of decoding every record.
+"""
+
+import ast
+import hashlib
+import os
+import re
+import pyarrow as pa
+import pyarrow.compute as pc
+import yaml
+from fvcore.common.config import CfgNode
+from multiprocessing import Pool
+
+import slowfast.utils.logging as logging
+from slowfast.utils.results_store import RunRecord
+
+logger = logging.get_logger(__name__)
+
+# Types (`_type` or `split`) of the records ingested by default. A type also
+# matches its suffixed variants, e.g. `train_iter_` or `val_epoch_ssl`.
+DEFAULT_TYPES = ("train_iter", "train_epoch", "val_epoch", "test_final")
+
+# Size of the byte ranges of the logs scanned by a worker.
+RANGE_BYTES = 64 * 1024 * 1024
+
+# End of the `Train with config:` / `Test with config:` line and prefix of the
+# next log record, followed by the config dump.
+_CONFIG_START = re.compile(
+    rb"with config:\n\[[^\]\n]*\]\[\w+\] [^:\n]*: *\d+: "
+)
+# Start of the next log record, ending the config dump.
+_RECORD_START = re.compile(rb"^\[\d\d/\d\d \d\d:\d\d:\d\d\]", re.MULTILINE)
+
+# Stats of a record, split on ", ", with a numeric or numeric string value.
+_STAT = (
+    r'^\{?"(?P<name>[^"]+)": "?'
+    r'(?P<value>-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)%?"?\}?$'
+)
+_SPLIT = r'"(?:_type|split)": "(?P<split>[^"]*)"'
+_EPOCH = r'"(?:cur_)?epoch": "(?P<epoch>\d+)'
+_ITER = r'"(?:cur_)?iter": "(?P<iter>\d+)'
+_COUNTS = ["epoch", "cur_epoch", "iter", "cur_iter"]
+
+
+def record_pattern(types):
+    """
+    Regex of the json stats lines of the given types, capturing the json.
+    """
+    return re.compile(
+        rb'json_stats: (\{[^\n]*"(?:_type|split)": "(?:'
+        + b"|".join(re.escape(t.encode()) for t in types)
+        + rb')[^"]*"[^\n]*\})'
+    )
+
+
+def _read_range(path, start, end):
+    """
+    The lines of a file starting in the byte range [start, end).
+    """
+    with open(path, "rb") as f:
+        if start > 0:
+            # Skip the line started in the previous range.
+            f.seek(start - 1)
+            f.readline()
+            start = f.tell()
+        if start >= end:
+            return b""
+        data = f.read(end - start)
+        if not data.endswith(b"\n"):
+            data += f.readline()
+    return data
+
+
+class _UnwrapCfgNode(ast.NodeTransformer):
+    """
+    Replaces the `CfgNode({...})` calls of a config repr by their dicts, and
+    the `inf` and `nan` floats by constants.
+    """
+
+    def visit_Call(self, node):
+        if (
+            isinstance(node.func, ast.Name)
+            and node.func.id == "CfgNode"
+            and len(node.args) == 1
+        ):
+            return self.visit(node.args[0])
+        return self.generic_visit(node)
+
+    def visit_Name(self, node):
+        if node.id in ("inf", "nan"):
+            return ast.copy_location(ast.Constant(float(node.id)), node)
+        return node
+
+
+def _load_config_text(text):
+    """
+    A config dump as a dict: the yaml of str(cfg), or the `CfgNode({...})`
+    repr that pprint.pformat(cfg) gives, as in the train logs of older runs.
+    """
+    if text.lstrip().startswith("CfgNode("):
+        tree = ast.parse(text.strip(), mode="eval")
+        return ast.literal_eval(_UnwrapCfgNode().visit(tree))
+    return yaml.safe_load(text)
+
+
+def _parse_config(data):
+    """
+    The first config dumped in a log, as a dict, or None if there is none.
+    """
+    match = _CONFIG_START.search(data)
+    if match is None:
+        return None
+    end = _RECORD_START.search(data, match.end())
+    text = data[match.end() : end.start() if end else len(data)]
+    try:
+        config = _load_config_text(text.decode("utf-8", "replace"))
+    except (yaml.YAMLError, SyntaxError, ValueError):
+        return None
+    return config if isinstance(config, dict) else None
+
+
+def extract_stats(records):
+    """
+    Rows of the stats table of json stats records, as parse_stats but for all
+    the records at once.
+    Args:
+        records (list): json stats records, as bytes.
+    Returns:
+        table (pyarrow.Table): split, epoch, iter, name and value of every
+            numeric stat of the records.
+    """
+    records = pa.array(records, pa.string())
+
+    def field(pattern):
+        return pc.struct_field(pc.extract_regex(records, pattern), [0])
+
+    split = field(_SPLIT)
+    epoch = pc.fill_null(pc.cast(field(_EPOCH), pa.int64()), -1)
+    cur_iter = pc.fill_null(pc.cast(field(_ITER), pa.int64()), -1)
+
+    items = pc.split_pattern(records, ", ")
+    stats = pc.extract_regex(pc.list_flatten(items), _STAT)
+    name = pc.struct_field(stats, [0])
+    keep = pc.and_(
+        pc.is_valid(stats),
+        pc.invert(pc.is_in(name, value_set=pa.array(_COUNTS))),
+    )
+    parents = pc.list_parent_indices(items).filter(keep)
+    return pa.table(
+        {
+            "split": split.take(parents),
+            "epoch": epoch.take(parents),
+            "iter": cur_iter.take(parents),
+            "name": name.filter(keep),
+            "value": pc.cast(
+                pc.struct_field(stats, [1]).filter(keep), pa.float64()
+            ),
+        }
+    )
+
+
+def scan_range(path, start, end, types):
+    """
+    Extract the json stats records of a byte range of a log.
+    Args:
+        path (str): path to the log.
+        start (int): first byte of the range.
+        end (int): last byte of the range, excluded.
+        types (list): types of the extracted records.
+    Returns:
+        table (pyarrow.Table): rows of the stats table of the records.
+        config (dict): the config dumped in the range, if it is the first one.
+    """
+    data = _read_range(path, start, end)
+    table = extract_stats(record_pattern(types).findall(data))
+    config = _parse_config(data) if start == 0 else None
+    return table, config
+
+
+def _scan_range(task):
+    return scan_range(*task)
+
+
+def _log_run_id(path):
+    """
+    Run id of a log, from its path, size and modification time so that a log
+    is ingested again only if it changed.
+    """
+    info = os.stat(path)
+    key = "{}:{}:{}".format(os.path.abspath(path), info.st_size, info.st_mtime)
+    return "log-{}".format(hashlib.sha1(key.encode()).hexdigest()[:16])
+
+
+def _log_record(path, config):
+    """
+    Run record of a log and of the config dumped in it.
+    """
+    cfg = CfgNode(config or {})
+    cfg.OUTPUT_DIR = os.path.dirname(os.path.abspath(path))
+    record = RunRecord(cfg, "log")
+    # The split files may have changed since the run.
+    record.manifest_hash = ""
+    record.time = os.path.getmtime(path)
+    record.run_id = _log_run_id(path)
+    return record
+
+
+def find_logs(paths, suffixes=(".txt", ".log")):
+    """
+    The log files of a list of files and directories, searched recursively.
+    """
+    logs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                logs.extend(
+                    os.path.join(root, f)
+                    for f in sorted(files)
+                    if f.endswith(suffixes)
+                )
+        else:
+            logs.append(path)
+    return logs
+
+
+def ingest_logs(store, paths, types=DEFAULT_TYPES, num_workers=None):
+    """
+    Append a run record of every log to the store, with the json stats of the
+    given types and the first config dumped in the log, e.g. the train one of
+    a train and test log. Unchanged logs already in the store are skipped.
+    Args:
+        store (ResultsStore): the results store.
+        paths (list): log files, or directories searched for `.txt` and
+            `.log` files.
+        types (list): types of the ingested records.
+        num_workers (int): number of processes, all the cpus if None.
+    Returns:
+        stats (dict): numbers of ingested logs, bytes and records.
+    """
+    known = set(store.read("runs", ["run_id"]).column("run_id").to_pylist())
+    records, tasks = [], []
+    for path in find_logs(paths):
+        if _log_run_id(path) in known:
+            continue
+        size = os.path.getsize(path)
+        records.append((path, size, len(tasks)))
+        tasks.extend(
+            (path, start, min(start + RANGE_BYTES, size), tuple(types))
+            for start in range(0, max(size, 1), RANGE_BYTES)
+        )
+
+    if num_workers == 1 or len(tasks) < 2:
+        results = [scan_range(*task) for task in tasks]
+    else:
+        with Pool(num_workers) as pool:
+            results = pool.map(_scan_range, tasks, chunksize=1)
+
+    num_logs, num_bytes, num_rows = 0, 0, 0
+    for i, (path, size, first) in enumerate(records):
+        last = records[i + 1][2] if i + 1 < len(records) else len(tasks)
+        stats = pa.concat_tables([table for table, _ in results[first:last]])
+        if stats.num_rows == 0:
+            # Not a json stats log.
+            continue
+        record = _log_record(path, results[first][1])
+        tables = record.tables()
+        tables["stats"] = stats.add_column(
+            0, "run_id", pa.array([record.run_id] * stats.num_rows, pa.string())
+        )
+        store.append_tables(record.run_id, tables)
+        num_logs += 1
+        num_bytes += size
+        num_rows += stats.num_rows
+    return {
+        "num_logs": num_logs,
+        "num_bytes": num_bytes,
+        "num_rows": num_rows,
+    }
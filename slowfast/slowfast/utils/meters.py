@@ -15,6 +15,7 @@ import slowfast.datasets.ava_helper as ava_helper
 import slowfast.utils.logging as logging
 import slowfast.utils.metrics as metrics
 import slowfast.utils.misc as misc
+from slowfast.utils.binary_metrics import BinaryMetrics
 from slowfast.utils.ava_eval_helper import (
     evaluate_ava,
     read_csv,
@@ -323,27 +324,31 @@ class TestMeter(object):
             clip_ids (tensor): clip indexes of the current batch, dimension is
                 N.
         """
-        for ind in range(preds.shape[0]):
-            vid_id = int(clip_ids[ind]) // self.num_clips
-            if self.video_labels[vid_id].sum() > 0:
-                assert torch.equal(
-                    self.video_labels[vid_id].type(torch.FloatTensor),
-                    labels[ind].type(torch.FloatTensor),
-                )
-            self.video_labels[vid_id] = labels[ind]
-            if self.ensemble_method == "sum":
-                self.video_preds[vid_id] += preds[ind]
-            elif self.ensemble_method == "max":
-                self.video_preds[vid_id] = torch.max(
-                    self.video_preds[vid_id], preds[ind]
-                )
-            else:
-                raise NotImplementedError(
-                    "Ensemble Method {} is not supported".format(
-                        self.ensemble_method
-                    )
+        vid_ids = torch.as_tensor(clip_ids).long().cpu() // self.num_clips
+        preds = preds.detach().cpu().to(self.video_preds.dtype)
+        labels = torch.as_tensor(labels).cpu().to(self.video_labels.dtype)
+
+        # The videos which already have a (non zero) label must keep it, and
+        # all the clips of a video in the batch must share the same label.
+        known = self.video_labels[vid_ids]
+        has_label = known.reshape(len(vid_ids), -1).sum(dim=1) > 0
+        assert torch.equal(known[has_label], labels[has_label])
+        self.video_labels[vid_ids] = labels
+        assert torch.equal(self.video_labels[vid_ids], labels)
+
+        if self.ensemble_method == "sum":
+            self.video_preds.index_add_(0, vid_ids, preds)
+        elif self.ensemble_method == "max":
+            self.video_preds.scatter_reduce_(
+                0, vid_ids[:, None].expand_as(preds), preds, reduce="amax"
+            )
+        else:
+            raise NotImplementedError(
+                "Ensemble Method {} is not supported".format(
+                    self.ensemble_method
                 )
-            self.clip_count[vid_id] += 1
+            )
+        self.clip_count.index_add_(0, vid_ids, torch.ones_like(vid_ids))
 
     def log_iter_stats(self, cur_iter):
         """
@@ -385,15 +390,7 @@ class TestMeter(object):
         ks (tuple): list of top-k values for topk_accuracies. For example,
             ks = (1, 5) correspods to top-1 and top-5 accuracy.
         """
-        clip_check = self.clip_count == self.num_clips
-        if not all(clip_check):
-            logger.warning(
-                "clip count Ids={} = {} (should be {})".format(
-                    np.argwhere(~clip_check),
-                    self.clip_count[~clip_check],
-                    self.num_clips,
-                )
-            )
+        self._check_clip_count()
 
         self.stats = {"split": "test_final"}
         if self.multi_label:
@@ -420,6 +417,141 @@ class TestMeter(object):
                 )
         logging.log_json_stats(self.stats)
 
+    def _check_clip_count(self):
+        """
+        Warn about the videos that did not get all their clips.
+        """
+        clip_check = self.clip_count == self.num_clips
+        if not all(clip_check):
+            logger.warning(
+                "clip count Ids={} = {} (should be {})".format(
+                    np.argwhere(~clip_check),
+                    self.clip_count[~clip_check],
+                    self.num_clips,
+                )
+            )
+
+
+class EarlyExitTestMeter(TestMeter):
+    """
+    Multi-view ensemble with early exit: a video stops being sampled once the
+    ensemble of its views tested so far is confident enough. The views are
+    expected to be tested in rounds, one view of every active video per round.
+    """
+
+    def __init__(
+        self,
+        num_videos,
+        num_clips,
+        num_cls,
+        overall_iters,
+        ensemble_method="sum",
+        criterion="margin",
+        threshold=0.8,
+        min_views=1,
+    ):
+        """
+        Args:
+            num_videos (int): number of videos to test.
+            num_clips (int): maximum number of clips sampled from each video.
+            num_cls (int): number of classes for each prediction.
+            overall_iters (int): overall iterations for testing.
+            ensemble_method (str): method to perform the ensemble, options
+                include "sum", and "max".
+            criterion (str): confidence of the running ensemble, `margin`
+                for the difference between the two highest class
+                probabilities, `posterior` for the highest one.
+            threshold (float): a video exits once its confidence reaches it.
+            min_views (int): minimum number of views before exiting.
+        """
+        assert criterion in ["margin", "posterior"]
+        self.criterion = criterion
+        self.threshold = threshold
+        self.min_views = min_views
+        self.exited = torch.zeros((num_videos), dtype=torch.bool)
+        super(EarlyExitTestMeter, self).__init__(
+            num_videos,
+            num_clips,
+            num_cls,
+            overall_iters,
+            False,
+            ensemble_method,
+        )
+
+    def reset(self):
+        """
+        Reset the metric.
+        """
+        super(EarlyExitTestMeter, self).reset()
+        self.exited.zero_()
+
+    def active_videos(self):
+        """
+        Returns:
+            (list): indices of the videos that still need views.
+        """
+        active = ~self.exited & (self.clip_count < self.num_clips)
+        return active.nonzero().flatten().tolist()
+
+    def confidence(self):
+        """
+        Returns:
+            (tensor): confidence of the running ensemble of every video.
+        """
+        probs = self.video_preds
+        if self.ensemble_method == "sum":
+            probs = probs / self.clip_count.clamp(min=1)[:, None]
+        top2 = probs.topk(2, dim=1)[0]
+        if self.criterion == "posterior":
+            return top2[:, 0]
+        return top2[:, 0] - top2[:, 1]
+
+    def update_stats(self, preds, labels, clip_ids):
+        """
+        Ensemble the predictions of the current batch and let the confident
+        videos exit.
+        Args:
+            preds (tensor): predictions from the current batch, N x C.
+            labels (tensor): the corresponding labels of the current batch.
+            clip_ids (tensor): clip indexes of the current batch.
+        """
+        super(EarlyExitTestMeter, self).update_stats(preds, labels, clip_ids)
+        self.exited |= (self.confidence() >= self.threshold) & (
+            self.clip_count >= self.min_views
+        )
+
+    def finalize_metrics(self, ks=(1, 2)):
+        """
+        Calculate and log the final ensembled metrics and the number of views
+        used per video.
+        ks (tuple): list of top-k values for topk_accuracies.
+        """
+        if self.ensemble_method == "sum":
+            # Rescale the sums to num_clips views, so that the scores of the
+            # videos that exited early are comparable with the others.
+            self.video_preds *= (
+                self.num_clips / self.clip_count.clamp(min=1).float()
+            )[:, None]
+        super(EarlyExitTestMeter, self).finalize_metrics(ks)
+        logging.log_json_stats(
+            {
+                "split": "test_early_exit",
+                "mean_views": self.clip_count.float().mean().item(),
+                "max_views": self.num_clips,
+                "exit_rate": self.exited.float().mean().item(),
+            }
+        )
+
+    def _check_clip_count(self):
+        """
+        Warn about the videos that did not get any clip.
+        """
+        clip_check = self.clip_count > 0
+        if not all(clip_check):
+            logger.warning(
+                "Videos without clips: {}".format(np.argwhere(~clip_check))
+            )
+
 
 class ScalarMeter(object):
     """
@@ -499,7 +631,17 @@ class TrainMeter(object):
         self.num_top1_mis = 0
         self.num_top5_mis = 0
         self.num_samples = 0
+        # Peak GPU memory (GB) of the last step and of all the epoch steps,
+        # 0 when training on CPU.
+        self.step_peak_mem = 0.0
+        self.max_peak_mem = 0.0
+        # Resident memory (GB) of the process at the end of the last step
+        # and its maximum over the epoch steps, which covers CPU training.
+        self.step_rss = 0.0
+        self.max_rss = 0.0
         self.output_dir = cfg.OUTPUT_DIR
+        # Stats of the last logged epoch.
+        self.epoch_stats = {}
 
     def reset(self):
         """
@@ -513,20 +655,29 @@ class TrainMeter(object):
         self.num_top1_mis = 0
         self.num_top5_mis = 0
         self.num_samples = 0
+        self.step_peak_mem = 0.0
+        self.max_peak_mem = 0.0
+        self.step_rss = 0.0
+        self.max_rss = 0.0
 
     def iter_tic(self):
         """
-        Start to record time.
+        Start to record time and the peak memory of the step.
         """
         self.iter_timer.reset()
         self.data_timer.reset()
+        misc.reset_gpu_mem_peak()
 
     def iter_toc(self):
         """
-        Stop to record time.
+        Stop to record time and the peak memory of the step.
         """
         self.iter_timer.pause()
         self.net_timer.pause()
+        self.step_peak_mem = misc.gpu_mem_usage()
+        self.max_peak_mem = max(self.max_peak_mem, self.step_peak_mem)
+        self.step_rss = misc.process_mem_usage()
+        self.max_rss = max(self.max_rss, self.step_rss)
 
     def data_toc(self):
         self.data_timer.pause()
@@ -580,7 +731,8 @@ class TrainMeter(object):
             "eta": eta,
             "loss": self.loss.get_win_median(),
             "lr": self.lr,
-            "gpu_mem": "{:.2f}G".format(misc.gpu_mem_usage()),
+            "gpu_mem": "{:.2f}G".format(self.step_peak_mem),
+            "rss": "{:.2f}G".format(self.step_rss),
         }
         if not self._cfg.DATA.MULTI_LABEL:
             stats["top1_err"] = self.mb_top1_err.get_win_median()
@@ -607,7 +759,8 @@ class TrainMeter(object):
             "dt_net": self.net_timer.seconds(),
             "eta": eta,
             "lr": self.lr,
-            "gpu_mem": "{:.2f}G".format(misc.gpu_mem_usage()),
+            "gpu_mem": "{:.2f}G".format(self.max_peak_mem),
+            "rss": "{:.2f}G".format(self.max_rss),
             "RAM": "{:.2f}/{:.2f}G".format(*misc.cpu_mem_usage()),
         }
         if not self._cfg.DATA.MULTI_LABEL:
@@ -617,6 +770,7 @@ class TrainMeter(object):
             stats["top1_err"] = top1_err
             stats["top5_err"] = top5_err
             stats["loss"] = avg_loss
+        self.epoch_stats = stats
         logging.log_json_stats(stats, self.output_dir)
 
 
@@ -649,6 +803,22 @@ class ValMeter(object):
         self.all_preds = []
         self.all_labels = []
         self.output_dir = cfg.OUTPUT_DIR
+        # Binary metrics of the positive (label > 0) class.
+        self.binary_metrics = None
+        if (
+            cfg.BINARY_METRICS.ENABLE
+            and not cfg.DATA.MULTI_LABEL
+            and cfg.TASK != "ssl"
+        ):
+            self.binary_metrics = BinaryMetrics(
+                cfg.BINARY_METRICS.NUM_BINS,
+                cfg.BINARY_METRICS.THRESHOLD,
+                cfg.BINARY_METRICS.EXACT,
+                device="cuda" if cfg.NUM_GPUS else "cpu",
+            )
+        self.binary_stats = {}
+        # Stats of the last logged epoch.
+        self.epoch_stats = {}
 
     def reset(self):
         """
@@ -664,6 +834,8 @@ class ValMeter(object):
         self.num_samples = 0
         self.all_preds = []
         self.all_labels = []
+        if self.binary_metrics is not None:
+            self.binary_metrics.reset()
 
     def iter_tic(self):
         """
@@ -708,6 +880,16 @@ class ValMeter(object):
         self.all_preds.append(preds)
         self.all_labels.append(labels)
 
+    def update_binary_stats(self, scores, labels):
+        """
+        Update the binary metrics, on the device of the predictions.
+        Args:
+            scores (tensor): positive scores of the current batch.
+            labels (tensor): labels of the current batch.
+        """
+        if self.binary_metrics is not None:
+            self.binary_metrics.update(scores, labels)
+
     def log_iter_stats(self, cur_epoch, cur_iter):
         """
         log the stats of the current iteration.
@@ -765,6 +947,13 @@ class ValMeter(object):
             stats["min_top1_err"] = self.min_top1_err
             stats["min_top5_err"] = self.min_top5_err
 
+        if self.binary_metrics is not None:
+            # A single all-reduce of the histograms of all the processes.
+            self.binary_metrics.merge()
+            self.binary_stats = self.binary_metrics.compute()
+            stats.update(self.binary_stats)
+
+        self.epoch_stats = stats
         logging.log_json_stats(stats, self.output_dir)
 
 
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 # Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
 
+import inspect
 import json
 import logging
 import math
@@ -50,6 +51,45 @@ def params_count(model, ignore_bn=False):
     return count
 
 
+def model_size(model):
+    """
+    Compute the memory taken by the parameters and buffers of a model, and the
+    size of its serialized state dict.
+    Args:
+        model (model): model to measure.
+    Returns:
+        stats (dict): number of parameters, parameter and buffer memory (MB)
+            and checkpoint size (MB).
+    """
+    param_bytes = sum(p.numel() * p.element_size() for p in model.parameters())
+    buffer_bytes = sum(b.numel() * b.element_size() for b in model.buffers())
+    # Count the serialized bytes without holding a second copy of the weights.
+    writer = _ByteCounter()
+    torch.save(model.state_dict(), writer)
+    return {
+        "params": params_count(model),
+        "param_mem_mb": param_bytes / 1024 ** 2,
+        "buffer_mem_mb": buffer_bytes / 1024 ** 2,
+        "checkpoint_mb": writer.num_bytes / 1024 ** 2,
+    }
+
+
+class _ByteCounter(object):
+    """
+    File-like object that only counts the bytes written to it.
+    """
+
+    def __init__(self):
+        self.num_bytes = 0
+
+    def write(self, data):
+        self.num_bytes += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+
 def gpu_mem_usage():
     """
     Compute the GPU memory usage for the current device (GB).
@@ -61,6 +101,23 @@ def gpu_mem_usage():
     return mem_usage_bytes / 1024 ** 3
 
 
+def reset_gpu_mem_peak():
+    """
+    Reset the peak GPU memory of the current device, so that gpu_mem_usage
+    returns the peak reached since this call.
+    """
+    if torch.cuda.is_available():
+        torch.cuda.reset_peak_memory_stats()
+
+
+def process_mem_usage():
+    """
+    Compute the resident memory (RSS) of the current process (GB), the
+    memory of the CPU tensors that gpu_mem_usage does not count.
+    """
+    return psutil.Process().memory_info().rss / 1024 ** 3
+
+
 def cpu_mem_usage():
     """
     Compute the system memory (RAM) usage for the current device (GB).
@@ -75,7 +132,25 @@ def cpu_mem_usage():
     return usage, total
 
 
-def _get_model_analysis_input(cfg, use_train_input):
+def get_dummy_bboxes(cfg, batch_size=1):
+    """
+    Return random facial region corners with the layout of the PD loaders,
+        i.e. (batch_size, num_frames, num_regions, 4, 2) corners ordered
+        top left, top right, bottom right, bottom left in the 256 pixel frame.
+    Args:
+        cfg (CfgNode): configs. Details can be found in
+            slowfast/config/defaults.py
+        batch_size (int): number of clips.
+    """
+    shape = (batch_size, cfg.DATA.NUM_FRAMES, cfg.PD.NUM_REGIONS, 2)
+    top_left = torch.rand(shape) * 192
+    bottom_right = top_left + torch.rand(shape) * 48 + 16
+    top_right = torch.stack([bottom_right[..., 0], top_left[..., 1]], dim=-1)
+    bottom_left = torch.stack([top_left[..., 0], bottom_right[..., 1]], dim=-1)
+    return torch.stack([top_left, top_right, bottom_right, bottom_left], dim=3)
+
+
+def _get_model_analysis_input(cfg, use_train_input, with_bboxes=False):
     """
     Return a dummy input for model analysis with batch size 1. The input is
         used for analyzing the model (counting flops and activations etc.).
@@ -84,12 +159,22 @@ def _get_model_analysis_input(cfg, use_train_input):
             slowfast/config/defaults.py
         use_train_input (bool): if True, return the input for training. Otherwise,
             return the input for testing.
+        with_bboxes (bool): if True, also return dummy facial region corners
+            for the models taking the region boxes of the PD loaders.
 
     Returns:
         inputs: the input for model analysis.
     """
     rgb_dimension = 3
-    if use_train_input:
+    dataset = cfg.TRAIN.DATASET if use_train_input else cfg.TEST.DATASET
+    if dataset == "pdkeypoints":
+        # The corners and the center of every region of every frame.
+        corners = get_dummy_bboxes(cfg)[0]
+        top_left, bottom_right = corners[:, :, 0], corners[:, :, 2]
+        input_tensors = torch.stack(
+            [top_left, bottom_right, (top_left + bottom_right) / 2], dim=2
+        )
+    elif use_train_input:
         if cfg.TRAIN.DATASET in ["imagenet", "imagenetprefetch"]:
             input_tensors = torch.rand(
                 rgb_dimension,
@@ -117,7 +202,10 @@ def _get_model_analysis_input(cfg, use_train_input):
                 cfg.DATA.TEST_CROP_SIZE,
                 cfg.DATA.TEST_CROP_SIZE,
             )
-    model_inputs = pack_pathway_output(cfg, input_tensors)
+    if dataset == "pdkeypoints":
+        model_inputs = [input_tensors]
+    else:
+        model_inputs = pack_pathway_output(cfg, input_tensors)
     for i in range(len(model_inputs)):
         model_inputs[i] = model_inputs[i].unsqueeze(0)
         if cfg.NUM_GPUS:
@@ -129,11 +217,27 @@ def _get_model_analysis_input(cfg, use_train_input):
         if cfg.NUM_GPUS:
             bbox = bbox.cuda()
         inputs = (model_inputs, bbox)
+    elif with_bboxes:
+        bboxes = get_dummy_bboxes(cfg)
+        if cfg.NUM_GPUS:
+            bboxes = bboxes.cuda()
+        inputs = (model_inputs, bboxes)
     else:
         inputs = (model_inputs,)
     return inputs
 
 
+def takes_bboxes(model):
+    """
+    Whether the forward of a model takes the region boxes of the PD loaders
+    after its inputs, e.g. `forward(self, x, bboxes)`.
+    Args:
+        model (model): model, optionally wrapped in DistributedDataParallel.
+    """
+    model = model.module if hasattr(model, "module") else model
+    return "bboxes" in inspect.signature(model.forward).parameters
+
+
 def get_model_stats(model, cfg, mode, use_train_input):
     """
     Compute statistics for the current model given the config.
@@ -162,8 +266,9 @@ def get_model_stats(model, cfg, mode, use_train_input):
     # Evaluation mode can avoid getting stuck with sync batchnorm.
     model_mode = model.training
     model.eval()
-    inputs = _get_model_analysis_input(cfg, use_train_input)
-    bboxes = []
+    inputs = _get_model_analysis_input(
+        cfg, use_train_input, with_bboxes=takes_bboxes(model)
+    )
     count_dict, *_ = model_stats_fun(model, inputs)
     count = sum(count_dict.values())
     model.train(model_mode)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+
+"""Profile a window of train, val or test iterations with torch.profiler."""
+
+import os
+import torch
+from torch.profiler import ProfilerActivity, record_function
+
+import slowfast.utils.distributed as du
+import slowfast.utils.logging as logging
+from slowfast.utils.env import pathmgr
+
+logger = logging.get_logger(__name__)
+
+
+def is_profiled(cfg, phase, cur_epoch=None):
+    """
+    Whether the iterations of a phase are profiled.
+    Args:
+        cfg (CfgNode): configs. Details can be found in
+            slowfast/config/defaults.py
+        phase (str): `train`, `val` or `test`.
+        cur_epoch (int, optional): current epoch, None for test.
+    """
+    return (
+        cfg.PROFILER.ENABLE
+        and phase in cfg.PROFILER.PHASES
+        and (cur_epoch is None or cur_epoch == cfg.PROFILER.EPOCH)
+    )
+
+
+def export_profile(cfg, name, prof):
+    """
+    Write the Chrome trace and the key averages table of a profiled window to
+    OUTPUT_DIR, and log the table.
+    Args:
+        cfg (CfgNode): configs. Details can be found in
+            slowfast/config/defaults.py
+        name (str): name of the profiled window, prefix of the files.
+        prof (torch.profiler.profile): the profiler of the window.
+    """
+    pathmgr.mkdirs(cfg.OUTPUT_DIR)
+    sort_by = cfg.PROFILER.SORT_BY or (
+        "self_cuda_time_total" if cfg.NUM_GPUS else "self_cpu_time_total"
+    )
+    table = prof.key_averages().table(
+        sort_by=sort_by, row_limit=cfg.PROFILER.ROW_LIMIT
+    )
+    path = os.path.join(cfg.OUTPUT_DIR, name + "_trace.json")
+    prof.export_chrome_trace(path)
+    with pathmgr.open(os.path.join(cfg.OUTPUT_DIR, name + ".txt"), "w") as f:
+        f.write(table)
+    logger.info("Profile of {}, trace in {}:\n{}".format(name, path, table))
+
+
+def build_profiler(cfg, phase, cur_epoch=None):
+    """
+    Build a profiler skipping PROFILER.WAIT_ITERS iterations, warming up for
+    PROFILER.WARMUP_ITERS and recording the next PROFILER.ACTIVE_ITERS ones.
+    Args:
+        cfg (CfgNode): configs. Details can be found in
+            slowfast/config/defaults.py
+        phase (str): `train`, `val` or `test`.
+        cur_epoch (int, optional): current epoch, None for test.
+    Returns:
+        prof (torch.profiler.profile): the profiler, to step every iteration.
+    """
+    activities = [ProfilerActivity.CPU]
+    if cfg.NUM_GPUS:
+        activities.append(ProfilerActivity.CUDA)
+    name = "profile_{}{}_rank{}".format(
+        phase,
+        "" if cur_epoch is None else "_epoch{}".format(cur_epoch),
+        du.get_rank(),
+    )
+    return torch.profiler.profile(
+        activities=activities,
+        schedule=torch.profiler.schedule(
+            wait=cfg.PROFILER.WAIT_ITERS,
+            warmup=cfg.PROFILER.WARMUP_ITERS,
+            active=cfg.PROFILER.ACTIVE_ITERS,
+            repeat=1,
+        ),
+        on_trace_ready=lambda prof: export_profile(cfg, name, prof),
+        record_shapes=cfg.PROFILER.RECORD_SHAPES,
+        profile_memory=cfg.PROFILER.PROFILE_MEMORY,
+        with_stack=cfg.PROFILER.WITH_STACK,
+    )
+
+
+def profile_loader(loader, cfg, phase, cur_epoch=None):
+    """
+    Iterate over a loader, labeling the waits for its batches `data_wait`, and
+    profile the window of iterations of the PROFILER options if the phase is
+    profiled. The regions of an iteration are labeled with record_function.
+    Args:
+        loader (loader): data loader to iterate over.
+        cfg (CfgNode): configs. Details can be found in
+            slowfast/config/defaults.py
+        phase (str): `train`, `val` or `test`.
+        cur_epoch (int, optional): current epoch, None for test.
+    Yields:
+        batch: the batches of the loader.
+    """
+    prof = None
+    if is_profiled(cfg, phase, cur_epoch):
+        prof = build_profiler(cfg, phase, cur_epoch)
+        prof.start()
+    num_iters = 0
+    try:
+        iterator = iter(loader)
+        while True:
+            with record_function("data_wait"):
+                batch = next(iterator, None)
+            if batch is None:
+                return
+            yield batch
+            num_iters += 1
+            if prof is not None:
+                prof.step()
+    finally:
+        # Also exports a window cut short by the end of the loader.
+        if prof is not None:
+            prof.stop()
+            if num_iters <= cfg.PROFILER.WAIT_ITERS + cfg.PROFILER.WARMUP_ITERS:
+                logger.warning(
+                    "Only {} {} iterations, not profiled.".format(
+                        num_iters, phase
+                    )
+                )
@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+
+"""
+Append-only columnar store of the train and test runs. Every run appends one
+parquet file to each table of the store directory:
+    runs: run id, time, kind (train or test), model, config and dataset
+        manifest hashes, output dir and config.
+    params: run id and flattened config, one row per config key.
+    stats: run id, split (the `_type` or `split` of the json stats), epoch,
+        iteration, name and value of every numeric stat.
+    predictions: run id, video, label, positive score and predictions of the
+        test videos.
+The files are never modified, so concurrent runs do not conflict, and the
+tables are read as pyarrow datasets, projecting only the queried columns. The
+part files of a table are merged once they get too many, to keep the queries
+of thousands of runs fast.
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+
+import slowfast.utils.logging as logging
+from slowfast.utils.env import pathmgr
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as pads
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pc = None
+
+logger = logging.get_logger(__name__)
+
+# Config keys that do not change the experiment, left out of the hash.
+_UNHASHED_KEYS = ("OUTPUT_DIR", "SHARD_ID", "NUM_SHARDS", "NUM_GPUS")
+
+# Epoch and iteration of the stats of a whole run, e.g. the final test ones.
+FINAL = -1
+
+_NUMBER = re.compile(r"^\s*([-+]?\d*\.?\d+(?:[eE][-+]?\d+)?)\s*%?\s*$")
+
+
+def is_available():
+    """
+    Whether pyarrow, required by the store, is installed.
+    """
+    return pa is not None
+
+
+def _schemas():
+    """
+    Schemas of the tables of the store.
+    """
+    return {
+        "runs": pa.schema(
+            [
+                ("run_id", pa.string()),
+                ("time", pa.float64()),
+                ("kind", pa.string()),
+                ("model", pa.string()),
+                ("config_hash", pa.string()),
+                ("manifest_hash", pa.string()),
+                ("output_dir", pa.string()),
+                ("config", pa.string()),
+            ]
+        ),
+        "params": pa.schema(
+            [
+                ("run_id", pa.string()),
+                ("key", pa.string()),
+                ("value", pa.string()),
+            ]
+        ),
+        "stats": pa.schema(
+            [
+                ("run_id", pa.string()),
+                ("split", pa.string()),
+                ("epoch", pa.int64()),
+                ("iter", pa.int64()),
+                ("name", pa.string()),
+                ("value", pa.float64()),
+            ]
+        ),
+        "predictions": pa.schema(
+            [
+                ("run_id", pa.string()),
+                ("video", pa.string()),
+                ("label", pa.int64()),
+                ("score", pa.float64()),
+                ("preds", pa.list_(pa.float32())),
+            ]
+        ),
+    }
+
+
+def flatten_config(cfg, prefix=""):
+    """
+    Flatten a config into a dict of dotted keys and string values, e.g.
+    {"SOLVER.BASE_LR": "0.1"}.
+    """
+    params = {}
+    for key, value in cfg.items():
+        if isinstance(value, dict):
+            params.update(flatten_config(value, prefix + key + "."))
+        else:
+            if isinstance(value, (list, tuple)):
+                value = json.dumps(value)
+            params[prefix + key] = str(value)
+    return params
+
+
+def config_hash(params):
+    """
+    Hash of a flattened config, without the keys that do not change the
+    experiment.
+    """
+    content = json.dumps(
+        {
+            key: value
+            for key, value in params.items()
+            if key not in _UNHASHED_KEYS
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha1(content.encode()).hexdigest()
+
+
+def manifest_hash(cfg):
+    """
+    Hash of the train, val and test split files of the dataset.
+    """
+    sha = hashlib.sha1()
+    for split in ["train", "val", "test"]:
+        path = os.path.join(cfg.DATA.PATH_TO_DATA_DIR, split + ".csv")
+        if pathmgr.exists(path):
+            with pathmgr.open(path, "rb") as f:
+                sha.update(split.encode() + f.read())
+    return sha.hexdigest()
+
+
+def _parse_count(value):
+    """
+    Epoch or iteration of a `cur/total` stat.
+    """
+    if value is None:
+        return FINAL
+    return int(str(value).split("/")[0])
+
+
+def parse_stats(stats):
+    """
+    Split json stats into rows of the stats table.
+    Args:
+        stats (dict): stats of logging.log_json_stats, with a `_type` or a
+            `split`, and optionally an `epoch` or `cur_epoch` and an `iter` or
+            `cur_iter`, as `cur/total` strings.
+    Returns:
+        rows (list): (split, epoch, iter, name, value) of every numeric stat,
+            including the numeric strings like "97.50".
+    """
+    split = stats.get("_type", stats.get("split", ""))
+    epoch = _parse_count(stats.get("epoch", stats.get("cur_epoch")))
+    cur_iter = _parse_count(stats.get("iter", stats.get("cur_iter")))
+    rows = []
+    for name, value in stats.items():
+        if name in ["_type", "split", "epoch", "cur_epoch", "iter", "cur_iter"]:
+            continue
+        if isinstance(value, bool) or value is None:
+            continue
+        if not isinstance(value, (int, float)):
+            match = _NUMBER.match(str(value))
+            if match is None:
+                continue
+            value = match.group(1)
+        rows.append((split, epoch, cur_iter, name, float(value)))
+    return rows
+
+
+def _columns(rows, names):
+    """
+    Columns of a list of row tuples.
+    """
+    return {name: [row[i] for row in rows] for i, name in enumerate(names)}
+
+
+class RunRecord(object):
+    """
+    Record of a train or test run, appended to the store once the run is
+    over.
+    """
+
+    def __init__(self, cfg, kind):
+        """
+        Args:
+            cfg (CfgNode): configs of the run.
+            kind (str): `train`, `test`, or `log` for the runs ingested from
+                their logs.
+        """
+        self.kind = kind
+        self.time = time.time()
+        self.params = flatten_config(cfg)
+        self.config_hash = config_hash(self.params)
+        self.model = self.params.get("MODEL.MODEL_NAME", "")
+        self.output_dir = self.params.get("OUTPUT_DIR", "")
+        self.config = cfg.dump()
+        self.manifest_hash = (
+            manifest_hash(cfg) if "DATA.PATH_TO_DATA_DIR" in self.params else ""
+        )
+        self.run_id = "{}-{}-{}".format(
+            time.strftime("%Y%m%d-%H%M%S", time.localtime(self.time)),
+            self.config_hash[:8],
+            uuid.uuid4().hex[:6],
+        )
+        self.stats = []
+        self.predictions = []
+
+    def add_stats(self, stats):
+        """
+        Add json stats, e.g. the epoch stats of a meter.
+        """
+        self.stats.extend(parse_stats(stats))
+
+    def add_predictions(self, videos, labels, preds, scores):
+        """
+        Add the video predictions of a test.
+        Args:
+            videos (list): names of the videos.
+            labels (tensor): labels of shape (N,).
+            preds (tensor): predictions of shape (N, num_classes).
+            scores (tensor): positive scores of shape (N,).
+        """
+        for video, label, pred, score in zip(
+            videos,
+            labels.tolist(),
+            preds.float().tolist(),
+            scores.tolist(),
+        ):
+            self.predictions.append((video, int(label), score, pred))
+
+    def tables(self):
+        """
+        Returns:
+            tables (dict): pyarrow table of the record for every table of the
+                store.
+        """
+        schemas = _schemas()
+        run = {
+            "run_id": [self.run_id],
+            "time": [self.time],
+            "kind": [self.kind],
+            "model": [self.model],
+            "config_hash": [self.config_hash],
+            "manifest_hash": [self.manifest_hash],
+            "output_dir": [self.output_dir],
+            "config": [self.config],
+        }
+        params = {
+            "run_id": [self.run_id] * len(self.params),
+            "key": list(self.params.keys()),
+            "value": list(self.params.values()),
+        }
+        stats = _columns(
+            self.stats, ["split", "epoch", "iter", "name", "value"]
+        )
+        stats["run_id"] = [self.run_id] * len(self.stats)
+        predictions = _columns(
+            self.predictions, ["video", "label", "score", "preds"]
+        )
+        predictions["run_id"] = [self.run_id] * len(self.predictions)
+        columns = {
+            "runs": run,
+            "params": params,
+            "stats": stats,
+            "predictions": predictions,
+        }
+        return {
+            name: pa.table(
+                {field: columns[name][field] for field in schema.names},
+                schema=schema,
+            )
+            for name, schema in schemas.items()
+        }
+
+
+class ResultsStore(object):
+    """
+    Append-only store of run records, one parquet file per run and table.
+    """
+
+    def __init__(self, path, max_parts=64):
+        """
+        Args:
+            path (str): path to the store directory.
+            max_parts (int): number of part files of a table above which the
+                table is compacted after an append. 0 to never compact.
+        """
+        if pa is None:
+            raise ImportError(
+                "pyarrow is required by the results store, please install it"
+            )
+        self.path = path
+        self.max_parts = max_parts
+        self.schemas = _schemas()
+
+    def _table_dir(self, name):
+        return os.path.join(self.path, name)
+
+    def _parts(self, name):
+        """
+        Paths to the part files of a table.
+        """
+        table_dir = self._table_dir(name)
+        if not os.path.isdir(table_dir):
+            return []
+        return sorted(
+            os.path.join(table_dir, f)
+            for f in os.listdir(table_dir)
+            if f.endswith(".parquet")
+        )
+
+    def write_table(self, name, table, part):
+        """
+        Append a table as a new part file. The file is written under a
+        temporary name and renamed, so readers never see a partial file.
+        """
+        table_dir = self._table_dir(name)
+        os.makedirs(table_dir, exist_ok=True)
+        path = os.path.join(table_dir, part + ".parquet")
+        pq.write_table(table, path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+    def append(self, record):
+        """
+        Append a run record.
+        """
+        self.append_tables(record.run_id, record.tables())
+
+    def append_tables(self, run_id, tables):
+        """
+        Append the tables of a run.
+        Args:
+            run_id (str): id of the run.
+            tables (dict): pyarrow table of the run for every table of the
+                store.
+        """
+        for name, table in tables.items():
+            if table.num_rows > 0:
+                self.write_table(
+                    name, table.select(self.schemas[name].names), run_id
+                )
+            if 0 < self.max_parts < len(self._parts(name)):
+                self.compact(name)
+        logger.info(
+            "Appended run {} to the results store {}".format(
+                run_id, self.path
+            )
+        )
+
+    def read(self, name, columns=None, filter=None):
+        """
+        Read a table of the store.
+        Args:
+            name (str): name of the table.
+            columns (list): columns to read, all of them if None.
+            filter (pyarrow.compute.Expression): rows to read.
+        Returns:
+            table (pyarrow.Table): the rows of all the runs.
+        """
+        files = self._parts(name)
+        if not files:
+            return self.schemas[name].empty_table().select(
+                columns or self.schemas[name].names
+            )
+        dataset = pads.dataset(
+            files, schema=self.schemas[name], format="parquet"
+        )
+        return dataset.to_table(columns=columns, filter=filter)
+
+    def compact(self, name):
+        """
+        Merge the part files of a table into a single one, to speed up the
+        queries of stores of many runs. The rows are unchanged. A lock file
+        keeps concurrent runs from merging the same parts, the table is left
+        as is if another run holds it.
+        Returns:
+            num_parts (int): number of merged part files.
+        """
+        lock = os.path.join(self._table_dir(name), "compact.lock")
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL))
+        except (FileExistsError, FileNotFoundError):
+            return 0
+        try:
+            files = self._parts(name)
+            if len(files) < 2:
+                return 0
+            table = pads.dataset(
+                files, schema=self.schemas[name], format="parquet"
+            ).to_table()
+            self.write_table(
+                name, table, "compacted-{}".format(uuid.uuid4().hex[:12])
+            )
+            for path in files:
+                os.remove(path)
+            return len(files)
+        finally:
+            os.remove(lock)
+
+    def aggregate(self, by, metric, split="test_final", epoch=FINAL, kind=None):
+        """
+        Aggregate a metric of the runs by config fields.
+        Args:
+            by (list): dotted config keys to group the runs by, e.g.
+                ["MODEL.MODEL_NAME"].
+            metric (str): name of the stat, e.g. `auroc`.
+            split (str): split of the stat, e.g. `test_final` or `val_epoch`.
+            epoch (int): epoch of the stat, FINAL for the stats of the whole
+                run and None for the last epoch of every run.
+            kind (str): kind of the runs, `train` or `test`, None for both.
+        Returns:
+            table (pyarrow.Table): the config fields, the number of runs and
+                the mean, std, min and max of the metric.
+        """
+        condition = (pc.field("name") == metric) & (pc.field("split") == split)
+        if epoch is not None:
+            condition = condition & (pc.field("epoch") == epoch)
+        stats = self.read(
+            "stats", ["run_id", "epoch", "value"], filter=condition
+        )
+        if epoch is None:
+            # Last epoch of every run.
+            last = stats.group_by("run_id").aggregate([("epoch", "max")])
+            stats = stats.join(
+                last.rename_columns(["run_id", "epoch"]),
+                keys=["run_id", "epoch"],
+                join_type="inner",
+            )
+        stats = stats.select(["run_id", "value"])
+        if kind is not None:
+            runs = self.read(
+                "runs", ["run_id"], filter=pc.field("kind") == kind
+            )
+            stats = stats.join(runs, keys="run_id", join_type="inner")
+        for key in by:
+            params = self.read(
+                "params", ["run_id", "value"], filter=pc.field("key") == key
+            ).rename_columns(["run_id", key])
+            stats = stats.join(params, keys="run_id", join_type="left outer")
+        table = stats.group_by(list(by)).aggregate(
+            [
+                ("run_id", "count_distinct"),
+                ("value", "mean"),
+                ("value", "stddev"),
+                ("value", "min"),
+                ("value", "max"),
+            ]
+        )
+        table = table.select(
+            list(by)
+            + [
+                "run_id_count_distinct",
+                "value_mean",
+                "value_stddev",
+                "value_min",
+                "value_max",
+            ]
+        ).rename_columns(list(by) + ["num_runs", "mean", "std", "min", "max"])
+        return table.sort_by([(key, "ascending") for key in by])
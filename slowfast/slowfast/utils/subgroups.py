@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+
+"""Test metrics of subgroups of videos, e.g. per subject or ID vs OOD."""
+
+import csv
+import os
+import re
+import numpy as np
+import torch
+
+from slowfast.utils.bootstrap import subject_index, weighted_metrics
+from slowfast.utils.env import pathmgr
+
+
+def video_id(path):
+    """
+    Number of a `video<id>_...` video, its row in the data sheet.
+    """
+    return int(re.match(r"video(\d+)", os.path.basename(path)).group(1))
+
+
+def load_manifest(path):
+    """
+    Load a manifest compiled by tools/compile_manifest.py.
+    Args:
+        path (str): path to the manifest csv, with a `video_id` column.
+    Returns:
+        manifest (dict): the row of every video id, as a dict of the columns.
+    """
+    with pathmgr.open(path, "r") as f:
+        return {int(row["video_id"]): row for row in csv.DictReader(f)}
+
+
+def manifest_subjects(paths_to_videos, path):
+    """
+    Subject index of every video, from the `person` column of a manifest.
+    Args:
+        paths_to_videos (list): paths to the videos.
+        path (str): path to the manifest csv.
+    Returns:
+        groups (tensor): subject index of every video.
+    """
+    manifest = load_manifest(path)
+    return subject_index(
+        [manifest[video_id(p)]["person"] for p in paths_to_videos]
+    )
+
+
+def subgroup_metrics(scores, labels, groups, threshold=0.5):
+    """
+    Metrics of every subgroup of videos at once, with one weighting of the
+    videos per subgroup.
+    Args:
+        scores (tensor): positive scores of shape (N,).
+        labels (tensor): labels of shape (N,), positive if above 0.
+        groups (list): subgroup of every video.
+        threshold (float): positive score above which a video is predicted
+            positive.
+    Returns:
+        metrics (list): the subgroup, numbers of videos and positives,
+            accuracy, sensitivity, specificity, AUROC and AUPRC of every
+            subgroup. As in BinaryMetrics.compute, the rates undefined in a
+            subgroup missing a class are left out.
+    """
+    names, index = np.unique(np.asarray(groups, dtype=str), return_inverse=True)
+    weights = torch.nn.functional.one_hot(
+        torch.as_tensor(index), len(names)
+    ).T.double()
+    scores = torch.as_tensor(scores).double().cpu()
+    labels = (torch.as_tensor(labels).cpu() > 0).double()
+    preds = (scores > threshold).double()
+
+    areas = weighted_metrics(scores, labels, weights, threshold)
+    num_videos = weights.sum(1)
+    num_pos = weights @ labels
+    num_neg = num_videos - num_pos
+    sensitivity = (weights @ (preds * labels)) / num_pos
+    specificity = (weights @ ((1 - preds) * (1 - labels))) / num_neg
+
+    metrics = []
+    for i, name in enumerate(names.tolist()):
+        stats = {
+            "group": name,
+            "num_videos": int(num_videos[i]),
+            "num_positives": int(num_pos[i]),
+            "accuracy": areas["accuracy"][i].item(),
+            "sensitivity": sensitivity[i].item(),
+            "specificity": specificity[i].item(),
+            "auroc": areas["auroc"][i].item(),
+            "auprc": areas["auprc"][i].item(),
+        }
+        # The rates of a missing class are NaN, which is not valid json.
+        metrics.append(
+            {key: value for key, value in stats.items() if value == value}
+        )
+    return metrics
+
+
+def evaluate_subgroups(cfg, paths_to_videos, scores, labels):
+    """
+    Join the test videos with the manifest and compute the metrics of the
+    subgroups of every column of SUBGROUP.COLUMNS.
+    Args:
+        cfg (CfgNode): configs. Details can be found in
+            slowfast/config/defaults.py
+        paths_to_videos (list): paths to the test videos.
+        scores (tensor): positive scores of the videos.
+        labels (tensor): labels of the videos.
+    Returns:
+        stats (list): the metrics of every subgroup, with its column.
+    """
+    manifest = load_manifest(cfg.SUBGROUP.MANIFEST)
+    rows = [manifest[video_id(path)] for path in paths_to_videos]
+    stats = []
+    for column in cfg.SUBGROUP.COLUMNS:
+        groups = [row[column] for row in rows]
+        for metrics in subgroup_metrics(
+            scores, labels, groups, cfg.BINARY_METRICS.THRESHOLD
+        ):
+            stats.append(dict(metrics, column=column))
+    return stats
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+
+"""Models of the repo configs for the tests."""
+
+import os
+import torch
+
+from slowfast.config.defaults import get_cfg
+from slowfast.models import build_model
+
+_CONFIGS = os.path.join(os.path.dirname(__file__), "..", "configs")
+
+
+def build_test_model(config, opts):
+    """
+    Build the model of a config on CPU, in eval mode. The PD backbone keeps
+    random weights, not to load or download pretrained ones.
+    Args:
+        config (str): path to the config, relative to configs/.
+        opts (list): config options overriding those of the file.
+    Returns:
+        model (model): the model.
+        cfg (CfgNode): its configs.
+    """
+    cfg = get_cfg()
+    cfg.merge_from_file(os.path.join(_CONFIGS, config))
+    cfg.merge_from_list(["NUM_GPUS", 0, "PD.BACKBONE_PRETRAINED", False])
+    cfg.merge_from_list(opts)
+    torch.manual_seed(0)
+    return build_model(cfg).eval(), cfg
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+
+import unittest
+import torch
+from sklearn.metrics import (
+    auc,
+    f1_score,
+    precision_recall_curve,
+    recall_score,
+    roc_auc_score,
+)
+
+from slowfast.utils.binary_metrics import BinaryMetrics, positive_scores
+
+
+class TestBinaryMetrics(unittest.TestCase):
+    def setUp(self):
+        generator = torch.Generator().manual_seed(0)
+        self.labels = torch.randint(2, (5000,), generator=generator)
+        scores = (torch.rand(5000, generator=generator) + self.labels) / 2
+        # Scores rounded to 1e-3, so that many of them are tied.
+        self.scores = (scores * 1000).round() / 1000
+
+    def _metrics(self, exact, num_bins=1000):
+        metrics = BinaryMetrics(num_bins, 0.5, exact)
+        for scores, labels in zip(
+            self.scores.split(64), self.labels.split(64)
+        ):
+            metrics.update(scores, labels)
+        return metrics.compute()
+
+    def _sklearn(self):
+        labels, scores = self.labels.numpy(), self.scores.numpy()
+        preds = scores > 0.5
+        precision, recall, _ = precision_recall_curve(labels, scores)
+        return {
+            "auroc": roc_auc_score(labels, scores),
+            "auprc": auc(recall, precision),
+            "f1": f1_score(labels, preds),
+            "sensitivity": recall_score(labels, preds),
+            "specificity": recall_score(1 - labels, ~preds),
+            "accuracy": (preds == labels).mean(),
+        }
+
+    def test_exact_matches_sklearn(self):
+        stats = self._metrics(exact=True)
+        for name, value in self._sklearn().items():
+            self.assertAlmostEqual(stats[name], value, places=6, msg=name)
+
+    def test_histogram_matches_sklearn(self):
+        reference = self._sklearn()
+        stats = self._metrics(exact=False)
+        for name in ("auroc", "auprc"):
+            self.assertAlmostEqual(
+                stats[name], reference[name], delta=1e-4, msg=name
+            )
+        # The threshold metrics do not depend on the bins.
+        for name in ("f1", "sensitivity", "specificity", "accuracy"):
+            self.assertAlmostEqual(
+                stats[name], reference[name], places=6, msg=name
+            )
+        # Coarse bins merge the scores into ties, and only lose accuracy.
+        coarse = self._metrics(exact=False, num_bins=10)
+        self.assertLess(abs(coarse["auroc"] - reference["auroc"]), 0.02)
+
+    def test_single_class(self):
+        metrics = BinaryMetrics()
+        metrics.update(self.scores, torch.ones_like(self.labels))
+        stats = metrics.compute()
+        self.assertNotIn("auroc", stats)
+        self.assertNotIn("auprc", stats)
+        self.assertAlmostEqual(
+            stats["sensitivity"], (self.scores > 0.5).double().mean().item()
+        )
+
+    def test_reset(self):
+        metrics = BinaryMetrics()
+        metrics.update(self.scores, 1 - self.labels)
+        metrics.reset()
+        metrics.update(self.scores, self.labels)
+        stats = metrics.compute()
+        self.assertAlmostEqual(
+            stats["auroc"], self._sklearn()["auroc"], delta=1e-4
+        )
+
+    def test_positive_scores(self):
+        logits = torch.randn(8, 3)
+        probs = logits.softmax(dim=1)
+        expected = 1.0 - probs[:, 0]
+        self.assertTrue(
+            torch.allclose(positive_scores(logits, is_prob=False), expected)
+        )
+        # Sums of probabilities over views are normalized.
+        self.assertTrue(torch.allclose(positive_scores(4 * probs), expected))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+
+import unittest
+import numpy as np
+import torch
+from sklearn.metrics import auc, precision_recall_curve, roc_auc_score
+
+from slowfast.utils import bootstrap
+
+
+class TestBootstrap(unittest.TestCase):
+    def setUp(self):
+        generator = torch.Generator().manual_seed(0)
+        self.labels = torch.randint(2, (200,), generator=generator)
+        self.scores = (
+            torch.rand(200, generator=generator) + 0.5 * self.labels
+        ) / 1.5
+
+    def test_unit_weights_match_sklearn(self):
+        # Scores tied in groups of ten, to check the half counted ties.
+        scores = (self.scores * 10).round() / 10
+        for s in (self.scores, scores):
+            metrics = bootstrap.weighted_metrics(
+                s, self.labels, torch.ones(1, len(s))
+            )
+            precision, recall, _ = precision_recall_curve(
+                self.labels.numpy(), s.numpy()
+            )
+            self.assertAlmostEqual(
+                metrics["auroc"].item(),
+                roc_auc_score(self.labels.numpy(), s.numpy()),
+                places=6,
+            )
+            self.assertAlmostEqual(
+                metrics["auprc"].item(), auc(recall, precision), places=6
+            )
+            self.assertAlmostEqual(
+                metrics["accuracy"].item(),
+                ((s > 0.5).long() == self.labels).double().mean().item(),
+                places=6,
+            )
+
+    def test_integer_weights_repeat_videos(self):
+        weights = torch.randint(
+            3, (1, 200), generator=torch.Generator().manual_seed(1)
+        )
+        index = torch.arange(200).repeat_interleave(weights[0])
+        repeated = bootstrap.weighted_metrics(
+            self.scores[index],
+            self.labels[index],
+            torch.ones(1, len(index)),
+        )
+        weighted = bootstrap.weighted_metrics(
+            self.scores, self.labels, weights
+        )
+        for name in ("auroc", "auprc", "accuracy"):
+            self.assertAlmostEqual(
+                weighted[name].item(), repeated[name].item(), places=6
+            )
+
+    def test_single_class_is_nan(self):
+        metrics = bootstrap.weighted_metrics(
+            self.scores, torch.ones(200), torch.ones(1, 200)
+        )
+        self.assertTrue(np.isnan(metrics["auroc"].item()))
+        self.assertTrue(np.isnan(metrics["auprc"].item()))
+        self.assertAlmostEqual(
+            metrics["accuracy"].item(),
+            (self.scores > 0.5).double().mean().item(),
+            places=6,
+        )
+
+    def test_intervals(self):
+        intervals = bootstrap.bootstrap_intervals(
+            self.scores, self.labels, num_samples=500, seed=3
+        )
+        again = bootstrap.bootstrap_intervals(
+            self.scores, self.labels, num_samples=500, seed=3
+        )
+        self.assertEqual(intervals, again)
+        self.assertAlmostEqual(
+            intervals["auroc"][0],
+            roc_auc_score(self.labels.numpy(), self.scores.numpy()),
+            places=6,
+        )
+        for point, low, high in intervals.values():
+            self.assertLess(low, point)
+            self.assertLess(point, high)
+
+    def test_stratified_groups(self):
+        # Ten videos per subject, all with the label of the subject.
+        groups = torch.arange(200) // 10
+        labels = (groups % 2 == 0).long()
+        weights = bootstrap.resample_weights(
+            labels,
+            100,
+            groups,
+            stratify=True,
+            generator=torch.Generator().manual_seed(0),
+        )
+        # Subjects are drawn as a whole and keep the numbers of positive
+        # and negative videos.
+        per_subject = weights.view(100, 20, 10)
+        self.assertTrue(
+            (per_subject == per_subject[:, :, :1]).all().item()
+        )
+        self.assertTrue(((weights * labels).sum(1) == 100).all().item())
+        self.assertTrue(
+            ((weights * (1 - labels)).sum(1) == 100).all().item()
+        )
+
+    def test_mixed_label_groups(self):
+        # Subjects with both labels are positive subjects.
+        groups = torch.arange(200) // 10
+        labels = torch.zeros(200, dtype=torch.long)
+        labels[groups % 4 == 0] = 1
+        labels[(groups % 4 == 1) & (torch.arange(200) % 10 > 6)] = 1
+        generator = torch.Generator().manual_seed(0)
+        weights = bootstrap.resample_weights(
+            labels, 100, groups, stratify=True, generator=generator
+        )
+        mixed = groups % 4 < 2
+        subject_draws = weights.view(100, 20, 10)[:, :, 0]
+        self.assertTrue(
+            (subject_draws[:, mixed[::10]].sum(1) == 10).all().item()
+        )
+        self.assertTrue(
+            (subject_draws[:, ~mixed[::10]].sum(1) == 10).all().item()
+        )
+        # The strata do not depend on the order of the videos.
+        order = torch.randperm(200, generator=generator)
+        shuffled = bootstrap.resample_weights(
+            labels[order],
+            100,
+            groups[order],
+            stratify=True,
+            generator=torch.Generator().manual_seed(0),
+        )
+        self.assertTrue(torch.equal(shuffled, weights[:, order]))
+
+    def test_groups_change_intervals_only(self):
+        groups = torch.arange(200) // 20
+        videos = bootstrap.bootstrap_intervals(
+            self.scores, self.labels, num_samples=500, stratify=False
+        )
+        subjects = bootstrap.bootstrap_intervals(
+            self.scores,
+            self.labels,
+            num_samples=500,
+            groups=groups,
+            stratify=False,
+        )
+        self.assertEqual(videos["auroc"][0], subjects["auroc"][0])
+        self.assertNotEqual(videos["auroc"][1:], subjects["auroc"][1:])
+
+
+if __name__ == "__main__":
+    unittest.main()
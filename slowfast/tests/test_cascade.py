@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+
+import os
+import sys
+import unittest
+from unittest import mock
+import torch
+
+from slowfast.config.defaults import get_cfg
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "tools"))
+import cascade_net  # noqa: E402
+
+
+class TestCascade(unittest.TestCase):
+    def test_multi_class_second_stage(self):
+        # A two class screener sees 0/1 labels, the 11 class expensive
+        # model the severities.
+        severities = torch.tensor([0, 3, 2, 0, 1])
+        screen_scores = torch.tensor([0.1, 0.5, 0.6, 0.2, 0.9])
+        full_scores = torch.tensor([0.2, 0.9, 0.8, 0.7, 0.6])
+        screen_cfg, full_cfg = get_cfg(), get_cfg()
+        screen_cfg.CASCADE.BAND = [0.4, 0.7]
+        full_cfg.MODEL.NUM_CLASSES = 11
+
+        def run_stage(cfg, model, test_loader, video_ids=None):
+            ids = list(range(5)) if video_ids is None else video_ids
+            if cfg is screen_cfg:
+                return screen_scores[ids], (severities[ids] > 0).long(), 1.0
+            return full_scores[ids], severities[ids], 1.0
+
+        with mock.patch.object(
+            cascade_net, "build_stage", return_value=(None, None)
+        ), mock.patch.object(
+            cascade_net, "_videos", return_value=([], [])
+        ), mock.patch.object(
+            cascade_net, "run_stage", side_effect=run_stage
+        ):
+            stats = cascade_net.cascade(screen_cfg, full_cfg)
+        self.assertEqual(stats["escalated"], 2)
+        # Escalated videos 1 and 2 are replaced by the expensive scores.
+        self.assertAlmostEqual(stats["top1_acc"], 100.0)
+        self.assertAlmostEqual(stats["auroc"], 1.0)
+        self.assertAlmostEqual(stats["full_top1_acc"], 80.0)
+        self.assertAlmostEqual(stats["full_auroc"], 5.0 / 6.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
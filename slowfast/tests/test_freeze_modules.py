@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+
+import unittest
+import torch
+import torch.nn as nn
+
+from slowfast.models.utils import freeze_modules, is_frozen
+
+
+class _Failing(nn.Module):
+    def forward(self, x):
+        raise RuntimeError("forward failed")
+
+
+def _model():
+    torch.manual_seed(0)
+    return nn.Sequential(
+        nn.Sequential(nn.Linear(4, 8), nn.ReLU(), nn.Linear(8, 8)),
+        nn.Linear(8, 8),
+        nn.Sequential(nn.Linear(8, 8), nn.ReLU()),
+        nn.Linear(8, 2),
+    )
+
+
+class TestFreezeModules(unittest.TestCase):
+    def test_parameters(self):
+        model = _model()
+        num_frozen = freeze_modules(model, ["0", "2.0"])
+        self.assertEqual(num_frozen, 4 * 8 + 8 + 8 * 8 + 8 + 8 * 8 + 8)
+        for name, param in model.named_parameters():
+            self.assertEqual(
+                param.requires_grad, not is_frozen(name, ["0", "2.0"]), name
+            )
+
+    def test_gradients_match(self):
+        # Freezing must give the gradients of only turning off requires_grad.
+        x = torch.randn(5, 4)
+        reference = _model()
+        for param in reference[0].parameters():
+            param.requires_grad_(False)
+        for param in reference[2].parameters():
+            param.requires_grad_(False)
+        reference(x).sum().backward()
+
+        model = _model()
+        freeze_modules(model, ["0", "2"])
+        model(x).sum().backward()
+        for (name, param), ref in zip(
+            model.named_parameters(), reference.parameters()
+        ):
+            if param.requires_grad:
+                self.assertTrue(torch.allclose(param.grad, ref.grad), name)
+            else:
+                self.assertIsNone(param.grad, name)
+
+    def test_frozen_prefix_is_not_recorded(self):
+        model = _model()
+        freeze_modules(model, ["0"])
+        x = torch.randn(5, 4)
+        self.assertFalse(model[0](x).requires_grad)
+        # A frozen module after a trainable one still records the graph.
+        freeze_modules(model, ["2"])
+        hidden = model[1](model[0](x))
+        self.assertTrue(model[2](hidden).requires_grad)
+        self.assertTrue(torch.is_grad_enabled())
+
+    def test_grad_mode_restored(self):
+        model = _model()
+        freeze_modules(model, ["0"])
+        model(torch.randn(5, 4))
+        self.assertTrue(torch.is_grad_enabled())
+        with torch.no_grad():
+            model(torch.randn(5, 4))
+            self.assertFalse(torch.is_grad_enabled())
+        self.assertTrue(torch.is_grad_enabled())
+
+    @unittest.skipIf(
+        int(torch.__version__.split(".")[0]) < 2,
+        "The forward hooks are only called on errors from torch 2.0 on.",
+    )
+    def test_grad_mode_restored_on_error(self):
+        model = nn.Sequential(nn.Linear(4, 4), _Failing())
+        freeze_modules(model, ["0", "1"])
+        with self.assertRaises(RuntimeError):
+            model(torch.randn(5, 4))
+        self.assertTrue(torch.is_grad_enabled())
+        self.assertEqual(model[1]._frozen_grad_enabled, [])
+
+    def test_is_frozen(self):
+        self.assertTrue(is_frozen("s1", ["s1"]))
+        self.assertTrue(is_frozen("s1.pathway0_stem", ["s1"]))
+        self.assertFalse(is_frozen("s10", ["s1"]))
+        self.assertFalse(is_frozen("s2", []))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+
+import unittest
+import torch
+import torch.nn as nn
+
+import slowfast.utils.misc as misc
+from slowfast.models import fuse_helper
+
+from model_helper import build_test_model
+
+
+def _build_model(config, opts):
+    model, cfg = build_test_model(config, opts)
+    # Random statistics and affine parameters, so that the folding is not
+    # close to an identity.
+    for module in model.modules():
+        if isinstance(module, nn.modules.batchnorm._BatchNorm):
+            module.running_mean.uniform_(-0.5, 0.5)
+            module.running_var.uniform_(0.5, 2.0)
+            module.weight.data.uniform_(0.5, 1.5)
+            module.bias.data.uniform_(-0.5, 0.5)
+    return model, cfg
+
+
+def _num_batchnorms(model):
+    return sum(
+        isinstance(module, nn.modules.batchnorm._BatchNorm)
+        for module in model.modules()
+    )
+
+
+class TestFuseConvBn(unittest.TestCase):
+    def _check(self, config, opts, min_fused):
+        model, cfg = _build_model(config, opts)
+        inputs = list(misc._get_model_analysis_input(cfg, False))
+        if cfg.MODEL.MODEL_NAME == "ResNet":
+            # The PD region model also takes the region boxes.
+            inputs.append(misc.get_dummy_bboxes(cfg))
+        num_bns = _num_batchnorms(model)
+        with torch.no_grad():
+            expected = model(*inputs)
+            num_fused = fuse_helper.fuse_conv_bn(model)
+            outputs = model(*inputs)
+        self.assertGreaterEqual(num_fused, min_fused)
+        self.assertEqual(_num_batchnorms(model), num_bns - num_fused)
+        self.assertTrue(
+            torch.allclose(outputs, expected, rtol=1e-4, atol=1e-5),
+            (outputs - expected).abs().max(),
+        )
+
+    def test_x3d(self):
+        self._check(
+            "Kinetics/X3D_XS.yaml",
+            ["DATA.NUM_FRAMES", 4],
+            40,
+        )
+
+    def test_pd_region_model(self):
+        self._check(
+            "PD/C2D_8x8_R50.yaml",
+            [
+                "DATA.NUM_FRAMES",
+                2,
+                "MODEL.NUM_CLASSES",
+                2,
+                "PD.TOKEN_PROJ_DIM",
+                192,
+            ],
+            43,
+        )
+
+    def test_training_mode(self):
+        model, _ = _build_model(
+            "Kinetics/X3D_XS.yaml", ["DATA.NUM_FRAMES", 4]
+        )
+        with self.assertRaises(AssertionError):
+            fuse_helper.fuse_conv_bn(model.train())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+
+import os
+import pprint
+import tempfile
+import unittest
+
+from slowfast.config.defaults import get_cfg
+from slowfast.utils.log_ingest import scan_range
+
+_PREFIX = "[10/19 12:00:00][INFO] train_net.py:  {}: "
+
+
+def _log(config_text):
+    lines = [
+        _PREFIX.format(660) + "Train with config:",
+        _PREFIX.format(661) + config_text,
+        _PREFIX.format(700)
+        + 'json_stats: {"_type": "train_epoch", "epoch": "1/10", '
+        '"loss": 0.50000}',
+    ]
+    return "\n".join(lines) + "\n"
+
+
+class TestParseConfig(unittest.TestCase):
+    def _config(self, config_text):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "stdout.log")
+            with open(path, "w") as f:
+                f.write(_log(config_text))
+            table, config = scan_range(
+                path, 0, os.path.getsize(path), ("train_epoch",)
+            )
+        self.assertEqual(table.num_rows, 1)
+        return config
+
+    def test_yaml_config(self):
+        cfg = get_cfg()
+        config = self._config(str(cfg))
+        self.assertEqual(config["MODEL"]["MODEL_NAME"], cfg.MODEL.MODEL_NAME)
+        self.assertEqual(config["SOLVER"]["STEPS"], list(cfg.SOLVER.STEPS))
+
+    def test_pprint_config(self):
+        # The train logs of older runs dump the CfgNode repr.
+        cfg = get_cfg()
+        config = self._config(pprint.pformat(cfg))
+        self.assertEqual(config["MODEL"]["MODEL_NAME"], cfg.MODEL.MODEL_NAME)
+        self.assertEqual(config["SOLVER"]["STEPS"], cfg.SOLVER.STEPS)
+        self.assertEqual(
+            config["CONTRASTIVE"]["DELTA_CLIPS_MIN"], float("-inf")
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+
+import unittest
+import torch
+
+from slowfast.utils import meters
+
+NUM_VIDEOS = 20
+NUM_CLIPS = 6
+NUM_CLASSES = 3
+
+
+def loop_update_stats(meter, preds, labels, clip_ids):
+    """
+    The per clip TestMeter.update_stats the vectorized one replaced.
+    """
+    for ind in range(preds.shape[0]):
+        vid_id = int(clip_ids[ind]) // meter.num_clips
+        if meter.video_labels[vid_id].sum() > 0:
+            assert torch.equal(
+                meter.video_labels[vid_id].type(torch.FloatTensor),
+                labels[ind].type(torch.FloatTensor),
+            )
+        meter.video_labels[vid_id] = labels[ind]
+        if meter.ensemble_method == "sum":
+            meter.video_preds[vid_id] += preds[ind]
+        else:
+            meter.video_preds[vid_id] = torch.max(
+                meter.video_preds[vid_id], preds[ind]
+            )
+        meter.clip_count[vid_id] += 1
+
+
+def batches(multi_label, shuffle, batch_size=8):
+    """
+    Random batches of every clip of every video. Without shuffle, the
+    clips of a video are consecutive and most batches hold several clips of
+    the same video.
+    """
+    generator = torch.Generator().manual_seed(0)
+    if multi_label:
+        video_labels = (
+            torch.rand(NUM_VIDEOS, NUM_CLASSES, generator=generator) > 0.5
+        ).float()
+    else:
+        video_labels = torch.randint(
+            NUM_CLASSES, (NUM_VIDEOS,), generator=generator
+        )
+    if shuffle:
+        clip_ids = torch.randperm(NUM_VIDEOS * NUM_CLIPS, generator=generator)
+    else:
+        clip_ids = torch.arange(NUM_VIDEOS * NUM_CLIPS)
+    result = []
+    for ids in clip_ids.split(batch_size):
+        # Logits, so that the max ensemble also sees negative predictions.
+        preds = torch.randn(len(ids), NUM_CLASSES, generator=generator)
+        result.append((preds, video_labels[ids // NUM_CLIPS], ids))
+    return result
+
+
+class TestTestMeter(unittest.TestCase):
+    def _meter(self, ensemble_method, multi_label=False):
+        return meters.TestMeter(
+            NUM_VIDEOS,
+            NUM_CLIPS,
+            NUM_CLASSES,
+            1,
+            multi_label,
+            ensemble_method,
+        )
+
+    def _compare(self, ensemble_method, multi_label, shuffle):
+        reference = self._meter(ensemble_method, multi_label)
+        meter = self._meter(ensemble_method, multi_label)
+        for preds, labels, clip_ids in batches(multi_label, shuffle):
+            loop_update_stats(reference, preds, labels, clip_ids)
+            meter.update_stats(preds, labels, clip_ids)
+        self.assertTrue(
+            torch.allclose(meter.video_preds, reference.video_preds)
+        )
+        self.assertTrue(
+            torch.equal(meter.video_labels, reference.video_labels)
+        )
+        self.assertTrue(torch.equal(meter.clip_count, reference.clip_count))
+        self.assertTrue((meter.clip_count == NUM_CLIPS).all())
+
+    def test_matches_loop(self):
+        for ensemble_method in ("sum", "max"):
+            for multi_label in (False, True):
+                for shuffle in (False, True):
+                    with self.subTest(
+                        ensemble_method=ensemble_method,
+                        multi_label=multi_label,
+                        shuffle=shuffle,
+                    ):
+                        self._compare(ensemble_method, multi_label, shuffle)
+
+    def test_duplicate_videos_in_batch(self):
+        # Every clip of two videos in a single batch.
+        clip_ids = torch.tensor([0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11])
+        preds = torch.randn(
+            12, NUM_CLASSES, generator=torch.Generator().manual_seed(1)
+        )
+        labels = torch.tensor([1] * 6 + [2] * 6)
+        for ensemble_method in ("sum", "max"):
+            meter = self._meter(ensemble_method)
+            meter.update_stats(preds, labels, clip_ids)
+            # The max ensemble starts from the zero predictions.
+            if ensemble_method == "sum":
+                expected = preds.view(2, 6, -1).sum(dim=1)
+            else:
+                expected = preds.view(2, 6, -1).amax(dim=1).clamp(min=0)
+            self.assertTrue(torch.allclose(meter.video_preds[:2], expected))
+            self.assertEqual(meter.clip_count[:2].tolist(), [6, 6])
+            self.assertEqual(meter.video_labels[:2].tolist(), [1, 2])
+
+    def test_label_change(self):
+        meter = self._meter("sum")
+        meter.update_stats(
+            torch.randn(1, NUM_CLASSES), torch.tensor([1]), torch.tensor([0])
+        )
+        with self.assertRaises(AssertionError):
+            meter.update_stats(
+                torch.randn(1, NUM_CLASSES),
+                torch.tensor([2]),
+                torch.tensor([1]),
+            )
+
+    def test_unknown_ensemble_method(self):
+        meter = self._meter("mean")
+        with self.assertRaises(NotImplementedError):
+            meter.update_stats(
+                torch.randn(1, NUM_CLASSES),
+                torch.tensor([1]),
+                torch.tensor([0]),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
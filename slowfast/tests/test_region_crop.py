@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+
+import unittest
+import torch
+import torch.nn.functional as F
+from fvcore.nn import FlopCountAnalysis
+
+from model_helper import build_test_model
+
+
+def _smooth_frames(num_frames):
+    """
+    Clip of shape (1, 3, num_frames, 256, 256) without pixel noise, as
+    natural frames.
+    """
+    torch.manual_seed(1)
+    frames = F.interpolate(
+        torch.rand(num_frames, 3, 16, 16), size=256, mode="bilinear"
+    )
+    return frames.transpose(0, 1)[None]
+
+
+def _boxes(corners, num_frames, num_regions):
+    corners = torch.tensor(corners, dtype=torch.float)
+    return corners.expand(1, num_frames, num_regions, 4, 2).clone()
+
+
+class TestRegionCrop(unittest.TestCase):
+    """
+    The `crop` region mode against the `roi` one on fixed inputs and the same
+    weights.
+
+    At the backbone resolution (REGION_CROP_SIZE 224) on the box of the 224
+    center crop the two modes see the same pixels and only differ by the
+    pooling of the layer3 map: RoI align of the floored box vs average
+    pooling, cosine above 0.99. At the default 48 pixel crops, the backbone
+    sees 4.7x fewer pixels per region and the features diverge, cosine about
+    0.85 here and 0.8 with the face backbone: the modes are not
+    interchangeable and a crop model needs its own training.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model, cls.cfg = build_test_model(
+            "PD/C2D_8x8_R50.yaml",
+            [
+                "DATA.NUM_FRAMES",
+                2,
+                "MODEL.NUM_CLASSES",
+                2,
+                "PD.TOKEN_PROJ_DIM",
+                192,
+            ],
+        )
+        cls.num_frames = cls.cfg.DATA.NUM_FRAMES
+        cls.num_regions = cls.cfg.PD.NUM_REGIONS
+        cls.frames = _smooth_frames(cls.num_frames)
+        cls.center = _boxes(
+            [[16, 16], [240, 16], [240, 240], [16, 240]],
+            cls.num_frames,
+            cls.num_regions,
+        )
+
+    def _features(self, crop_size, bboxes):
+        model = self.model
+        model.region_crop_size = crop_size
+        features = {}
+        with torch.no_grad():
+            for mode in ["roi", "crop"]:
+                model.region_mode = mode
+                features[mode] = model.frame_region_features(
+                    self.frames, bboxes
+                )
+        model.region_mode = self.cfg.PD.REGION_MODE
+        model.region_crop_size = self.cfg.PD.REGION_CROP_SIZE
+        return features["roi"], features["crop"]
+
+    def test_full_frame_crop(self):
+        # A crop covering the frame at its size is the normalized frame.
+        frame = self.frames[:, :, :1]
+        corners = _boxes([[0, 0], [256, 0], [256, 256], [0, 256]], 1, 1)
+        with torch.no_grad():
+            crop = self.model.crop_regions(frame, corners, 256)
+        mean = torch.tensor(self.model.pixel_mean).reshape(3, 1, 1)
+        std = torch.tensor(self.model.pixel_std).reshape(3, 1, 1)
+        expected = (frame[0, :, 0] - mean) / std
+        self.assertLess((crop[0] - expected).abs().max().item(), 1e-5)
+
+    def test_center_crop_is_roi_input(self):
+        # The crop of the center box is the frame the roi mode runs on.
+        with torch.no_grad():
+            crop = self.model.crop_regions(
+                self.frames[:, :, :1], self.center[:, :1, :1], 224
+            )
+            frame = self.model.preprocess(self.frames[:, :, 0])
+        self.assertLess((crop - frame).abs().max().item(), 1e-5)
+
+    def test_parity_at_backbone_resolution(self):
+        roi, crop = self._features(224, self.center)
+        self.assertEqual(roi.shape, crop.shape)
+        cosine = F.cosine_similarity(roi.flatten(0, 2), crop.flatten(0, 2))
+        self.assertGreater(cosine.min().item(), 0.99)
+        self.assertLess(((roi - crop).norm() / roi.norm()).item(), 0.1)
+
+    def test_divergence_at_default_crop_size(self):
+        roi, crop = self._features(self.cfg.PD.REGION_CROP_SIZE, self.center)
+        self.assertEqual(roi.shape, crop.shape)
+        cosine = F.cosine_similarity(roi.flatten(0, 2), crop.flatten(0, 2))
+        self.assertGreater(cosine.mean().item(), 0.7)
+
+    def test_backbone_flops_ratio(self):
+        # The backbone cost is proportional to its pixels: 224^2 per frame
+        # in roi mode, NUM_REGIONS * REGION_CROP_SIZE^2 in crop mode, 1.56x
+        # fewer at the default 48 pixels and 3.5x at 32 pixels.
+        resnet = self.model.resnet.module
+        roi_flops = FlopCountAnalysis(resnet, torch.rand(1, 3, 224, 224))
+        for crop_size, expected in [(48, 1.56), (32, 3.5)]:
+            crop_flops = FlopCountAnalysis(
+                resnet, torch.rand(self.num_regions, 3, crop_size, crop_size)
+            )
+            for flops in [roi_flops, crop_flops]:
+                flops.unsupported_ops_warnings(False)
+                flops.uncalled_modules_warnings(False)
+            ratio = roi_flops.total() / crop_flops.total()
+            self.assertAlmostEqual(ratio, expected, delta=0.05 * expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+
+import json
+import os
+import tempfile
+import unittest
+import torch
+from sklearn.metrics import roc_auc_score
+
+from slowfast.utils.subgroups import manifest_subjects, subgroup_metrics
+
+
+class TestSubgroupMetrics(unittest.TestCase):
+    def setUp(self):
+        self.scores = torch.tensor([0.9, 0.2, 0.6, 0.4, 0.8, 0.7, 0.3])
+        self.labels = torch.tensor([1, 0, 1, 0, 0, 1, 1])
+        # Subject `b` only has positive videos.
+        self.groups = ["a", "a", "a", "a", "a", "b", "b"]
+
+    def _metrics(self):
+        return {
+            m["group"]: m
+            for m in subgroup_metrics(self.scores, self.labels, self.groups)
+        }
+
+    def test_two_classes(self):
+        metrics = self._metrics()
+        a = [i for i, g in enumerate(self.groups) if g == "a"]
+        self.assertEqual(metrics["a"]["num_videos"], len(a))
+        self.assertEqual(metrics["a"]["num_positives"], 2)
+        self.assertAlmostEqual(
+            metrics["a"]["auroc"],
+            roc_auc_score(self.labels[a].numpy(), self.scores[a].numpy()),
+        )
+        # 0.9 and 0.6 are positives, 0.8 is a false positive.
+        self.assertAlmostEqual(metrics["a"]["sensitivity"], 1.0)
+        self.assertAlmostEqual(metrics["a"]["specificity"], 2 / 3)
+        self.assertAlmostEqual(metrics["a"]["accuracy"], 4 / 5)
+
+    def test_single_class(self):
+        metrics = self._metrics()
+        single = metrics["b"]
+        self.assertEqual(single["num_videos"], 2)
+        self.assertEqual(single["num_positives"], 2)
+        for key in ["auroc", "auprc", "specificity"]:
+            self.assertNotIn(key, single)
+        self.assertAlmostEqual(single["sensitivity"], 0.5)
+        # The stats are logged with log_json_stats, which rejects NaN.
+        json.dumps(list(metrics.values()), allow_nan=False)
+
+    def test_manifest_subjects(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "manifest.csv")
+            with open(path, "w") as f:
+                f.write("video_id,person\n3,bob\n7,alice\n9,bob\n")
+            groups = manifest_subjects(
+                ["x/video9_20fps.mp4", "x/video3_20fps.mp4", "video7.mp4"],
+                path,
+            )
+        self.assertEqual(groups.tolist(), [1, 1, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+"""
+Report the serving cost of a distilled student next to its teacher: the
+number of parameters and the per clip forward latency, on CPU by default.
+The config is the student one, with its DISTILL options, e.g.
+    python tools/benchmark_distill.py --cfg configs/PD/x3d_xs_distill.yaml \
+        --opts TEST.CHECKPOINT_FILE_PATH path/to/student.pyth NUM_GPUS 0
+The accuracy of the student is given by tools/run_net.py with TEST.ENABLE,
+like for any other model.
+"""
+
+import torch
+
+import slowfast.utils.checkpoint as cu
+import slowfast.utils.logging as logging
+import slowfast.utils.misc as misc
+from slowfast.models import build_model
+from slowfast.models.distillation import Teacher
+from slowfast.utils.benchmark import forward_latency
+from slowfast.utils.parser import load_config, parse_args
+
+logger = logging.get_logger(__name__)
+
+
+def _inputs(cfg, batch_size):
+    """
+    Random test clips and region boxes of a config.
+    """
+    clip = misc._get_model_analysis_input(cfg, False)[0]
+    inputs = [x.repeat((batch_size,) + (1,) * (x.dim() - 1)) for x in clip]
+    bboxes = misc.get_dummy_bboxes(cfg, batch_size)
+    if cfg.NUM_GPUS:
+        inputs = [x.cuda() for x in inputs]
+        bboxes = bboxes.cuda()
+    return inputs, bboxes
+
+
+@torch.no_grad()
+def _latency(cfg, model, batch_size, num_iters):
+    """
+    Average the forward latency per clip, in ms, after a warm up pass.
+    """
+    inputs, bboxes = _inputs(cfg, batch_size)
+    device = torch.device("cuda" if cfg.NUM_GPUS else "cpu")
+    latency = forward_latency(model, (inputs, bboxes), num_iters, device)
+    return latency / batch_size
+
+
+def main():
+    args = parse_args()
+    cfg = load_config(args, args.cfg_files[0])
+    logging.setup_logging(cfg.OUTPUT_DIR)
+    torch.manual_seed(cfg.RNG_SEED)
+    cfg.NUM_GPUS = min(cfg.NUM_GPUS, 1)
+    cfg.DISTILL.CACHE_PATH = ""
+    num_iters = cfg.BENCHMARK.NUM_EPOCHS
+
+    student = build_model(cfg).eval()
+    cu.load_test_checkpoint(cfg, student)
+    teacher = Teacher(cfg, 0)
+    teacher.build()
+
+    stats = {}
+    for name, model_cfg, model in [
+        ("teacher", teacher.cfg, teacher.model),
+        ("student", cfg, student),
+    ]:
+        stats[name + "_model"] = model_cfg.MODEL.MODEL_NAME
+        stats[name + "_params"] = misc.params_count(model)
+        for batch_size in [1, cfg.TEST.BATCH_SIZE]:
+            stats["{}_bs{}_ms".format(name, batch_size)] = _latency(
+                model_cfg, model, batch_size, num_iters
+            )
+    for batch_size in [1, cfg.TEST.BATCH_SIZE]:
+        stats["bs{}_speedup".format(batch_size)] = (
+            stats["teacher_bs{}_ms".format(batch_size)]
+            / stats["student_bs{}_ms".format(batch_size)]
+        )
+    stats["device"] = "gpu" if cfg.NUM_GPUS else "cpu"
+    logging.log_json_stats(stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+"""
+Measure the memory and step time saved by running the frozen modules
+(TRAIN.FROZEN_MODULES) without autograd, compared with only turning off
+their requires_grad after building the optimizer. Several configs can be
+given, e.g.
+    python tools/benchmark_frozen.py \
+        --cfg configs/PD/I3D_8x8_R50.yaml configs/PD/x3d_xs.yaml
+"""
+
+import time
+import torch
+
+import slowfast.models.losses as losses
+import slowfast.models.optimizer as optim
+import slowfast.utils.logging as logging
+import slowfast.utils.misc as misc
+from slowfast.models import build_model
+from slowfast.models.utils import freeze_modules
+from slowfast.utils.parser import load_config, parse_args
+
+logger = logging.get_logger(__name__)
+
+
+def _saved_bytes(model, inputs, labels, loss_fun):
+    """
+    Size in bytes of the activations a forward pass keeps for backward.
+    """
+    storages = {}
+
+    def pack(tensor):
+        storage = tensor.untyped_storage()
+        storages[storage.data_ptr()] = storage.nbytes()
+        return tensor
+
+    with torch.autograd.graph.saved_tensors_hooks(pack, lambda x: x):
+        loss = loss_fun(model(*inputs), labels)
+    del loss
+    return sum(storages.values())
+
+
+def _step_time(model, inputs, labels, loss_fun, optimizer, num_iters):
+    """
+    Average time, in ms, and peak GPU memory, in GB, of a training step after
+    a warm up step.
+    """
+    for i in range(num_iters + 1):
+        if i == 1:
+            misc.reset_gpu_mem_peak()
+            start = time.perf_counter()
+        optimizer.zero_grad()
+        loss = loss_fun(model(*inputs), labels)
+        loss.backward()
+        optimizer.step()
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+    step_time = (time.perf_counter() - start) * 1000 / num_iters
+    return step_time, misc.gpu_mem_usage()
+
+
+def benchmark(cfg):
+    """
+    Train a model for a few steps on a random batch with its frozen modules
+    only excluded from the gradients, then with the frozen prefix mode.
+    Args:
+        cfg (CfgNode): configs. Details can be found in
+            slowfast/config/defaults.py
+    Returns:
+        stats (dict): saved activation size, step time and peak GPU memory
+            of both modes.
+    """
+    assert cfg.TRAIN.FROZEN_MODULES, "Set TRAIN.FROZEN_MODULES."
+    torch.manual_seed(cfg.RNG_SEED)
+    cfg.NUM_GPUS = min(cfg.NUM_GPUS, 1)
+    model = build_model(cfg).train()
+    batch_size = cfg.TRAIN.BATCH_SIZE
+    clip = misc._get_model_analysis_input(cfg, True)[0]
+    inputs = [[x.repeat((batch_size,) + (1,) * (x.dim() - 1)) for x in clip]]
+    if cfg.MODEL.MODEL_NAME == "ResNet":
+        # The PD region model also takes the region boxes.
+        inputs.append(misc.get_dummy_bboxes(cfg, batch_size))
+    labels = torch.zeros(batch_size, dtype=torch.long)
+    if cfg.NUM_GPUS:
+        inputs[0] = [x.cuda() for x in inputs[0]]
+        inputs[1:] = [x.cuda() for x in inputs[1:]]
+        labels = labels.cuda()
+    loss_fun = losses.get_loss_func(cfg.MODEL.LOSS_FUNC)(reduction="mean")
+    num_iters = cfg.BENCHMARK.NUM_EPOCHS
+
+    # Previous behavior: the optimizer is built first, then the frozen
+    # parameters stop requiring grad.
+    optimizer = optim.construct_optimizer(model, cfg)
+    for name in cfg.TRAIN.FROZEN_MODULES:
+        for param in model.get_submodule(name).parameters():
+            param.requires_grad_(False)
+    stats = {
+        "saved_mb": _saved_bytes(model, inputs, labels, loss_fun) / 2 ** 20
+    }
+    stats["step_ms"], stats["gpu_mem"] = _step_time(
+        model, inputs, labels, loss_fun, optimizer, num_iters
+    )
+
+    num_frozen = freeze_modules(model, cfg.TRAIN.FROZEN_MODULES)
+    optimizer = optim.construct_optimizer(model, cfg)
+    stats["frozen_saved_mb"] = (
+        _saved_bytes(model, inputs, labels, loss_fun) / 2 ** 20
+    )
+    stats["frozen_step_ms"], stats["frozen_gpu_mem"] = _step_time(
+        model, inputs, labels, loss_fun, optimizer, num_iters
+    )
+    stats.update(
+        {
+            "model": cfg.MODEL.MODEL_NAME,
+            "batch_size": batch_size,
+            "frozen_params": num_frozen,
+            "optimizer_params": sum(
+                p.numel()
+                for group in optimizer.param_groups
+                for p in group["params"]
+            ),
+            "speedup": stats["step_ms"] / stats["frozen_step_ms"],
+        }
+    )
+    return stats
+
+
+def main():
+    args = parse_args()
+    for path_to_config in args.cfg_files:
+        cfg = load_config(args, path_to_config)
+        logging.setup_logging(cfg.OUTPUT_DIR)
+        stats = benchmark(cfg)
+        stats["cfg"] = path_to_config
+        logging.log_json_stats(stats)
+
+
+if __name__ == "__main__":
+    main()
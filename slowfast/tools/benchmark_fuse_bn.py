@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+"""
+Check that folding BatchNorm into the convolutions (TEST.FUSE_CONV_BN) keeps
+the outputs of a model unchanged, and measure the resulting CPU speedup.
+Several configs can be given, e.g.
+    python tools/benchmark_fuse_bn.py \
+        --cfg configs/PD/x3d_xs.yaml configs/PD/I3D_8x8_R50.yaml
+"""
+
+import torch
+
+import slowfast.utils.logging as logging
+import slowfast.utils.misc as misc
+from slowfast.models import build_model, fuse_helper
+from slowfast.utils.benchmark import forward_latency
+from slowfast.utils.parser import load_config, parse_args
+
+logger = logging.get_logger(__name__)
+
+
+@torch.no_grad()
+def benchmark(cfg):
+    """
+    Compare a model with its BatchNorm folded copy on a random clip.
+    Args:
+        cfg (CfgNode): configs. Details can be found in
+            slowfast/config/defaults.py
+    Returns:
+        stats (dict): number of folded layers, max abs output difference and
+            latencies (ms) of both models.
+    """
+    cfg.NUM_GPUS = 0
+    torch.manual_seed(cfg.RNG_SEED)
+    model = build_model(cfg).eval()
+
+    inputs = list(misc._get_model_analysis_input(cfg, False))
+    if cfg.MODEL.MODEL_NAME == "ResNet":
+        # The PD region model also takes the region boxes.
+        inputs.append(misc.get_dummy_bboxes(cfg))
+    num_iters = cfg.BENCHMARK.NUM_EPOCHS
+    cpu = torch.device("cpu")
+    ref_out = model(*inputs)
+    ref_time = forward_latency(model, inputs, num_iters, cpu)
+
+    num_fused = fuse_helper.fuse_conv_bn(model)
+    fused_out = model(*inputs)
+    fused_time = forward_latency(model, inputs, num_iters, cpu)
+    return {
+        "model": cfg.MODEL.MODEL_NAME,
+        "arch": cfg.MODEL.ARCH,
+        "num_fused": num_fused,
+        "max_abs_diff": (fused_out - ref_out).abs().max().item(),
+        "time_ms": ref_time,
+        "fused_time_ms": fused_time,
+        "speedup": ref_time / fused_time,
+    }
+
+
+def main():
+    args = parse_args()
+    for path_to_config in args.cfg_files:
+        cfg = load_config(args, path_to_config)
+        logging.setup_logging(cfg.OUTPUT_DIR)
+        stats = benchmark(cfg)
+        stats["cfg"] = path_to_config
+        logging.log_json_stats(stats)
+
+
+if __name__ == "__main__":
+    main()
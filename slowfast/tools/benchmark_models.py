@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+"""
+Compare the cost of the PD models: parameters, FLOPs, peak memory and the
+forward and backward latency percentiles of a train step on random clips and
+region boxes, at every batch size of BENCHMARK.BATCH_SIZES, on CPU and on GPU
+if there is one, e.g.
+    python tools/benchmark_models.py --cfg configs/PD/C2D_8x8_R50.yaml \
+        configs/PD/I3D_8x8_R50.yaml configs/PD/slowfast.yaml \
+        configs/PD/x3d_xs.yaml configs/PD/MVIT_16x4.yaml \
+        --opts BENCHMARK.NUM_ITERS 5
+The comparison table is logged and written as csv to BENCHMARK.MODELS_FILE in
+OUTPUT_DIR. The PD backbones keep random weights (PD.BACKBONE_PRETRAINED
+False), so that the benchmark runs offline. Every setting runs in a fresh
+process so that the memory of one setting is not polluted by the previous
+ones. If no config can be loaded, the table of their errors is written to the
+OUTPUT_DIR of the --opts.
+"""
+
+import csv
+import multiprocessing as mp
+import os
+import psutil
+import torch
+
+import slowfast.models.losses as losses
+import slowfast.utils.logging as logging
+import slowfast.utils.misc as misc
+from slowfast.config.defaults import get_cfg
+from slowfast.models import build_model
+from slowfast.models.utils import freeze_modules
+from slowfast.utils.benchmark import PeakRss, StageTimer
+from slowfast.utils.env import pathmgr
+from slowfast.utils.parser import load_config, parse_args
+
+logger = logging.get_logger(__name__)
+
+# Columns of the comparison table.
+COLUMNS = [
+    "cfg",
+    "model",
+    "device",
+    "batch_size",
+    "params",
+    "gflops",
+    "peak_mem_mb",
+    "clips_per_s",
+]
+
+
+def _dummy_batch(cfg, model, batch_size):
+    """
+    Random clips, region boxes and labels of a train batch.
+    """
+    inputs = misc._get_model_analysis_input(
+        cfg, True, with_bboxes=misc.takes_bboxes(model)
+    )
+    clip = [
+        x.repeat((batch_size,) + (1,) * (x.dim() - 1)) for x in inputs[0]
+    ]
+    extra = [
+        x.repeat((batch_size,) + (1,) * (x.dim() - 1)) for x in inputs[1:]
+    ]
+    labels = torch.randint(cfg.MODEL.NUM_CLASSES, (batch_size,))
+    if cfg.NUM_GPUS:
+        labels = labels.cuda()
+    return [clip] + extra, labels
+
+
+def _benchmark(cfg, batch_size):
+    """
+    Builds a model and times its train steps on a random batch. Meant to run
+    in a fresh process.
+    Args:
+        cfg (CfgNode): configs. Details can be found in
+            slowfast/config/defaults.py
+        batch_size (int): number of clips per step.
+    Returns:
+        stats (dict): parameters, GFLOPs per clip, peak memory of the steps
+            over the model (MB), throughput and forward and backward latency
+            percentiles (ms).
+    """
+    torch.manual_seed(cfg.RNG_SEED)
+    device = torch.device("cuda" if cfg.NUM_GPUS else "cpu")
+    model = build_model(cfg)
+    stats = {"params": misc.params_count(model)}
+    if cfg.TRAIN.FROZEN_MODULES:
+        freeze_modules(model, cfg.TRAIN.FROZEN_MODULES)
+    model.train()
+    loss_fun = losses.get_loss_func(cfg.MODEL.LOSS_FUNC)(reduction="mean")
+    inputs, labels = _dummy_batch(cfg, model, batch_size)
+
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+        torch.cuda.reset_peak_memory_stats()
+        base_mem = torch.cuda.memory_allocated()
+    else:
+        base_mem = psutil.Process().memory_info().rss
+    timer = StageTimer(device)
+    num_warmup = cfg.BENCHMARK.WARMUP_ITERS
+    with PeakRss() as peak_rss:
+        for cur_iter in range(num_warmup + cfg.BENCHMARK.NUM_ITERS):
+            timer.enabled = cur_iter >= num_warmup
+            with timer.stage("forward"):
+                preds = model(*inputs)
+            with timer.stage("backward"):
+                loss_fun(preds, labels).backward()
+            model.zero_grad(set_to_none=True)
+    if device.type == "cuda":
+        peak_mem = torch.cuda.max_memory_allocated()
+    else:
+        peak_mem = peak_rss.peak
+    stats["peak_mem_mb"] = max(peak_mem - base_mem, 0) / 1024 ** 2
+    # Traced after the steps, not to count the trace in the peak memory.
+    stats["gflops"] = misc.get_model_stats(model, cfg, "flop", True)
+
+    summary = timer.summary(cfg.BENCHMARK.PERCENTILES)
+    step_ms = summary["forward"]["mean_ms"] + summary["backward"]["mean_ms"]
+    stats["clips_per_s"] = batch_size * 1000 / step_ms
+    for stage in ["forward", "backward"]:
+        for p in cfg.BENCHMARK.PERCENTILES:
+            key = "p{}_ms".format(p)
+            stats["{}_{}".format(stage, key)] = summary[stage][key]
+    return stats
+
+
+def _format_table(rows, columns):
+    """
+    Aligned text table of the rows.
+    """
+
+    def _format(value):
+        if isinstance(value, float):
+            return "{:.2f}".format(value)
+        if isinstance(value, int):
+            return "{:,}".format(value)
+        return str(value)
+
+    cells = [columns]
+    cells += [[_format(row.get(c, "")) for c in columns] for row in rows]
+    widths = [max(len(line[i]) for line in cells) for i in range(len(columns))]
+    return "\n".join(
+        "  ".join(cell.rjust(width) for cell, width in zip(line, widths))
+        for line in cells
+    )
+
+
+def main():
+    args = parse_args()
+    ctx = mp.get_context("spawn")
+    devices = ["cpu"] + (["cuda"] if torch.cuda.is_available() else [])
+    rows = []
+    cfg = None
+    for path_to_config in args.cfg_files:
+        # Keep comparing the other configs if one of them fails.
+        try:
+            cfg = load_config(args, path_to_config)
+        except Exception as e:
+            logger.warning(
+                "Failed to load {}: {!r}".format(path_to_config, e)
+            )
+            rows.append(
+                {"cfg": os.path.basename(path_to_config), "error": repr(e)}
+            )
+            continue
+        logging.setup_logging(cfg.OUTPUT_DIR)
+        # The times do not depend on the weights.
+        cfg.PD.BACKBONE_PRETRAINED = False
+        for device in devices:
+            cfg.NUM_GPUS = 1 if device == "cuda" else 0
+            for batch_size in cfg.BENCHMARK.BATCH_SIZES:
+                row = {
+                    "cfg": os.path.basename(path_to_config),
+                    "model": cfg.MODEL.MODEL_NAME,
+                    "device": device,
+                    "batch_size": batch_size,
+                }
+                try:
+                    with ctx.Pool(1) as pool:
+                        row.update(pool.apply(_benchmark, (cfg, batch_size)))
+                except Exception as e:
+                    logger.warning(
+                        "Failed to benchmark {} at batch size {}: {!r}".format(
+                            path_to_config, batch_size, e
+                        )
+                    )
+                    row["error"] = repr(e)
+                logging.log_json_stats(row)
+                rows.append(row)
+
+    if cfg is None:
+        # Every config failed to load, report their errors.
+        cfg = get_cfg()
+        try:
+            cfg.merge_from_list(args.opts or [])
+        except Exception:
+            pass
+        logging.setup_logging(cfg.OUTPUT_DIR)
+    columns = COLUMNS + [
+        "{}_p{}_ms".format(stage, p)
+        for stage in ["forward", "backward"]
+        for p in cfg.BENCHMARK.PERCENTILES
+    ]
+    logger.info("PD models:\n" + _format_table(rows, columns + ["error"]))
+    path = os.path.join(cfg.OUTPUT_DIR, cfg.BENCHMARK.MODELS_FILE)
+    with pathmgr.open(path, "w") as f:
+        writer = csv.DictWriter(f, columns + ["error"], extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+    logger.info("Wrote the model benchmark to {}".format(path))
+
+
+if __name__ == "__main__":
+    main()
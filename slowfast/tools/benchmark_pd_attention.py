@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+"""
+A script to benchmark the head of the PD region model, which aggregates the
+region features with the attention blocks of PD.ST_CONFIG, with and without
+scaled_dot_product_attention and the low rank token projection (PD.USE_SDPA,
+PD.TOKEN_PROJ_DIM).
+"""
+
+import multiprocessing as mp
+import psutil
+import time
+import torch
+
+import slowfast.utils.logging as logging
+from slowfast.models import build_model
+from slowfast.utils.benchmark import PeakRss
+from slowfast.utils.parser import load_config, parse_args
+
+logger = logging.get_logger(__name__)
+
+_NUM_ITERS = 10
+
+
+def _benchmark(cfg):
+    """
+    Times training steps (forward and backward) of the head of the PD model,
+    from the region features to the classifier, and measures their peak
+    memory. The head runs the token projection, the embeddings and the
+    attention blocks of PD.ST_CONFIG exactly as in training. The backbone is
+    built with random weights and dropped before the steps. Meant to run in a
+    fresh process so that the settings do not share allocations.
+    Args:
+        cfg (CfgNode): configs. Details can be found in
+            slowfast/config/defaults.py
+    Returns:
+        stats (dict): step time (ms) and peak memory (MB).
+    """
+    torch.manual_seed(cfg.RNG_SEED)
+    device = torch.device("cuda" if cfg.NUM_GPUS else "cpu")
+    cfg.PD.BACKBONE_PRETRAINED = False
+    model = build_model(cfg)
+    # Only the head runs, free the backbone.
+    model.resnet = None
+    if device.type == "cuda":
+        torch.cuda.empty_cache()
+    model.train()
+    x = torch.rand(
+        cfg.TRAIN.BATCH_SIZE,
+        model.num_time_steps,
+        cfg.PD.NUM_REGIONS,
+        cfg.PD.FEATURE_SIZE,
+        device=device,
+    )
+
+    # Warm up, then only count the memory of the steps themselves.
+    model.head(x).sum().backward()
+    model.zero_grad(set_to_none=True)
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+        torch.cuda.reset_peak_memory_stats()
+        base_mem = torch.cuda.memory_allocated()
+    else:
+        base_mem = psutil.Process().memory_info().rss
+
+    with PeakRss() as peak_rss:
+        start = time.perf_counter()
+        for _ in range(_NUM_ITERS):
+            model.head(x).sum().backward()
+            model.zero_grad(set_to_none=True)
+        if device.type == "cuda":
+            torch.cuda.synchronize()
+        step_time = (time.perf_counter() - start) / _NUM_ITERS
+    if device.type == "cuda":
+        peak_mem = torch.cuda.max_memory_allocated()
+    else:
+        peak_mem = peak_rss.peak
+
+    return {
+        "step_time_ms": step_time * 1000,
+        "peak_mem_mb": max(peak_mem - base_mem, 0) / 1024 ** 2,
+    }
+
+
+def main():
+    args = parse_args()
+    cfg = load_config(args, args.cfg_files[0])
+    logging.setup_logging(cfg.OUTPUT_DIR)
+
+    proj_dims = [0]
+    if cfg.PD.TOKEN_PROJ_DIM:
+        proj_dims.append(cfg.PD.TOKEN_PROJ_DIM)
+    ctx = mp.get_context("spawn")
+    for token_proj_dim in proj_dims:
+        for use_sdpa in [False, True]:
+            setting_cfg = cfg.clone()
+            setting_cfg.PD.TOKEN_PROJ_DIM = token_proj_dim
+            setting_cfg.PD.USE_SDPA = use_sdpa
+            with ctx.Pool(1) as pool:
+                stats = pool.apply(_benchmark, (setting_cfg,))
+            stats.update(
+                {
+                    "device": "cuda" if cfg.NUM_GPUS > 0 else "cpu",
+                    "batch_size": cfg.TRAIN.BATCH_SIZE,
+                    "num_frames": cfg.DATA.NUM_FRAMES,
+                    "num_regions": cfg.PD.NUM_REGIONS,
+                    "feature_size": cfg.PD.FEATURE_SIZE,
+                    "st_config": "_".join(cfg.PD.ST_CONFIG),
+                    "token_proj_dim": token_proj_dim,
+                    "use_sdpa": use_sdpa,
+                }
+            )
+            logging.log_json_stats(stats)
+
+
+if __name__ == "__main__":
+    main()
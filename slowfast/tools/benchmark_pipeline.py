@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+"""
+A script to time every stage of the PD pipeline separately, from the video
+container open to the backward pass, e.g. on CPU with synthetic data:
+    python tools/benchmark_pipeline.py --cfg configs/PD/C2D_8x8_R50.yaml \
+        --opts NUM_GPUS 0 TRAIN.BATCH_SIZE 2 BENCHMARK.SYNTHETIC True
+The synthetic mode builds the backbone with random weights, so that it runs
+offline. It can also run on a dataset generated by tools/generate_pd_data.py,
+where PD.BACKBONE_PRETRAINED False skips loading PD.BACKBONE_CHECKPOINT or
+downloading the ImageNet weights. The per stage percentiles are written as
+json to BENCHMARK.OUTPUT_FILE in OUTPUT_DIR, to be compared between versions.
+"""
+
+import slowfast.utils.logging as logging
+from slowfast.utils.benchmark import benchmark_pipeline
+from slowfast.utils.parser import load_config, parse_args
+
+logger = logging.get_logger(__name__)
+
+
+def main():
+    args = parse_args()
+    cfg = load_config(args, args.cfg_files[0])
+    benchmark_pipeline(cfg)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+"""
+Report the speed / accuracy trade-off of RoI tubes (PD.ROI_TUBE) on the PD
+test split. Every config is tested with its own checkpoint, e.g. a per frame
+model and a tube model trained with the same schedule:
+    python tools/benchmark_roi_tube.py \
+        --cfg configs/PD/I3D_8x8_R50.yaml configs/PD/I3D_8x8_R50_tube.yaml
+"""
+
+import time
+import numpy as np
+import torch
+
+import slowfast.utils.checkpoint as cu
+import slowfast.utils.logging as logging
+from slowfast.datasets import loader
+from slowfast.models import build_model
+from slowfast.utils.binary_metrics import (
+    BinaryMetrics,
+    outputs_probabilities,
+    positive_scores,
+)
+from slowfast.utils.meters import TestMeter
+from slowfast.utils.parser import load_config, parse_args
+
+logger = logging.get_logger(__name__)
+
+
+@torch.no_grad()
+def benchmark(cfg):
+    """
+    Test a PD region model on the test split, timing the forward passes.
+    Args:
+        cfg (CfgNode): configs. Details can be found in
+            slowfast/config/defaults.py
+    Returns:
+        stats (dict): RoIs and head tokens per clip, forward time per clip and
+            the video level accuracy and AUROC.
+    """
+    np.random.seed(cfg.RNG_SEED)
+    torch.manual_seed(cfg.RNG_SEED)
+    cfg.NUM_GPUS = min(cfg.NUM_GPUS, 1)
+    model = build_model(cfg).eval()
+    cu.load_test_checkpoint(cfg, model)
+    test_loader = loader.construct_loader(cfg, "test")
+
+    num_clips = cfg.TEST.NUM_ENSEMBLE_VIEWS * cfg.TEST.NUM_SPATIAL_CROPS
+    test_meter = TestMeter(
+        test_loader.dataset.num_videos // num_clips,
+        num_clips,
+        cfg.MODEL.NUM_CLASSES,
+        len(test_loader),
+        False,
+        cfg.DATA.ENSEMBLE_METHOD,
+    )
+    forward_time, num_seen = 0.0, 0
+    for inputs, labels, clip_ids, _, _, bboxes in test_loader:
+        if cfg.NUM_GPUS:
+            inputs = [x.cuda(non_blocking=True) for x in inputs]
+            bboxes = bboxes.cuda()
+            torch.cuda.synchronize()
+        start = time.perf_counter()
+        preds = model(inputs, bboxes)
+        if cfg.NUM_GPUS:
+            torch.cuda.synchronize()
+        forward_time += time.perf_counter() - start
+        num_seen += preds.shape[0]
+        test_meter.update_stats(preds.cpu(), labels, clip_ids)
+    test_meter.finalize_metrics((1,))
+
+    num_time_steps = model.num_time_steps
+    stats = {
+        "roi_tube": cfg.PD.ROI_TUBE,
+        "tube_window": model.tube_window if cfg.PD.ROI_TUBE else 1,
+        "rois_per_clip": num_time_steps * cfg.PD.NUM_REGIONS,
+        "time_steps": num_time_steps,
+        "time_per_clip_ms": forward_time * 1000 / max(num_seen, 1),
+        "top1_acc": float(test_meter.stats["top1_acc"]),
+    }
+    # The labels above 0 are positive.
+    binary_metrics = BinaryMetrics(exact=True)
+    binary_metrics.update(
+        positive_scores(
+            test_meter.video_preds, outputs_probabilities(cfg, False)
+        ),
+        test_meter.video_labels,
+    )
+    binary_stats = binary_metrics.compute()
+    if "auroc" in binary_stats:
+        stats["auroc"] = binary_stats["auroc"]
+    return stats
+
+
+def main():
+    args = parse_args()
+    results = []
+    for path_to_config in args.cfg_files:
+        cfg = load_config(args, path_to_config)
+        logging.setup_logging(cfg.OUTPUT_DIR)
+        stats = benchmark(cfg)
+        stats["cfg"] = path_to_config
+        if results:
+            base = results[0]
+            stats["speedup"] = (
+                base["time_per_clip_ms"] / stats["time_per_clip_ms"]
+            )
+            stats["top1_acc_diff"] = stats["top1_acc"] - base["top1_acc"]
+            if "auroc" in stats and "auroc" in base:
+                stats["auroc_diff"] = stats["auroc"] - base["auroc"]
+        results.append(stats)
+        logging.log_json_stats(stats)
+
+
+if __name__ == "__main__":
+    main()
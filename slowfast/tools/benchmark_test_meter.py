@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+"""
+Compare the vectorized TestMeter.update_stats with the previous per clip
+loop on random predictions, for the sum and max ensembles and single and
+multi label testing. The number of videos, clips and the batch size are
+taken from the config, e.g.
+    python tools/benchmark_test_meter.py --cfg configs/PD/I3D_8x8_R50.yaml \
+        TEST.NUM_ENSEMBLE_VIEWS 10 TEST.NUM_SPATIAL_CROPS 3
+"""
+
+import time
+import torch
+
+import slowfast.utils.logging as logging
+from slowfast.utils.meters import TestMeter
+from slowfast.utils.parser import load_config, parse_args
+
+logger = logging.get_logger(__name__)
+
+# Number of random test videos.
+NUM_VIDEOS = 2000
+
+
+def _loop_update_stats(meter, preds, labels, clip_ids):
+    """
+    The previous TestMeter.update_stats, one clip at a time.
+    """
+    for ind in range(preds.shape[0]):
+        vid_id = int(clip_ids[ind]) // meter.num_clips
+        if meter.video_labels[vid_id].sum() > 0:
+            assert torch.equal(
+                meter.video_labels[vid_id].type(torch.FloatTensor),
+                labels[ind].type(torch.FloatTensor),
+            )
+        meter.video_labels[vid_id] = labels[ind]
+        if meter.ensemble_method == "sum":
+            meter.video_preds[vid_id] += preds[ind]
+        else:
+            meter.video_preds[vid_id] = torch.max(
+                meter.video_preds[vid_id], preds[ind]
+            )
+        meter.clip_count[vid_id] += 1
+
+
+def _batches(cfg, num_clips, multi_label):
+    """
+    Random test batches covering every clip of every video once.
+    """
+    num_classes = cfg.MODEL.NUM_CLASSES
+    if multi_label:
+        video_labels = (torch.rand(NUM_VIDEOS, num_classes) > 0.5).float()
+    else:
+        video_labels = torch.randint(num_classes, (NUM_VIDEOS,))
+    clip_ids = torch.randperm(NUM_VIDEOS * num_clips)
+    batches = []
+    for ids in clip_ids.split(cfg.TEST.BATCH_SIZE):
+        preds = torch.rand(len(ids), num_classes)
+        batches.append((preds, video_labels[ids // num_clips], ids))
+    return batches
+
+
+def benchmark(cfg, ensemble_method, multi_label):
+    """
+    Run both updates over the same batches.
+    Returns:
+        stats (dict): time per clip of both updates and the largest
+            difference of the ensembled predictions.
+    """
+    num_clips = cfg.TEST.NUM_ENSEMBLE_VIEWS * cfg.TEST.NUM_SPATIAL_CROPS
+    batches = _batches(cfg, num_clips, multi_label)
+    meters, times = [], []
+    for update in [_loop_update_stats, None]:
+        meter = TestMeter(
+            NUM_VIDEOS,
+            num_clips,
+            cfg.MODEL.NUM_CLASSES,
+            len(batches),
+            multi_label,
+            ensemble_method,
+        )
+        start = time.perf_counter()
+        for preds, labels, clip_ids in batches:
+            if update is None:
+                meter.update_stats(preds, labels, clip_ids)
+            else:
+                update(meter, preds, labels, clip_ids)
+        times.append(time.perf_counter() - start)
+        meters.append(meter)
+
+    num_seen = NUM_VIDEOS * num_clips
+    loop, vectorized = meters
+    assert torch.equal(loop.video_labels, vectorized.video_labels)
+    assert torch.equal(loop.clip_count, vectorized.clip_count)
+    return {
+        "ensemble_method": ensemble_method,
+        "multi_label": multi_label,
+        "num_clips": num_seen,
+        "loop_us_per_clip": times[0] * 1e6 / num_seen,
+        "vectorized_us_per_clip": times[1] * 1e6 / num_seen,
+        "speedup": times[0] / times[1],
+        "preds_max_abs_diff": (loop.video_preds - vectorized.video_preds)
+        .abs()
+        .max()
+        .item(),
+    }
+
+
+def main():
+    args = parse_args()
+    cfg = load_config(args, args.cfg_files[0])
+    logging.setup_logging(cfg.OUTPUT_DIR)
+    torch.manual_seed(cfg.RNG_SEED)
+    for ensemble_method in ["sum", "max"]:
+        for multi_label in [False, True]:
+            logging.log_json_stats(benchmark(cfg, ensemble_method, multi_label))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+"""
+Bootstrap confidence intervals of a saved binary test, the
+[all_preds, all_labels] pickle of TEST.SAVE_RESULTS_PATH, without testing the
+model again, e.g.
+    python tools/bootstrap_ci.py --cfg configs/PD/I3D_8x8_R50.yaml --opts \
+        TEST.SAVE_RESULTS_PATH preds.pkl TEST.SUBJECTS_FILE subjects.txt
+The subjects of the videos are read from the test split of
+DATA.PATH_TO_DATA_DIR, in the order of the saved predictions.
+"""
+
+import os
+import pickle
+import time
+
+import slowfast.utils.bootstrap as bootstrap
+import slowfast.utils.logging as logging
+from slowfast.utils.binary_metrics import (
+    outputs_probabilities,
+    positive_scores,
+)
+from slowfast.utils.env import pathmgr
+from slowfast.utils.parser import load_config, parse_args
+
+logger = logging.get_logger(__name__)
+
+
+def _test_videos(cfg):
+    """
+    Paths to the videos of the test split.
+    """
+    path_to_file = os.path.join(cfg.DATA.PATH_TO_DATA_DIR, "test.csv")
+    with pathmgr.open(path_to_file, "r") as f:
+        rows = [row for row in f.read().splitlines() if row.strip()]
+    return [row.split(cfg.DATA.PATH_LABEL_SEPARATOR)[0] for row in rows]
+
+
+def main():
+    args = parse_args()
+    cfg = load_config(args, args.cfg_files[0])
+    logging.setup_logging(cfg.OUTPUT_DIR)
+    save_path = os.path.join(cfg.OUTPUT_DIR, cfg.TEST.SAVE_RESULTS_PATH)
+    with pathmgr.open(save_path, "rb") as f:
+        all_preds, all_labels = pickle.load(f)
+
+    groups = None
+    if cfg.TEST.SUBJECTS_FILE != "":
+        groups = bootstrap.load_video_subjects(
+            _test_videos(cfg), cfg.TEST.SUBJECTS_FILE
+        )
+        assert len(groups) == len(all_labels)
+
+    start = time.perf_counter()
+    intervals = bootstrap.bootstrap_intervals(
+        positive_scores(all_preds, outputs_probabilities(cfg, False)),
+        all_labels,
+        cfg.TEST.BOOTSTRAP_SAMPLES,
+        cfg.TEST.BOOTSTRAP_LEVEL,
+        groups,
+        cfg.TEST.BOOTSTRAP_STRATIFY,
+        cfg.BINARY_METRICS.THRESHOLD,
+        cfg.RNG_SEED,
+    )
+    num_subjects = len(all_labels) if groups is None else len(groups.unique())
+    stats = {
+        "num_videos": len(all_labels),
+        "num_subjects": num_subjects,
+        "num_samples": cfg.TEST.BOOTSTRAP_SAMPLES,
+        "level": cfg.TEST.BOOTSTRAP_LEVEL,
+        "time_s": time.perf_counter() - start,
+    }
+    for name, (point, low, high) in intervals.items():
+        stats[name] = point
+        stats[name + "_low"] = low
+        stats[name + "_high"] = high
+    logging.log_json_stats(stats)
+    logger.info(
+        bootstrap.format_intervals(intervals, cfg.TEST.BOOTSTRAP_LEVEL)
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+"""
+Two stage cascade inference on the PD test split. A cheap screener, e.g. the
+X3D-XS or the keypoint model, scores every video first, and only the videos
+whose screener score falls inside the CASCADE.BAND uncertainty band are run
+through the expensive model, e.g. the RGB region model. The first config is
+the screener, the second one the expensive model, each tested with its own
+checkpoint; the CASCADE options are read from the first config:
+    python tools/cascade_net.py \
+        --cfg configs/PD/KPT_32x2.yaml configs/PD/I3D_8x8_R50.yaml
+The two models may use different numbers of test views and classes, the
+labels above 0 being positive. The fraction of escalated videos, the end to
+end throughput and the accuracy and AUROC of the cascade are logged, and with
+CASCADE.COMPARE_FULL, those of the expensive model run on every video.
+"""
+
+import os
+import pickle
+import time
+import numpy as np
+import torch
+
+import slowfast.utils.checkpoint as cu
+import slowfast.utils.logging as logging
+from slowfast.datasets import loader
+from slowfast.models import build_model
+from slowfast.utils.binary_metrics import (
+    BinaryMetrics,
+    outputs_probabilities,
+    positive_scores,
+)
+from slowfast.utils.env import pathmgr
+from slowfast.utils.meters import TestMeter
+from slowfast.utils.parser import load_config, parse_args
+
+logger = logging.get_logger(__name__)
+
+
+def _num_clips(cfg):
+    """
+    Number of test views of every video.
+    """
+    return cfg.TEST.NUM_ENSEMBLE_VIEWS * cfg.TEST.NUM_SPATIAL_CROPS
+
+
+def _videos(test_loader, cfg):
+    """
+    Path and label of every video of a test loader, which lists one entry per
+    view.
+    """
+    dataset = test_loader.dataset
+    num_clips = _num_clips(cfg)
+    return (
+        dataset._path_to_videos[::num_clips],
+        list(dataset._labels[::num_clips]),
+    )
+
+
+def build_stage(cfg):
+    """
+    Build a model of the cascade with its test checkpoint, and its test
+    loader over all the videos. The model is warmed up on a first batch so
+    that the timed stages compare fairly.
+    Args:
+        cfg (CfgNode): configs. Details can be found in
+            slowfast/config/defaults.py
+    Returns:
+        model (model): the model in eval mode.
+        test_loader (loader): the test loader.
+    """
+    cfg.NUM_GPUS = min(cfg.NUM_GPUS, 1)
+    model = build_model(cfg).eval()
+    cu.load_test_checkpoint(cfg, model)
+    test_loader = loader.construct_loader(cfg, "test")
+    inputs, _, _, _, _, bboxes = next(iter(test_loader))
+    if cfg.NUM_GPUS:
+        inputs = [x.cuda(non_blocking=True) for x in inputs]
+        bboxes = bboxes.cuda()
+    with torch.no_grad():
+        model(inputs, bboxes)
+    return model, test_loader
+
+
+@torch.no_grad()
+def run_stage(cfg, model, test_loader, video_ids=None):
+    """
+    Test a model on some of the videos of its test loader. The time includes
+    the data loading, so a keypoint screener gets the benefit of not decoding
+    the videos.
+    Args:
+        cfg (CfgNode): configs. Details can be found in
+            slowfast/config/defaults.py
+        model (model): the model to test.
+        test_loader (loader): test loader over all the videos.
+        video_ids (list): indices of the videos to test, None for all.
+    Returns:
+        scores (tensor): positive score of the tested videos, in [0, 1].
+        labels (tensor): labels of the tested videos.
+        elapsed (float): wall time in seconds.
+    """
+    dataset = test_loader.dataset
+    num_clips = _num_clips(cfg)
+    if video_ids is None:
+        video_ids = list(range(dataset.num_videos // num_clips))
+    if len(video_ids) == 0:
+        return torch.zeros(0), torch.zeros(0, dtype=torch.long), 0.0
+    # Position of every tested video in the meter.
+    positions = {video: pos for pos, video in enumerate(video_ids)}
+    stage_loader = torch.utils.data.DataLoader(
+        torch.utils.data.Subset(
+            dataset,
+            [
+                video * num_clips + clip
+                for video in video_ids
+                for clip in range(num_clips)
+            ],
+        ),
+        batch_size=test_loader.batch_size,
+        num_workers=cfg.DATA_LOADER.NUM_WORKERS,
+        pin_memory=cfg.DATA_LOADER.PIN_MEMORY,
+        collate_fn=test_loader.collate_fn,
+    )
+    test_meter = TestMeter(
+        len(video_ids),
+        num_clips,
+        cfg.MODEL.NUM_CLASSES,
+        len(stage_loader),
+        False,
+        cfg.DATA.ENSEMBLE_METHOD,
+    )
+
+    start = time.perf_counter()
+    for inputs, labels, clip_ids, _, _, bboxes in stage_loader:
+        if cfg.NUM_GPUS:
+            inputs = [x.cuda(non_blocking=True) for x in inputs]
+            bboxes = bboxes.cuda()
+        preds = model(inputs, bboxes)
+        if cfg.NUM_GPUS:
+            preds = preds.cpu()
+        clip_ids = torch.tensor(
+            [
+                positions[int(clip) // num_clips] * num_clips
+                + int(clip) % num_clips
+                for clip in clip_ids
+            ]
+        )
+        test_meter.update_stats(preds, labels, clip_ids)
+    elapsed = time.perf_counter() - start
+
+    scores = positive_scores(
+        test_meter.video_preds, outputs_probabilities(cfg, False)
+    )
+    return scores, test_meter.video_labels.clone(), elapsed
+
+
+def binary_stats(scores, labels):
+    """
+    Accuracy, in percent, at a 0.5 threshold and AUROC of video scores,
+    the labels above 0 being positive.
+    """
+    binary_metrics = BinaryMetrics(exact=True)
+    binary_metrics.update(scores, labels)
+    metrics = binary_metrics.compute()
+    stats = {"top1_acc": metrics["accuracy"] * 100.0}
+    if "auroc" in metrics:
+        stats["auroc"] = metrics["auroc"]
+    return stats
+
+
+def cascade(screen_cfg, full_cfg):
+    """
+    Run the cascade of the screener and the expensive model.
+    Args:
+        screen_cfg (CfgNode): configs of the screener, including the CASCADE
+            options.
+        full_cfg (CfgNode): configs of the expensive model.
+    Returns:
+        stats (dict): escalated fraction, throughput, accuracy and AUROC of
+            the cascade, of the screener alone and of the expensive model.
+    """
+    np.random.seed(screen_cfg.RNG_SEED)
+    torch.manual_seed(screen_cfg.RNG_SEED)
+    low, high = screen_cfg.CASCADE.BAND
+    assert 0.0 <= low <= high <= 1.0, "Invalid band {}.".format((low, high))
+    merge = screen_cfg.CASCADE.MERGE
+    assert merge in ["replace", "mean"], "Invalid merge {}.".format(merge)
+
+    screen_model, screen_loader = build_stage(screen_cfg)
+    full_model, full_loader = build_stage(full_cfg)
+    screen_paths, screen_labels = _videos(screen_loader, screen_cfg)
+    assert (screen_paths, screen_labels) == _videos(full_loader, full_cfg), (
+        "The screener and the expensive model must test the same videos."
+    )
+
+    screen_scores, labels, screen_time = run_stage(
+        screen_cfg, screen_model, screen_loader
+    )
+    escalated = (
+        ((screen_scores >= low) & (screen_scores <= high))
+        .nonzero()
+        .flatten()
+    )
+    full_scores, full_labels, full_time = run_stage(
+        full_cfg, full_model, full_loader, escalated.tolist()
+    )
+    # Only the binary labels agree, a two class stage has no severities.
+    assert torch.equal(full_labels > 0, labels[escalated] > 0)
+
+    scores = screen_scores.clone()
+    if merge == "replace":
+        scores[escalated] = full_scores
+    else:
+        scores[escalated] = (screen_scores[escalated] + full_scores) / 2
+
+    num_videos = len(labels)
+    elapsed = screen_time + full_time
+    stats = {
+        "split": "cascade_final",
+        "band": [low, high],
+        "merge": merge,
+        "num_videos": num_videos,
+        "escalated": len(escalated),
+        "escalated_frac": len(escalated) / max(num_videos, 1),
+        "screen_time_s": screen_time,
+        "full_time_s": full_time,
+        "videos_per_s": num_videos / max(elapsed, 1e-12),
+    }
+    stats.update(binary_stats(scores, labels))
+    screen_stats = binary_stats(screen_scores, labels)
+    stats.update({"screen_" + k: v for k, v in screen_stats.items()})
+
+    if screen_cfg.CASCADE.COMPARE_FULL:
+        all_scores, _, all_time = run_stage(full_cfg, full_model, full_loader)
+        stats["full_videos_per_s"] = num_videos / max(all_time, 1e-12)
+        stats["speedup"] = all_time / max(elapsed, 1e-12)
+        full_stats = binary_stats(all_scores, labels)
+        stats.update({"full_" + k: v for k, v in full_stats.items()})
+        stats["top1_acc_diff"] = stats["top1_acc"] - full_stats["top1_acc"]
+        if "auroc" in stats:
+            stats["auroc_diff"] = stats["auroc"] - full_stats["auroc"]
+    logging.log_json_stats(stats)
+
+    if screen_cfg.CASCADE.SAVE_RESULTS_PATH != "":
+        save_path = os.path.join(
+            screen_cfg.OUTPUT_DIR, screen_cfg.CASCADE.SAVE_RESULTS_PATH
+        )
+        is_escalated = torch.zeros(num_videos, dtype=torch.bool)
+        is_escalated[escalated] = True
+        results = [
+            {
+                "path": screen_paths[video],
+                "label": labels[video].item(),
+                "screen_score": screen_scores[video].item(),
+                "escalated": is_escalated[video].item(),
+                "score": scores[video].item(),
+            }
+            for video in range(num_videos)
+        ]
+        with pathmgr.open(save_path, "wb") as f:
+            pickle.dump(results, f)
+        logger.info("Saved cascade results to {}".format(save_path))
+    return stats
+
+
+def main():
+    args = parse_args()
+    assert len(args.cfg_files) == 2, "Give the screener and expensive configs."
+    screen_cfg = load_config(args, args.cfg_files[0])
+    full_cfg = load_config(args, args.cfg_files[1])
+    logging.setup_logging(screen_cfg.OUTPUT_DIR)
+    cascade(screen_cfg, full_cfg)
+
+
+if __name__ == "__main__":
+    main()
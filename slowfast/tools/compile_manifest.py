@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+"""
+Compile the data sheet of the PD videos into the csv manifest joined with the
+test predictions for the subgroup metrics (SUBGROUP.MANIFEST), e.g.
+    python tools/compile_manifest.py --sheet data/data_sheet.xlsx \
+        --out data/manifest.csv --subjects data/subjects.txt
+Row i of the sheet is the video `video<i>`. A subject is out of distribution
+(ood) if none of their videos is in the train split. The subjects file of
+TEST.SUBJECTS_FILE is derived from the `person` column of the manifest.
+"""
+
+import argparse
+import pandas
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compile the PD manifest.")
+    parser.add_argument(
+        "--sheet",
+        help="Path to the data sheet",
+        default="data/data_sheet.xlsx",
+    )
+    parser.add_argument(
+        "--out", help="Path to the manifest", default="data/manifest.csv"
+    )
+    parser.add_argument(
+        "--subjects",
+        help="Path to the subjects file of TEST.SUBJECTS_FILE, not written "
+        "if empty",
+        default="",
+    )
+    return parser.parse_args()
+
+
+def _label(value):
+    """
+    Integer label of the sheet, empty if missing.
+    """
+    return "" if pandas.isna(value) else str(int(value))
+
+
+def compile_manifest(sheet):
+    """
+    Args:
+        sheet (pandas.DataFrame): the data sheet.
+    Returns:
+        manifest (pandas.DataFrame): video id, subject, year, PD (1) or not
+            (0), split, severity and confidence labels and OOD flag of every
+            video.
+    """
+    split = sheet["split"].astype(str).str.strip()
+    person = sheet["person"].astype(str).str.strip()
+    train_persons = set(person[split == "train"])
+    return pandas.DataFrame(
+        {
+            "video_id": sheet.index,
+            "person": person,
+            "year": sheet["year"],
+            "parkinson": (
+                sheet["parkinson y/n"].astype(str).str.strip() == "y"
+            ).astype(int),
+            "split": split,
+            "severity": sheet["severeness_label"].map(_label),
+            "confidence": sheet["confidence_label"].map(_label),
+            "ood": (~person.isin(train_persons)).astype(int),
+        }
+    )
+
+
+def write_subjects(manifest, path):
+    """
+    Write the `<video id> <subject>` lines of TEST.SUBJECTS_FILE.
+    Args:
+        manifest (pandas.DataFrame): the manifest.
+        path (str): path to the subjects file.
+    """
+    with open(path, "w") as f:
+        for video_id, person in zip(manifest["video_id"], manifest["person"]):
+            f.write("{} {}\n".format(video_id, person))
+
+
+def main():
+    args = parse_args()
+    manifest = compile_manifest(pandas.read_excel(args.sheet))
+    manifest.to_csv(args.out, index=False)
+    if args.subjects:
+        write_subjects(manifest, args.subjects)
+    print(
+        "Wrote {} videos of {} subjects to {}".format(
+            len(manifest), manifest["person"].nunique(), args.out
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+"""
+Compare early exit multi-view testing (TEST.EARLY_EXIT) with the full
+ensemble. Every view of every test video is run once, then early exit is
+replayed on the cached view predictions for TEST.EARLY_EXIT_THRESHOLD and a
+sweep of thresholds. The views used per video and the accuracy and AUROC
+differences against the full ensemble are logged.
+"""
+
+import numpy as np
+import torch
+
+import slowfast.utils.checkpoint as cu
+import slowfast.utils.logging as logging
+from slowfast.datasets import loader
+from slowfast.datasets.utils import get_view_order
+from slowfast.models import build_model
+from slowfast.utils.binary_metrics import (
+    BinaryMetrics,
+    outputs_probabilities,
+    positive_scores,
+)
+from slowfast.utils.meters import EarlyExitTestMeter, TestMeter
+from slowfast.utils.parser import load_config, parse_args
+
+logger = logging.get_logger(__name__)
+
+_THRESHOLDS = [0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 0.99]
+
+
+@torch.no_grad()
+def collect_view_preds(test_loader, model, cfg):
+    """
+    Run every view of every test video.
+    Args:
+        test_loader (loader): video testing loader.
+        model (model): the pretrained video model to test.
+        cfg (CfgNode): configs. Details can be found in
+            slowfast/config/defaults.py
+    Returns:
+        view_preds (tensor): predictions of shape
+            (num_videos, num_clips, num_classes), indexed by the spatial
+            temporal index of the views.
+        labels (tensor): labels of the videos.
+    """
+    num_clips = cfg.TEST.NUM_ENSEMBLE_VIEWS * cfg.TEST.NUM_SPATIAL_CROPS
+    num_videos = test_loader.dataset.num_videos // num_clips
+    view_preds = torch.zeros((num_videos, num_clips, cfg.MODEL.NUM_CLASSES))
+    labels = torch.zeros((num_videos), dtype=torch.long)
+    model.eval()
+    for inputs, clip_labels, clip_ids, _, _, bboxes in test_loader:
+        if cfg.NUM_GPUS:
+            inputs = [x.cuda(non_blocking=True) for x in inputs]
+            bboxes = bboxes.cuda()
+        preds = model(inputs, bboxes).cpu()
+        view_preds[clip_ids // num_clips, clip_ids % num_clips] = preds
+        labels[clip_ids // num_clips] = clip_labels
+    return view_preds, labels
+
+
+def _replay(meter, view_preds, labels, order, is_prob):
+    """
+    Feed the cached view predictions to a test meter in early exit rounds.
+    The AUROC counts the labels above 0 as positive.
+    """
+    num_clips = view_preds.shape[1]
+    for view in order:
+        if isinstance(meter, EarlyExitTestMeter):
+            videos = torch.tensor(meter.active_videos(), dtype=torch.long)
+        else:
+            videos = torch.arange(view_preds.shape[0])
+        if len(videos) == 0:
+            break
+        meter.update_stats(
+            view_preds[videos, view], labels[videos], videos * num_clips + view
+        )
+    meter.finalize_metrics((1, 2))
+    stats = {
+        "top1_acc": float(meter.stats["top1_acc"]),
+        "mean_views": meter.clip_count.float().mean().item(),
+    }
+    binary_metrics = BinaryMetrics(exact=True)
+    binary_metrics.update(
+        positive_scores(meter.video_preds, is_prob), meter.video_labels
+    )
+    binary_stats = binary_metrics.compute()
+    if "auroc" in binary_stats:
+        stats["auroc"] = binary_stats["auroc"]
+    return stats
+
+
+def main():
+    args = parse_args()
+    cfg = load_config(args, args.cfg_files[0])
+    logging.setup_logging(cfg.OUTPUT_DIR)
+    np.random.seed(cfg.RNG_SEED)
+    torch.manual_seed(cfg.RNG_SEED)
+    cfg.NUM_GPUS = min(cfg.NUM_GPUS, 1)
+
+    model = build_model(cfg)
+    cu.load_test_checkpoint(cfg, model)
+    test_loader = loader.construct_loader(cfg, "test")
+    view_preds, labels = collect_view_preds(test_loader, model, cfg)
+    num_videos, num_clips, num_cls = view_preds.shape
+    order = get_view_order(
+        cfg.TEST.NUM_ENSEMBLE_VIEWS, cfg.TEST.NUM_SPATIAL_CROPS
+    )
+
+    full_meter = TestMeter(
+        num_videos, num_clips, num_cls, 0, False, cfg.DATA.ENSEMBLE_METHOD
+    )
+    is_prob = outputs_probabilities(cfg, False)
+    full_stats = _replay(full_meter, view_preds, labels, order, is_prob)
+    full_stats["mode"] = "full"
+    logging.log_json_stats(full_stats)
+
+    thresholds = sorted(set(_THRESHOLDS + [cfg.TEST.EARLY_EXIT_THRESHOLD]))
+    for threshold in thresholds:
+        meter = EarlyExitTestMeter(
+            num_videos,
+            num_clips,
+            num_cls,
+            0,
+            cfg.DATA.ENSEMBLE_METHOD,
+            cfg.TEST.EARLY_EXIT_CRITERION,
+            threshold,
+            cfg.TEST.EARLY_EXIT_MIN_VIEWS,
+        )
+        stats = _replay(meter, view_preds, labels, order, is_prob)
+        stats["mode"] = "early_exit"
+        stats["criterion"] = cfg.TEST.EARLY_EXIT_CRITERION
+        stats["threshold"] = threshold
+        stats["top1_acc_diff"] = stats["top1_acc"] - full_stats["top1_acc"]
+        if "auroc" in stats:
+            stats["auroc_diff"] = stats["auroc"] - full_stats["auroc"]
+        stats["views_saved"] = 1.0 - stats["mean_views"] / num_clips
+        logging.log_json_stats(stats)
+        if threshold == cfg.TEST.EARLY_EXIT_THRESHOLD:
+            logger.info(
+                "Views used per video: {}".format(meter.clip_count.tolist())
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+"""
+Export a trained PD region model to TorchScript for CPU inference.
+
+The configured PD.IMAGE_VARIANT and PD.ST_CONFIG are frozen into the traced
+graph, which is saved to OUTPUT_DIR/EXPORT.PATH and can be run with
+tools/pd_inference.py without the slowfast codebase. The cold start and
+steady state latencies of the eager and exported models are logged.
+"""
+
+import os
+import time
+import torch
+import torch.nn as nn
+
+import slowfast.utils.checkpoint as cu
+import slowfast.utils.logging as logging
+import slowfast.utils.misc as misc
+from slowfast.models import build_model
+from slowfast.utils.parser import load_config, parse_args
+
+from pd_inference import load_model, measure_latency
+
+logger = logging.get_logger(__name__)
+
+
+class PDInferenceModel(nn.Module):
+    """
+    Wraps the PD model so that it takes plain tensors instead of the list of
+    pathways.
+    """
+
+    def __init__(self, model):
+        super(PDInferenceModel, self).__init__()
+        self.model = model
+
+    def forward(self, frames, bboxes):
+        return self.model([frames], bboxes)
+
+
+def example_inputs(cfg, crop_size=None):
+    """
+    Random clip and region boxes with the shapes of the test loader outputs.
+    Args:
+        cfg (CfgNode): configs. Details can be found in
+            slowfast/config/defaults.py
+        crop_size (int, optional): frame size, DATA.TEST_CROP_SIZE if None.
+    """
+    batch_size = cfg.EXPORT.BATCH_SIZE
+    crop_size = crop_size or cfg.DATA.TEST_CROP_SIZE
+    frames = torch.rand(
+        batch_size, 3, cfg.DATA.NUM_FRAMES, crop_size, crop_size
+    )
+    bboxes = misc.get_dummy_bboxes(cfg, batch_size)
+    return frames, bboxes
+
+
+@torch.no_grad()
+def export(cfg):
+    """
+    Trace the PD model on CPU, save it and compare it with the eager model.
+    Args:
+        cfg (CfgNode): configs. Details can be found in
+            slowfast/config/defaults.py
+    """
+    logging.setup_logging(cfg.OUTPUT_DIR)
+    torch.manual_seed(cfg.RNG_SEED)
+    cfg.NUM_GPUS = 0
+
+    model = build_model(cfg)
+    cu.load_test_checkpoint(cfg, model)
+    model = PDInferenceModel(model).eval()
+    frames, bboxes = example_inputs(cfg)
+    model.model.script_preprocess()
+
+    eager_stats = measure_latency(model, frames, bboxes, cfg.EXPORT.NUM_ITERS)
+    eager_stats["mode"] = "eager"
+    logging.log_json_stats(eager_stats)
+
+    traced = torch.jit.trace(model, (frames, bboxes), check_trace=False)
+    traced = torch.jit.freeze(traced)
+    path = os.path.join(cfg.OUTPUT_DIR, cfg.EXPORT.PATH)
+    torch.jit.save(traced, path)
+    logger.info("Exported the PD model to {}".format(path))
+    del traced
+
+    start = time.perf_counter()
+    exported = load_model(path)
+    load_time = time.perf_counter() - start
+    exported_stats = measure_latency(
+        exported, frames, bboxes, cfg.EXPORT.NUM_ITERS
+    )
+    exported_stats["mode"] = "torchscript"
+    exported_stats["load_ms"] = load_time * 1000
+
+    # The frames are resized by the model, check the traced graph on a fresh
+    # clip of another frame size.
+    frames, bboxes = example_inputs(cfg, cfg.DATA.TEST_CROP_SIZE + 76)
+    exported_stats["max_abs_diff"] = (
+        (exported(frames, bboxes) - model(frames, bboxes)).abs().max().item()
+    )
+    logging.log_json_stats(exported_stats)
+
+
+def main():
+    args = parse_args()
+    cfg = load_config(args, args.cfg_files[0])
+    export(cfg)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+"""
+Generate a synthetic PD dataset in the layout of data/prepare_data.py, to
+benchmark and test the PD pipeline without the real videos, e.g.
+    python tools/generate_pd_data.py --out /tmp/pd_data --num-videos 1340 \
+        --num-unique 134 --workers 8
+then point the configs to it with
+    DATA.PATH_TO_DATA_DIR /tmp/pd_data DATA.PATH_TO_KPTS_DIR /tmp/pd_data/kpts
+The videos `videos/video<i>_final.mp4` show a moving face of NUM_REGIONS
+colored regions, described frame by frame by the keypoint files
+`kpts/video<i>_kpts`. The train, val and test csv files list their absolute
+paths and labels, and manifest.csv their subjects for SUBGROUP.MANIFEST.
+With --num-unique, only that many videos are encoded and the other ones are
+hard links to them, so that datasets of 10x to 1000x the real size are cheap
+to generate.
+"""
+
+import argparse
+import csv
+import os
+import pickle
+import av
+import numpy as np
+from multiprocessing import Pool
+
+# Short side of the frames the keypoints are given in, as by Resize(256).
+KPTS_FRAME_SIZE = 256
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic PD dataset."
+    )
+    parser.add_argument("--out", help="Output directory", required=True)
+    parser.add_argument(
+        "--num-videos", help="Number of videos", default=134, type=int
+    )
+    parser.add_argument(
+        "--num-unique",
+        help="Number of encoded videos, the other ones are hard links to "
+        "them. All the videos are encoded if 0",
+        default=0,
+        type=int,
+    )
+    parser.add_argument(
+        "--duration", help="Length of the videos (s)", default=30.0, type=float
+    )
+    parser.add_argument("--fps", help="Frame rate", default=20, type=int)
+    parser.add_argument("--width", help="Frame width", default=256, type=int)
+    parser.add_argument("--height", help="Frame height", default=256, type=int)
+    parser.add_argument(
+        "--codec", help="Video codec, e.g. libx264 or mpeg4", default="libx264"
+    )
+    parser.add_argument(
+        "--kpts-format",
+        help="Format of the keypoint files. Only pickle, the format read by "
+        "datasets.utils.load_video_kpts, is supported for now",
+        default="pickle",
+        choices=sorted(KPTS_WRITERS),
+    )
+    parser.add_argument(
+        "--num-regions", help="Facial regions per frame", default=14, type=int
+    )
+    parser.add_argument(
+        "--points-per-region", help="Keypoints per region", default=5, type=int
+    )
+    parser.add_argument(
+        "--num-classes", help="Number of labels", default=2, type=int
+    )
+    parser.add_argument(
+        "--num-subjects", help="Number of subjects", default=30, type=int
+    )
+    parser.add_argument(
+        "--splits",
+        help="Fractions of the train, val and test videos",
+        default=[0.7, 0.1, 0.2],
+        nargs=3,
+        type=float,
+    )
+    parser.add_argument(
+        "--workers", help="Number of processes", default=1, type=int
+    )
+    parser.add_argument("--seed", help="Random seed", default=0, type=int)
+    return parser.parse_args()
+
+
+def region_tracks(rng, num_frames, num_regions, points_per_region, size):
+    """
+    Keypoints of a face moving smoothly around the frame center.
+    Args:
+        rng (np.random.Generator): random generator of the video.
+        num_frames (int): number of frames.
+        num_regions (int): number of facial regions.
+        points_per_region (int): number of keypoints of every region.
+        size (tuple): width and height of the frames.
+    Returns:
+        points (ndarray): pixel coordinates (x, y) of every keypoint, of shape
+            (num_frames, num_regions, points_per_region, 2).
+    """
+    width, height = size
+    # Regions on a grid over the face, the face covering half of the frame.
+    cols = int(np.ceil(np.sqrt(num_regions)))
+    grid = np.stack(
+        np.divmod(np.arange(num_regions), cols)[::-1], axis=1
+    ).astype(np.float64)
+    face = np.array([width, height]) / 2
+    centers = (grid + 0.5) / cols * face - face / 2
+    # Head motion and per region jitter.
+    t = np.arange(num_frames)[:, None] / max(num_frames, 1)
+    phase = rng.uniform(0, 2 * np.pi, 2)
+    motion = np.sin(2 * np.pi * rng.uniform(1, 4, 2) * t + phase)
+    motion = motion * np.array([width, height]) / 8 + face
+    jitter = rng.normal(0, 1, (num_frames, num_regions, 1, 2))
+    offsets = rng.uniform(
+        -1, 1, (1, num_regions, points_per_region, 2)
+    ) * (face / cols / 2)
+    points = motion[:, None, None] + centers[None, :, None] + offsets + jitter
+    return np.clip(points, 0, np.array([width, height]) - 1)
+
+
+def render_frames(rng, points, size):
+    """
+    Frames of a face, every region being the filled box of its keypoints on
+    a gradient background.
+    Args:
+        rng (np.random.Generator): random generator of the video.
+        points (ndarray): keypoints of shape
+            (num_frames, num_regions, points_per_region, 2).
+        size (tuple): width and height of the frames.
+    Yields:
+        frame (ndarray): rgb frame of shape (height, width, 3).
+    """
+    width, height = size
+    background = np.empty((height, width, 3), dtype=np.uint8)
+    background[...] = np.linspace(32, 160, width, dtype=np.uint8)[None, :, None]
+    colors = rng.integers(0, 256, (points.shape[1], 3), dtype=np.uint8)
+    corners = np.concatenate(
+        (points.min(axis=2), points.max(axis=2) + 1), axis=2
+    ).astype(int)
+    for frame_corners in corners:
+        frame = background.copy()
+        for color, (x_min, y_min, x_max, y_max) in zip(colors, frame_corners):
+            frame[y_min:y_max, x_min:x_max] = color
+        yield frame
+
+
+def write_video(path, frames, fps, size, codec):
+    """
+    Encode rgb frames into a video file.
+    """
+    with av.open(path, "w") as output:
+        stream = output.add_stream(codec, rate=fps)
+        stream.width, stream.height = size
+        stream.pix_fmt = "yuv420p"
+        for frame in frames:
+            frame = av.VideoFrame.from_ndarray(frame, format="rgb24")
+            output.mux(stream.encode(frame))
+        output.mux(stream.encode())
+
+
+def write_kpts_pickle(kpts_dir, name, points):
+    """
+    Write the keypoints in the format of datasets.utils.load_video_kpts: the
+    `<name>_kpts` pickle of a dict from `<name>.mp4` to the region points of
+    every `frame<frame index>`.
+    """
+    kpts = {
+        "frame{}".format(i): frame_points.tolist()
+        for i, frame_points in enumerate(points)
+    }
+    path = os.path.join(kpts_dir, "{}_kpts".format(name))
+    with open(path, "wb") as f:
+        pickle.dump({name + ".mp4": kpts}, f)
+
+
+# Writers of the keypoint files, by format. The PD loaders only read the
+# pickle files of load_video_kpts, so it is the only one.
+KPTS_WRITERS = {"pickle": write_kpts_pickle}
+
+
+def generate_video(task):
+    """
+    Write a video, or hard link it to the encoded video it repeats, and its
+    keypoint file.
+    Args:
+        task (tuple): parsed arguments, index of the video and index of the
+            encoded video it repeats.
+    """
+    args, index, source = task
+    size = (args.width, args.height)
+    num_frames = int(round(args.duration * args.fps))
+    rng = np.random.default_rng([args.seed, source])
+    points = region_tracks(
+        rng, num_frames, args.num_regions, args.points_per_region, size
+    )
+    name = "video{}".format(index)
+    path = video_path(args.out, index)
+    if source == index:
+        frames = render_frames(rng, points, size)
+        write_video(path, frames, args.fps, size, args.codec)
+    else:
+        if os.path.exists(path):
+            os.remove(path)
+        os.link(video_path(args.out, source), path)
+    # The keypoints are given in the frame resized to a short side of 256.
+    scale = KPTS_FRAME_SIZE / min(args.width, args.height)
+    points = np.round(points * scale).astype(int)
+    KPTS_WRITERS[args.kpts_format](os.path.join(args.out, "kpts"), name, points)
+
+
+def video_path(out, index):
+    return os.path.abspath(
+        os.path.join(out, "videos", "video{}_final.mp4".format(index))
+    )
+
+
+def main():
+    args = parse_args()
+    for directory in ["videos", "kpts"]:
+        os.makedirs(os.path.join(args.out, directory), exist_ok=True)
+    num_unique = args.num_unique or args.num_videos
+    rng = np.random.default_rng(args.seed)
+    labels = rng.permutation(np.arange(args.num_videos) % args.num_classes)
+    subjects = rng.integers(0, args.num_subjects, args.num_videos)
+    bounds = np.cumsum(args.splits) / np.sum(args.splits) * args.num_videos
+    splits = np.array(["train", "val", "test"])[
+        np.searchsorted(bounds, rng.permutation(args.num_videos), "right")
+    ]
+
+    # Encode the unique videos before linking the other ones to them.
+    for first, last in [(0, num_unique), (num_unique, args.num_videos)]:
+        tasks = [(args, i, i % num_unique) for i in range(first, last)]
+        if args.workers > 1 and len(tasks) > 1:
+            with Pool(args.workers) as pool:
+                pool.map(generate_video, tasks, chunksize=1)
+        else:
+            for task in tasks:
+                generate_video(task)
+
+    for split in ["train", "val", "test"]:
+        with open(os.path.join(args.out, split + ".csv"), "w") as f:
+            for i in np.flatnonzero(splits == split):
+                f.write("{} {}\n".format(video_path(args.out, i), labels[i]))
+    train_subjects = set(subjects[splits == "train"])
+    with open(os.path.join(args.out, "manifest.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            ["video_id", "person", "parkinson", "split", "severity", "ood"]
+        )
+        for i in range(args.num_videos):
+            writer.writerow(
+                [
+                    i,
+                    "subject{}".format(subjects[i]),
+                    int(labels[i] > 0),
+                    splits[i],
+                    labels[i],
+                    int(subjects[i] not in train_subjects),
+                ]
+            )
+    print(
+        "Wrote {} videos ({} encoded) of {} frames to {}".format(
+            args.num_videos,
+            num_unique,
+            int(round(args.duration * args.fps)),
+            args.out,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
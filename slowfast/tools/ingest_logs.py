@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+"""
+Ingest the json stats of past train and test logs into the results store, e.g.
+    python tools/ingest_logs.py experiments/ --store experiments/results_store
+Every log becomes a run of kind `log`, queried with tools/query_results.py
+like the runs recorded by train_net and test_net:
+    python tools/query_results.py --by MODEL.MODEL_NAME --kind log
+"""
+
+import argparse
+import time
+
+from slowfast.utils.log_ingest import DEFAULT_TYPES, ingest_logs
+from slowfast.utils.results_store import ResultsStore
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Ingest json stats logs into the results store."
+    )
+    parser.add_argument(
+        "paths", help="Log files or directories of logs", nargs="+"
+    )
+    parser.add_argument(
+        "--store",
+        help="Path to the results store",
+        default="./experiments/results_store",
+    )
+    parser.add_argument(
+        "--types",
+        help="Types of the ingested json stats records",
+        default=list(DEFAULT_TYPES),
+        nargs="+",
+    )
+    parser.add_argument(
+        "--workers",
+        help="Number of processes, all the cpus by default",
+        default=None,
+        type=int,
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    store = ResultsStore(args.store)
+    start = time.perf_counter()
+    stats = ingest_logs(store, args.paths, args.types, args.workers)
+    duration = time.perf_counter() - start
+    print(
+        "Ingested {num_logs} logs, {num_rows} stats from {num_bytes} bytes"
+        "".format(**stats)
+        + " in {:.2f}s ({:.1f} MB/s)".format(
+            duration, stats["num_bytes"] / 1e6 / duration
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
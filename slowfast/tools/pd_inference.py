@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+"""
+Standalone runner for a PD model exported by tools/export_pd.py. It only
+depends on torch and torchvision, the slowfast codebase is not needed.
+
+The model takes the same tensors the test loader yields:
+    frames (tensor): clip of shape (batch_size, 3, num_frames, H, W). The
+        model resizes and center crops frames of any H and W.
+    bboxes (tensor): region corners of shape
+        (batch_size, num_frames, num_regions, 4, 2).
+and returns the class probabilities of shape (batch_size, num_classes).
+num_frames and num_regions are the DATA.NUM_FRAMES and PD.NUM_REGIONS of the
+exported config, the batch size is free.
+
+Example:
+    python tools/pd_inference.py --model pd_model.pt \
+        --frames frames.pyth --bboxes bboxes.pyth
+"""
+
+import argparse
+import time
+import torch
+import torchvision  # noqa, registers the torchvision::roi_align op.
+
+
+def load_model(path, num_threads=None):
+    """
+    Load an exported PD model for CPU inference.
+    Args:
+        path (str): path to the exported TorchScript model.
+        num_threads (int): number of intra op threads, if given.
+    Returns:
+        model (ScriptModule): the exported model in eval mode.
+    """
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    model = torch.jit.load(path, map_location="cpu")
+    model.eval()
+    return model
+
+
+@torch.no_grad()
+def measure_latency(model, frames, bboxes, num_iters):
+    """
+    Measure the latency of the first (cold) and of the following (steady
+    state) forward passes of a model.
+    Args:
+        model (nn.Module or ScriptModule): model taking (frames, bboxes).
+        frames (tensor): input clip.
+        bboxes (tensor): region corners.
+        num_iters (int): number of steady state forward passes.
+    Returns:
+        stats (dict): cold latency and steady state latency percentiles (ms).
+    """
+    start = time.perf_counter()
+    model(frames, bboxes)
+    cold = time.perf_counter() - start
+
+    times = []
+    for _ in range(num_iters):
+        start = time.perf_counter()
+        model(frames, bboxes)
+        times.append(time.perf_counter() - start)
+    times = torch.tensor(times) * 1000
+    return {
+        "cold_ms": cold * 1000,
+        "steady_p50_ms": times.median().item(),
+        "steady_p90_ms": times.quantile(0.9).item(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an exported PD model.")
+    parser.add_argument("--model", required=True, help="Exported model.")
+    parser.add_argument("--frames", required=True, help="torch.save'd clip.")
+    parser.add_argument("--bboxes", required=True, help="torch.save'd boxes.")
+    parser.add_argument("--num_threads", type=int, default=None)
+    args = parser.parse_args()
+
+    model = load_model(args.model, args.num_threads)
+    frames = torch.load(args.frames, map_location="cpu")
+    bboxes = torch.load(args.bboxes, map_location="cpu")
+    with torch.no_grad():
+        probs = model(frames, bboxes)
+    for idx, prob in enumerate(probs.tolist()):
+        print("clip {}: {}".format(idx, " ".join("%.4f" % p for p in prob)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved
+"""
+A script to report the parameter memory and checkpoint size of every
+PD.IMAGE_VARIANT of the PD region model.
+"""
+
+import slowfast.utils.logging as logging
+import slowfast.utils.misc as misc
+from slowfast.models import build_model
+from slowfast.utils.parser import load_config, parse_args
+
+logger = logging.get_logger(__name__)
+
+_VARIANTS = ["video", "region", "video+region", ""]
+
+
+def main():
+    args = parse_args()
+    cfg = load_config(args, args.cfg_files[0])
+    logging.setup_logging(cfg.OUTPUT_DIR)
+
+    for variant in _VARIANTS:
+        variant_cfg = cfg.clone()
+        variant_cfg.PD.IMAGE_VARIANT = variant
+        model = build_model(variant_cfg)
+        stats = misc.model_size(model)
+        stats["variant"] = variant or "cls_head"
+        stats["st_config"] = "_".join(variant_cfg.PD.ST_CONFIG)
+        logging.log_json_stats(stats)
+        del model
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+"""
+Validate the int8 quantization of a PD model on CPU. The float, dynamic and
+static quantized models are tested on the test split, and their accuracy,
+AUROC, latency and size are logged together with the drift from the float
+model. Use TEST.QUANTIZE in test_net to test a quantized model.
+"""
+
+import time
+import numpy as np
+import sklearn.metrics
+import torch
+
+import slowfast.utils.checkpoint as cu
+import slowfast.utils.logging as logging
+import slowfast.utils.misc as misc
+from slowfast.datasets import loader
+from slowfast.models import build_model, quantization
+from slowfast.utils.binary_metrics import (
+    outputs_probabilities,
+    positive_scores,
+)
+from slowfast.utils.meters import TestMeter
+from slowfast.utils.parser import load_config, parse_args
+
+from test_net import perform_test
+
+logger = logging.get_logger(__name__)
+
+
+def evaluate(cfg, mode):
+    """
+    Test the model quantized with the given mode.
+    Args:
+        cfg (CfgNode): configs. Details can be found in
+            slowfast/config/defaults.py
+        mode (str): a TEST.QUANTIZE option, empty for the float model.
+    Returns:
+        stats (dict): accuracy, AUROC, latency and size of the model.
+    """
+    cfg = cfg.clone()
+    cfg.TEST.QUANTIZE = mode
+    np.random.seed(cfg.RNG_SEED)
+    torch.manual_seed(cfg.RNG_SEED)
+
+    model = build_model(cfg)
+    cu.load_test_checkpoint(cfg, model)
+    if mode:
+        calib_loader = (
+            loader.construct_loader(cfg, "val") if mode == "static" else None
+        )
+        model = quantization.quantize_model(cfg, model, calib_loader)
+
+    test_loader = loader.construct_loader(cfg, "test")
+    num_clips = cfg.TEST.NUM_ENSEMBLE_VIEWS * cfg.TEST.NUM_SPATIAL_CROPS
+    test_meter = TestMeter(
+        test_loader.dataset.num_videos // num_clips,
+        num_clips,
+        cfg.MODEL.NUM_CLASSES,
+        len(test_loader),
+        cfg.DATA.MULTI_LABEL,
+        cfg.DATA.ENSEMBLE_METHOD,
+    )
+    start = time.perf_counter()
+    test_meter = perform_test(test_loader, model, test_meter, cfg)
+    elapsed = time.perf_counter() - start
+
+    labels = (test_meter.video_labels > 0).numpy()
+    scores = positive_scores(
+        test_meter.video_preds, outputs_probabilities(cfg, False)
+    ).numpy()
+    fpr, tpr, _ = sklearn.metrics.roc_curve(labels, scores)
+    stats = {
+        "mode": mode or "float",
+        "top1_acc": float(test_meter.stats["top1_acc"]),
+        "auroc": sklearn.metrics.auc(fpr, tpr),
+        "time_per_clip_ms": elapsed * 1000 / len(test_loader.dataset),
+        "checkpoint_mb": misc.model_size(model)["checkpoint_mb"],
+    }
+    return stats, test_meter.video_preds
+
+
+def main():
+    args = parse_args()
+    cfg = load_config(args, args.cfg_files[0])
+    logging.setup_logging(cfg.OUTPUT_DIR)
+    cfg.NUM_GPUS = 0
+
+    float_stats, float_preds = evaluate(cfg, "")
+    logging.log_json_stats(float_stats)
+    for mode in ["dynamic", "static"]:
+        stats, preds = evaluate(cfg, mode)
+        stats["top1_acc_drift"] = stats["top1_acc"] - float_stats["top1_acc"]
+        stats["auroc_drift"] = stats["auroc"] - float_stats["auroc"]
+        stats["max_pred_diff"] = (preds - float_preds).abs().max().item()
+        stats["speedup"] = (
+            float_stats["time_per_clip_ms"] / stats["time_per_clip_ms"]
+        )
+        logging.log_json_stats(stats)
+
+
+if __name__ == "__main__":
+    main()
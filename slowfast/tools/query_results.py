@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+"""
+Query the results store written by the train and test runs, e.g. the mean
+test AUROC of every model and learning rate:
+    python tools/query_results.py --by MODEL.MODEL_NAME SOLVER.BASE_LR \
+        --metric auroc
+or the best validation error of the last epoch of the training runs:
+    python tools/query_results.py --by MODEL.MODEL_NAME \
+        --metric min_top1_err --split val_epoch --last-epoch --kind train
+Stores of many runs are compacted into a single file per table with
+--compact.
+"""
+
+import argparse
+import time
+
+from slowfast.utils.results_store import FINAL, ResultsStore
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Query the results store.")
+    parser.add_argument(
+        "--store",
+        help="Path to the results store",
+        default="./experiments/results_store",
+    )
+    parser.add_argument(
+        "--by",
+        help="Config fields to group the runs by",
+        default=["MODEL.MODEL_NAME"],
+        nargs="+",
+    )
+    parser.add_argument(
+        "--metric", help="Name of the aggregated stat", default="top1_acc"
+    )
+    parser.add_argument(
+        "--split", help="Split of the aggregated stat", default="test_final"
+    )
+    parser.add_argument(
+        "--last-epoch",
+        help="Aggregate the stat of the last epoch of every run",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--kind", help="Kind of the runs, train or test", default=None
+    )
+    parser.add_argument(
+        "--compact",
+        help="Merge the part files of every table before the query",
+        action="store_true",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    store = ResultsStore(args.store)
+    if args.compact:
+        for name in store.schemas:
+            print("{}: merged {} files".format(name, store.compact(name)))
+    start = time.perf_counter()
+    table = store.aggregate(
+        args.by,
+        args.metric,
+        args.split,
+        None if args.last_epoch else FINAL,
+        args.kind,
+    )
+    print(table.to_pandas().to_string(index=False))
+    print("Query took {:.3f}s".format(time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    main()
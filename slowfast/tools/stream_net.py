@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates. All Rights Reserved.
+"""
+Streaming inference of the PD region model over full length test videos.
+Every video is walked with a sliding window of DATA.NUM_FRAMES sampled frames
+and a stride of STREAM.STRIDE frames. The backbone and RoI features of each
+frame are computed once and reused by all the windows covering it, so the
+cost grows with the video length instead of the number of views. Per window
+and aggregated video scores are logged and optionally saved.
+"""
+
+import os
+import pickle
+import time
+import numpy as np
+import torch
+
+import slowfast.utils.checkpoint as cu
+import slowfast.utils.logging as logging
+from slowfast.datasets import build_dataset
+from slowfast.models import build_model
+from slowfast.models.streaming import StreamingPDModel
+from slowfast.utils.binary_metrics import (
+    BinaryMetrics,
+    outputs_probabilities,
+    positive_scores,
+)
+from slowfast.utils.env import pathmgr
+from slowfast.utils.parser import load_config, parse_args
+
+logger = logging.get_logger(__name__)
+
+
+def stream_video(cfg, dataset, stream_model, index):
+    """
+    Score every window of a video.
+    Args:
+        cfg (CfgNode): configs. Details can be found in
+            slowfast/config/defaults.py
+        dataset (Kinetics): test dataset the video belongs to.
+        stream_model (StreamingPDModel): streaming model.
+        index (int): the video index.
+    Returns:
+        windows (list): (first frame index, last frame index) of the windows.
+        scores (tensor): class probabilities of the windows, None if the
+            video has no frames.
+        num_frames (int): number of frames run through the backbone.
+    """
+    stream_model.reset()
+    windows, scores = [], []
+    for frames, bboxes, frame_nums in dataset.iter_video(
+        index, cfg.STREAM.CHUNK_SIZE
+    ):
+        if cfg.NUM_GPUS:
+            frames, bboxes = frames.cuda(), bboxes.cuda()
+        chunk_windows, chunk_scores = stream_model.push(
+            frames, bboxes, frame_nums
+        )
+        windows += chunk_windows
+        if chunk_scores is not None:
+            scores.append(chunk_scores.cpu())
+    flush_windows, flush_scores = stream_model.flush()
+    windows += flush_windows
+    if flush_scores is not None:
+        scores.append(flush_scores.cpu())
+    scores = torch.cat(scores) if scores else None
+    return windows, scores, stream_model.num_seen
+
+
+def stream(cfg):
+    """
+    Run streaming inference on the test split.
+    Args:
+        cfg (CfgNode): configs. Details can be found in
+            slowfast/config/defaults.py
+    """
+    assert cfg.STREAM.AGGREGATION in ["mean", "max"]
+    logging.setup_logging(cfg.OUTPUT_DIR)
+    np.random.seed(cfg.RNG_SEED)
+    torch.manual_seed(cfg.RNG_SEED)
+    cfg.NUM_GPUS = min(cfg.NUM_GPUS, 1)
+
+    model = build_model(cfg)
+    cu.load_test_checkpoint(cfg, model)
+    model.eval()
+    stream_model = StreamingPDModel(
+        model, cfg.DATA.NUM_FRAMES, cfg.STREAM.STRIDE
+    )
+    dataset = build_dataset(cfg.TEST.DATASET, cfg, "test")
+
+    is_prob = outputs_probabilities(cfg, False)
+    results, video_preds, video_labels = [], [], []
+    total_frames, total_time = 0, 0.0
+    # Every test view of a video is listed, stream each video once.
+    for index in range(0, dataset.num_videos, dataset._num_clips):
+        start = time.perf_counter()
+        try:
+            windows, scores, num_frames = stream_video(
+                cfg, dataset, stream_model, index
+            )
+        except Exception as e:
+            logger.warning(
+                "Failed to stream video idx {} from {}: {}".format(
+                    index, dataset._path_to_videos[index], e
+                )
+            )
+            continue
+        elapsed = time.perf_counter() - start
+        if scores is None:
+            logger.warning(
+                "Skipped video idx {} from {}, no frames were decoded".format(
+                    index, dataset._path_to_videos[index]
+                )
+            )
+            continue
+        if cfg.STREAM.AGGREGATION == "mean":
+            video_pred = scores.mean(dim=0)
+        else:
+            video_pred = scores.max(dim=0)[0]
+        label = dataset._labels[index]
+        if cfg.MODEL.NUM_CLASSES == 2 and label > 0:
+            label = 1
+
+        video_preds.append(video_pred)
+        video_labels.append(label)
+        total_frames += num_frames
+        total_time += elapsed
+        results.append(
+            {
+                "path": dataset._path_to_videos[index],
+                "label": label,
+                "windows": windows,
+                "window_preds": scores,
+                "video_pred": video_pred,
+            }
+        )
+        logging.log_json_stats(
+            {
+                "split": "stream_video",
+                "video": index,
+                "label": label,
+                "pred": positive_scores(video_pred[None], is_prob).item(),
+                "num_windows": len(windows),
+                "num_frames": num_frames,
+                "time_s": elapsed,
+            }
+        )
+
+    assert len(video_preds) > 0, "No test video could be streamed."
+    video_preds = torch.stack(video_preds)
+    video_labels = torch.tensor(video_labels)
+    stats = {
+        "split": "stream_final",
+        "top1_acc": (video_preds.argmax(dim=1) == video_labels)
+        .float()
+        .mean()
+        .item()
+        * 100.0,
+        "frames_per_s": total_frames / total_time,
+        "num_frames": total_frames,
+    }
+    binary_metrics = BinaryMetrics(
+        cfg.BINARY_METRICS.NUM_BINS, cfg.BINARY_METRICS.THRESHOLD, exact=True
+    )
+    binary_metrics.update(positive_scores(video_preds, is_prob), video_labels)
+    binary_stats = binary_metrics.compute()
+    if "auroc" in binary_stats:
+        stats["auroc"] = binary_stats["auroc"]
+    logging.log_json_stats(stats)
+
+    if cfg.STREAM.SAVE_RESULTS_PATH != "":
+        save_path = os.path.join(cfg.OUTPUT_DIR, cfg.STREAM.SAVE_RESULTS_PATH)
+        with pathmgr.open(save_path, "wb") as f:
+            pickle.dump(results, f)
+        logger.info("Saved streaming results to {}".format(save_path))
+
+
+def main():
+    args = parse_args()
+    cfg = load_config(args, args.cfg_files[0])
+    stream(cfg)
+
+
+if __name__ == "__main__":
+    main()
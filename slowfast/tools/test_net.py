@@ -8,18 +8,26 @@ import os
 import pickle
 import torch
 
+import slowfast.utils.bootstrap as bootstrap
 import slowfast.utils.checkpoint as cu
 import slowfast.utils.distributed as du
 import slowfast.utils.logging as logging
-import slowfast.utils.metrics as metrics
 import slowfast.utils.misc as misc
+import slowfast.utils.profiler as profiler
+import slowfast.utils.results_store as results_store
+import slowfast.utils.subgroups as subgroups
 import slowfast.visualization.tensorboard_vis as tb
 from slowfast.datasets import loader
-from slowfast.models import build_model
+from slowfast.datasets.utils import get_view_order
+from slowfast.models import build_model, fuse_helper
+from slowfast.utils.binary_metrics import (
+    BinaryMetrics,
+    outputs_probabilities,
+    positive_scores,
+)
 from slowfast.utils.env import pathmgr
-from slowfast.utils.meters import AVAMeter, TestMeter
-from sklearn.metrics import roc_auc_score
-import sklearn.metrics
+from slowfast.utils.meters import AVAMeter, EarlyExitTestMeter, TestMeter
+from torch.profiler import record_function
 
 #from cam_framework import CamFramework 
 
@@ -31,6 +39,34 @@ from torchvision.models import resnet50
 logger = logging.get_logger(__name__)
 
 
+def copy_to_gpu(inputs, labels, video_idx, meta, bboxes):
+    """
+    Transfer a batch of the loader to the current GPU device.
+    Args:
+        inputs (list): the clips of every pathway.
+        labels, video_idx, bboxes (tensor): labels, video indices and region
+            boxes of the clips.
+        meta (dict): the meta data of the clips.
+    Returns:
+        batch (tuple): the arguments, on the GPU.
+    """
+    if isinstance(inputs, (list,)):
+        for i in range(len(inputs)):
+            inputs[i] = inputs[i].cuda(non_blocking=True)
+    else:
+        inputs = inputs.cuda(non_blocking=True)
+    labels = labels.cuda()
+    video_idx = video_idx.cuda()
+    bboxes = bboxes.cuda()
+    for key, val in meta.items():
+        if isinstance(val, (list,)):
+            for i in range(len(val)):
+                val[i] = val[i].cuda(non_blocking=True)
+        else:
+            meta[key] = val.cuda(non_blocking=True)
+    return inputs, labels, video_idx, meta, bboxes
+
+
 @torch.no_grad()
 def perform_test(test_loader, model, test_meter, cfg, writer=None):
     """
@@ -61,35 +97,20 @@ def perform_test(test_loader, model, test_meter, cfg, writer=None):
     test_meter.iter_tic()
 
     for cur_iter, (inputs, labels, video_idx, time, meta, bboxes) in enumerate(
-        test_loader
+        profiler.profile_loader(test_loader, cfg, "test")
     ):
 
         if cfg.NUM_GPUS:
-            # Transfer the data to the current GPU device.
-            if isinstance(inputs, (list,)):
-                for i in range(len(inputs)):
-                    inputs[i] = inputs[i].cuda(non_blocking=True)
-            else:
-                inputs = inputs.cuda(non_blocking=True)
-            # Transfer the data to the current GPU device.
-            labels = labels.cuda()
-            video_idx = video_idx.cuda()
-
-            print("bboxes: ", bboxes.shape)
-            #print("inputs: ", inputs.shape)
-            print("labels: ", labels.shape)
-            bboxes = bboxes.cuda()
-            for key, val in meta.items():
-                if isinstance(val, (list,)):
-                    for i in range(len(val)):
-                        val[i] = val[i].cuda(non_blocking=True)
-                else:
-                    meta[key] = val.cuda(non_blocking=True)
+            with record_function("h2d"):
+                inputs, labels, video_idx, meta, bboxes = copy_to_gpu(
+                    inputs, labels, video_idx, meta, bboxes
+                )
         test_meter.data_toc()
 
         if cfg.DETECTION.ENABLE:
             # Compute the predictions.
-            preds = model(inputs, meta["boxes"])
+            with record_function("forward"):
+                preds = model(inputs, meta["boxes"])
             ori_boxes = meta["ori_boxes"]
             metadata = meta["metadata"]
 
@@ -177,8 +198,8 @@ def perform_test(test_loader, model, test_meter, cfg, writer=None):
             # inputs[0].requires_grad = True
             # print("the real requires grad: ", inputs[0].requires_grad)
 
-            print("Inputs shape: ", inputs[0].shape)
-            preds = model(inputs, bboxes)
+            with record_function("forward"):
+                preds = model(inputs, bboxes)
             # print("preds[0].shape: ", preds[0].shape)
             # print("Outputs shape: ", preds.shape)
             # # print("preds shape: ", preds.shape)
@@ -214,10 +235,6 @@ def perform_test(test_loader, model, test_meter, cfg, writer=None):
 
         test_meter.iter_toc()
 
-        print("preds shape: ", preds.shape)
-        print("labels shape: ", labels.shape)
-        print("video_idx shape: ", video_idx.shape)
-
         # Update and log stats.
         test_meter.update_stats(
             preds.detach(), labels.detach(), video_idx.detach()
@@ -251,6 +268,63 @@ def perform_test(test_loader, model, test_meter, cfg, writer=None):
     return test_meter
 
 
+@torch.no_grad()
+def perform_early_exit_test(test_loader, model, test_meter, cfg):
+    """
+    Multi-view testing with early exit. The views are tested in rounds, from
+    the most to the least informative one (see get_view_order). Every round
+    tests the next view of the videos whose running ensemble is not yet
+    confident enough, so confidently classified videos use fewer views.
+    Args:
+        test_loader (loader): video testing loader.
+        model (model): the pretrained video model to test.
+        test_meter (EarlyExitTestMeter): testing meter to ensemble the
+            views and decide which videos exit.
+        cfg (CfgNode): configs. Details can be found in
+            slowfast/config/defaults.py
+    """
+    assert (
+        cfg.NUM_GPUS * cfg.NUM_SHARDS <= 1
+    ), "Early exit testing runs on a single device."
+    model.eval()
+    dataset = test_loader.dataset
+    num_clips = test_meter.num_clips
+
+    cur_iter = 0
+    test_meter.iter_tic()
+    for view in get_view_order(
+        cfg.TEST.NUM_ENSEMBLE_VIEWS, cfg.TEST.NUM_SPATIAL_CROPS
+    ):
+        clip_ids = [
+            video * num_clips + view for video in test_meter.active_videos()
+        ]
+        if len(clip_ids) == 0:
+            break
+        view_loader = torch.utils.data.DataLoader(
+            torch.utils.data.Subset(dataset, clip_ids),
+            batch_size=test_loader.batch_size,
+            num_workers=cfg.DATA_LOADER.NUM_WORKERS,
+            pin_memory=cfg.DATA_LOADER.PIN_MEMORY,
+            collate_fn=test_loader.collate_fn,
+        )
+        for inputs, labels, clip_idx, _, _, bboxes in view_loader:
+            if cfg.NUM_GPUS:
+                inputs = [x.cuda(non_blocking=True) for x in inputs]
+                bboxes = bboxes.cuda()
+            test_meter.data_toc()
+            preds = model(inputs, bboxes)
+            if cfg.NUM_GPUS:
+                preds = preds.cpu()
+            test_meter.iter_toc()
+            test_meter.update_stats(preds.detach(), labels, clip_idx)
+            test_meter.log_iter_stats(cur_iter)
+            cur_iter += 1
+            test_meter.iter_tic()
+
+    test_meter.finalize_metrics((1, 2))
+    return test_meter
+
+
 def test(cfg):
     """
     Perform multi-view testing on the pretrainied video model.
@@ -276,8 +350,8 @@ def test(cfg):
 
     out_str_prefix = "lin" if cfg.MODEL.DETACH_FINAL_FC else ""
 
-    # if du.is_master_proc() and cfg.LOG_MODEL_INFO:
-    #     misc.log_model_info(model, cfg, use_train_input=False)
+    if du.is_master_proc() and cfg.LOG_MODEL_INFO:
+        misc.log_model_info(model, cfg, use_train_input=False)
 
     if (
         cfg.TASK == "ssl"
@@ -293,6 +367,21 @@ def test(cfg):
 
     cu.load_test_checkpoint(cfg, model)
 
+    if cfg.TEST.FUSE_CONV_BN:
+        model.eval()
+        fuse_helper.fuse_conv_bn(model)
+
+    if cfg.TEST.QUANTIZE:
+        # Imported here, the torch.ao quantization stack needs torch >= 1.13.
+        from slowfast.models import quantization
+
+        calib_loader = (
+            loader.construct_loader(cfg, "val")
+            if cfg.TEST.QUANTIZE == "static"
+            else None
+        )
+        model = quantization.quantize_model(cfg, model, calib_loader)
+
     # Create video testing loaders.
     test_loader = loader.construct_loader(cfg, "test")
     logger.info("Testing model for {} iterations".format(len(test_loader)))
@@ -300,6 +389,18 @@ def test(cfg):
     if cfg.DETECTION.ENABLE:
         assert cfg.NUM_GPUS == cfg.TEST.BATCH_SIZE or cfg.NUM_GPUS == 0
         test_meter = AVAMeter(len(test_loader), cfg, mode="test")
+    elif cfg.TEST.EARLY_EXIT:
+        num_clips = cfg.TEST.NUM_ENSEMBLE_VIEWS * cfg.TEST.NUM_SPATIAL_CROPS
+        test_meter = EarlyExitTestMeter(
+            test_loader.dataset.num_videos // num_clips,
+            num_clips,
+            cfg.MODEL.NUM_CLASSES,
+            len(test_loader),
+            cfg.DATA.ENSEMBLE_METHOD,
+            cfg.TEST.EARLY_EXIT_CRITERION,
+            cfg.TEST.EARLY_EXIT_THRESHOLD,
+            cfg.TEST.EARLY_EXIT_MIN_VIEWS,
+        )
     else:
         assert (
             test_loader.dataset.num_videos
@@ -333,15 +434,67 @@ def test(cfg):
     else:
         k = "top5_acc"
     # # Perform multi-view test on the entire dataset.
-    test_meter = perform_test(test_loader, model, test_meter, cfg, writer)
-    print(test_meter.video_preds[:, 1])
-    nk = metrics.topks_predictions(test_meter.video_preds, test_meter.video_labels, (1, 2))
-    #auroc_score = roc_auc_score(test_meter.video_labels, test_meter.video_preds[:, 1])
-    fpr, tpr, thresholds = sklearn.metrics.roc_curve(y_true = test_meter.video_labels, y_score = test_meter.video_preds[:, 1], pos_label = 1)
-    auroc_score = sklearn.metrics.auc(fpr, tpr)
-    f1 = sklearn.metrics.f1_score(y_true=test_meter.video_labels, y_pred=nk[0])
-    precision, recall, thresholds = sklearn.metrics.precision_recall_curve(test_meter.video_labels, test_meter.video_preds[:, 1])
-    auc_precision_recall = sklearn.metrics.auc(recall, precision)
+    if cfg.TEST.EARLY_EXIT:
+        test_meter = perform_early_exit_test(
+            test_loader, model, test_meter, cfg
+        )
+    else:
+        test_meter = perform_test(test_loader, model, test_meter, cfg, writer)
+    # The video predictions are gathered from all the processes already, the
+    # exact curves are cheap to compute.
+    binary_metrics = BinaryMetrics(
+        cfg.BINARY_METRICS.NUM_BINS, cfg.BINARY_METRICS.THRESHOLD, exact=True
+    )
+    scores = positive_scores(
+        test_meter.video_preds, outputs_probabilities(cfg, False)
+    )
+    binary_metrics.update(scores, test_meter.video_labels)
+    binary_stats = binary_metrics.compute()
+    logging.log_json_stats(dict(binary_stats, split="test_binary"))
+    auroc_score = binary_stats.get("auroc", float("nan"))
+    auc_precision_recall = binary_stats.get("auprc", float("nan"))
+    f1 = binary_stats["f1"]
+
+    intervals = {}
+    if cfg.TEST.BOOTSTRAP_SAMPLES > 0 and not cfg.DATA.MULTI_LABEL:
+        groups = None
+        paths_to_videos = test_loader.dataset._path_to_videos[
+            :: test_meter.num_clips
+        ]
+        if cfg.TEST.SUBJECTS_FILE != "":
+            groups = bootstrap.load_video_subjects(
+                paths_to_videos, cfg.TEST.SUBJECTS_FILE
+            )
+        elif cfg.SUBGROUP.MANIFEST != "":
+            groups = subgroups.manifest_subjects(
+                paths_to_videos, cfg.SUBGROUP.MANIFEST
+            )
+        intervals = bootstrap.bootstrap_intervals(
+            scores,
+            test_meter.video_labels,
+            cfg.TEST.BOOTSTRAP_SAMPLES,
+            cfg.TEST.BOOTSTRAP_LEVEL,
+            groups,
+            cfg.TEST.BOOTSTRAP_STRATIFY,
+            cfg.BINARY_METRICS.THRESHOLD,
+            cfg.RNG_SEED,
+        )
+        logger.info(
+            "bootstrap: {}".format(
+                bootstrap.format_intervals(intervals, cfg.TEST.BOOTSTRAP_LEVEL)
+            )
+        )
+
+    subgroup_stats = []
+    if cfg.SUBGROUP.MANIFEST != "" and not cfg.DATA.MULTI_LABEL:
+        subgroup_stats = subgroups.evaluate_subgroups(
+            cfg,
+            test_loader.dataset._path_to_videos[:: test_meter.num_clips],
+            scores,
+            test_meter.video_labels,
+        )
+        for stats in subgroup_stats:
+            logging.log_json_stats(dict(stats, split="test_subgroup"))
 
     if writer is not None:
         writer.close()
@@ -362,9 +515,46 @@ def test(cfg):
         )
     )
     logger.info("testing done: {}".format(result_string))
-    
-    with open('./experiments/results.txt', 'a+') as f:
-        f.write(" Test accuracy: ")
-        f.write(result_string + "\n")
+
+    if cfg.RESULTS_STORE.ENABLE and results_store.is_available():
+        if du.is_master_proc(cfg.NUM_GPUS * cfg.NUM_SHARDS):
+            record = results_store.RunRecord(cfg, "test")
+            record.add_stats(test_meter.stats)
+            record.add_stats(dict(binary_stats, split="test_final"))
+            for name, (_, low, high) in intervals.items():
+                record.add_stats(
+                    {
+                        "split": "test_final",
+                        name + "_low": low,
+                        name + "_high": high,
+                    }
+                )
+            for stats in subgroup_stats:
+                stats = dict(stats)
+                split = "test_subgroup:{}={}".format(
+                    stats.pop("column"), stats.pop("group")
+                )
+                record.add_stats(dict(stats, split=split))
+            if cfg.RESULTS_STORE.SAVE_PREDICTIONS and not cfg.DATA.MULTI_LABEL:
+                record.add_predictions(
+                    test_loader.dataset._path_to_videos[
+                        :: test_meter.num_clips
+                    ],
+                    test_meter.video_labels,
+                    test_meter.video_preds,
+                    scores,
+                )
+            results_store.ResultsStore(
+                cfg.RESULTS_STORE.PATH, cfg.RESULTS_STORE.MAX_PARTS
+            ).append(record)
+    else:
+        if cfg.RESULTS_STORE.ENABLE:
+            logger.warning(
+                "pyarrow is not installed, appending the results to "
+                "experiments/results.txt instead of the results store."
+            )
+        with open('./experiments/results.txt', 'a+') as f:
+            f.write(" Test accuracy: ")
+            f.write(result_string + "\n")
 
     return result_string
\ No newline at end of file
@@ -5,7 +5,6 @@
 
 import math
 import numpy as np
-import pprint
 import torch
 from fvcore.nn.precise_bn import get_bn_modules, update_bn_stats
 
@@ -13,16 +12,26 @@ import slowfast.models.losses as losses
 import slowfast.models.optimizer as optim
 import slowfast.utils.checkpoint as cu
 import slowfast.utils.distributed as du
+import slowfast.utils.loader_monitor as loader_monitor
 import slowfast.utils.logging as logging
 import slowfast.utils.metrics as metrics
 import slowfast.utils.misc as misc
+import slowfast.utils.profiler as profiler
+import slowfast.utils.results_store as results_store
 import slowfast.visualization.tensorboard_vis as tb
 from slowfast.datasets import loader
 from slowfast.datasets.mixup import MixUp
 from slowfast.models import build_model
 from slowfast.models.contrastive import cancel_swav_gradients
+from slowfast.models.distillation import DistillationLoss, Teacher
+from slowfast.models.utils import freeze_modules
+from slowfast.utils.binary_metrics import (
+    outputs_probabilities,
+    positive_scores,
+)
 from slowfast.utils.meters import AVAMeter, EpochTimer, TrainMeter, ValMeter
 from slowfast.utils.multigrid import MultigridSchedule
+from torch.profiler import record_function
 from sklearn.metrics import roc_auc_score
 
 logger = logging.get_logger(__name__)
@@ -30,6 +39,39 @@ logger = logging.get_logger(__name__)
 k = 2
 
 
+def copy_to_gpu(inputs, labels, index, time, meta, bboxes):
+    """
+    Transfer a batch of the loader to the current GPU device.
+    Args:
+        inputs (list): the clips of every pathway, or lists of them.
+        labels, index, time, bboxes (tensor): labels, video indices, time
+            indices and region boxes of the clips.
+        meta (dict): the meta data of the clips.
+    Returns:
+        batch (tuple): the arguments, on the GPU.
+    """
+    if isinstance(inputs, (list,)):
+        for i in range(len(inputs)):
+            if isinstance(inputs[i], (list,)):
+                for j in range(len(inputs[i])):
+                    inputs[i][j] = inputs[i][j].cuda(non_blocking=True)
+            else:
+                inputs[i] = inputs[i].cuda(non_blocking=True)
+    else:
+        inputs = inputs.cuda(non_blocking=True)
+    labels = labels.cuda()
+    for key, val in meta.items():
+        if isinstance(val, (list,)):
+            for i in range(len(val)):
+                val[i] = val[i].cuda(non_blocking=True)
+        else:
+            meta[key] = val.cuda(non_blocking=True)
+    index = index.cuda()
+    time = time.cuda()
+    bboxes = bboxes.cuda()
+    return inputs, labels, index, time, meta, bboxes
+
+
 def train_epoch(
     train_loader,
     model,
@@ -39,6 +81,7 @@ def train_epoch(
     cur_epoch,
     cfg,
     writer=None,
+    teacher=None,
 ):
     """
     Perform the video training for one epoch.
@@ -53,12 +96,13 @@ def train_epoch(
             slowfast/config/defaults.py
         writer (TensorboardWriter, optional): TensorboardWriter object
             to writer Tensorboard log.
+        teacher (Teacher, optional): frozen teacher to distill the model
+            from.
     """
     # Enable train mode.
     model.train()
     train_meter.iter_tic()
     data_size = len(train_loader)
-    print("DATASIZE", data_size)
 
     if cfg.MIXUP.ENABLE:
         mixup_fn = MixUp(
@@ -86,32 +130,29 @@ def train_epoch(
         misc.frozen_bn_stats(model)
     # Explicitly declare reduction to mean.
     loss_fun = losses.get_loss_func(cfg.MODEL.LOSS_FUNC)(reduction="mean")
+    if teacher is not None:
+        loss_fun = DistillationLoss(
+            loss_fun,
+            cfg.DISTILL.ALPHA,
+            cfg.DISTILL.TEMPERATURE,
+            outputs_probabilities(cfg, True),
+        )
 
+    monitor = (
+        loader_monitor.LoaderMonitor(train_loader, cfg)
+        if cfg.LOADER_MONITOR.ENABLE
+        else None
+    )
+    batches = train_loader if monitor is None else monitor.iterate()
     for cur_iter, (inputs, labels, index, time, meta, bboxes) in enumerate(
-        train_loader
+        profiler.profile_loader(batches, cfg, "train", cur_epoch)
     ):
         # Transfer the data to the current GPU device.
         if cfg.NUM_GPUS:
-            if isinstance(inputs, (list,)):
-                for i in range(len(inputs)):
-                    if isinstance(inputs[i], (list,)):
-                        for j in range(len(inputs[i])):
-                            inputs[i][j] = inputs[i][j].cuda(non_blocking=True)
-                    else:
-                        inputs[i] = inputs[i].cuda(non_blocking=True)
-            else:
-                print("not list")
-                inputs = inputs.cuda(non_blocking=True)
-            labels = labels.cuda()
-            for key, val in meta.items():
-                if isinstance(val, (list,)):
-                    for i in range(len(val)):
-                        val[i] = val[i].cuda(non_blocking=True)
-                else:
-                    meta[key] = val.cuda(non_blocking=True)
-            index = index.cuda()
-            time = time.cuda()
-            bboxes = bboxes.cuda()
+            with record_function("h2d"):
+                inputs, labels, index, time, meta, bboxes = copy_to_gpu(
+                    inputs, labels, index, time, meta, bboxes
+                )
         batch_size = (
             inputs[0][0].size(0)
             if isinstance(inputs[0], list)
@@ -134,21 +175,23 @@ def train_epoch(
             optimizer.zero_grad()
 
             if cfg.MODEL.MODEL_NAME == "ContrastiveModel":
-                (
-                    model,
-                    preds,
-                    partial_loss,
-                    perform_backward,
-                ) = contrastive_forward(
-                    model, cfg, inputs, index, time, epoch_exact, scaler
-                )
+                with record_function("forward"):
+                    (
+                        model,
+                        preds,
+                        partial_loss,
+                        perform_backward,
+                    ) = contrastive_forward(
+                        model, cfg, inputs, index, time, epoch_exact, scaler
+                    )
             elif cfg.DETECTION.ENABLE:
                 # Compute the predictions.
-                preds = model(inputs, meta["boxes"])
+                with record_function("forward"):
+                    preds = model(inputs, meta["boxes"])
             else:
                 # preds = model(inputs)
-                preds = model(inputs, bboxes)
-                print(preds)
+                with record_function("forward"):
+                    preds = model(inputs, bboxes)
         if cfg.TASK == "ssl" and cfg.MODEL.MODEL_NAME == "ContrastiveModel":
             labels = torch.zeros(
                 preds.size(0), dtype=labels.dtype, device=labels.device
@@ -156,36 +199,46 @@ def train_epoch(
 
         if cfg.MODEL.MODEL_NAME == "ContrastiveModel" and partial_loss:
             loss = partial_loss
+        elif teacher is not None:
+            with record_function("teacher"):
+                teacher_preds = teacher(inputs, bboxes, index)
+            with record_function("loss"):
+                loss = loss_fun(preds, teacher_preds, labels)
         else:
             # Compute the loss.
-            loss = loss_fun(preds, labels)
+            with record_function("loss"):
+                loss = loss_fun(preds, labels)
 
         # check Nan Loss.
         misc.check_nan_losses(loss)
 
         if perform_backward:
-            scaler.scale(loss).backward()
-        # Unscales the gradients of optimizer's assigned params in-place
-        scaler.unscale_(optimizer)
-        # Clip gradients if necessary
-        if cfg.SOLVER.CLIP_GRAD_VAL:
-            torch.nn.utils.clip_grad_value_(
-                model.parameters(), cfg.SOLVER.CLIP_GRAD_VAL
-            )
-        elif cfg.SOLVER.CLIP_GRAD_L2NORM:
-            torch.nn.utils.clip_grad_norm_(
-                model.parameters(), cfg.SOLVER.CLIP_GRAD_L2NORM
-            )
+            with record_function("backward"):
+                scaler.scale(loss).backward()
+        with record_function("optimizer"):
+            # Unscales the gradients of optimizer's assigned params in-place
+            scaler.unscale_(optimizer)
+            # Clip gradients if necessary
+            if cfg.SOLVER.CLIP_GRAD_VAL:
+                torch.nn.utils.clip_grad_value_(
+                    model.parameters(), cfg.SOLVER.CLIP_GRAD_VAL
+                )
+            elif cfg.SOLVER.CLIP_GRAD_L2NORM:
+                torch.nn.utils.clip_grad_norm_(
+                    model.parameters(), cfg.SOLVER.CLIP_GRAD_L2NORM
+                )
 
-        model = cancel_swav_gradients(model, cfg, epoch_exact)
-        if cur_iter < iters_noupdate and cur_epoch == 0:  #  for e.g. MoCo
-            logger.info(
-                "Not updating parameters {}/{}".format(cur_iter, iters_noupdate)
-            )
-        else:
-            # Update the parameters.
-            scaler.step(optimizer)
-        scaler.update()
+            model = cancel_swav_gradients(model, cfg, epoch_exact)
+            if cur_iter < iters_noupdate and cur_epoch == 0:  #  for e.g. MoCo
+                logger.info(
+                    "Not updating parameters {}/{}".format(
+                        cur_iter, iters_noupdate
+                    )
+                )
+            else:
+                # Update the parameters.
+                scaler.step(optimizer)
+            scaler.update()
 
         if cfg.MIXUP.ENABLE:
             _top_max_k_vals, top_max_k_inds = torch.topk(
@@ -261,14 +314,18 @@ def train_epoch(
                     global_step=data_size * cur_epoch + cur_iter,
                 )
 
-        torch.cuda.synchronize()
+        if cfg.NUM_GPUS:
+            torch.cuda.synchronize()
         train_meter.iter_toc()  # do measure allreduce for this meter
         train_meter.log_iter_stats(cur_epoch, cur_iter)
-        torch.cuda.synchronize()
+        if cfg.NUM_GPUS:
+            torch.cuda.synchronize()
         train_meter.iter_tic()
     del inputs
     # Log epoch stats.
     train_meter.log_epoch_stats(cur_epoch)
+    if monitor is not None:
+        monitor.log_epoch_stats(cur_epoch)
     train_meter.reset()
 
 
@@ -293,33 +350,16 @@ def eval_epoch(
     model.eval()
     val_meter.iter_tic()
     last_val_acc = 0
+    preds_are_probs = outputs_probabilities(cfg, False)
 
-    for cur_iter, (inputs, labels, index, time, meta, bboxes) in enumerate(val_loader):
-        #print("input shape: ", inputs[0][0])
-        #print("VAL INPUTS: ", inputs)
-        print("VAL LABELS: ", labels)
-      
+    for cur_iter, (inputs, labels, index, time, meta, bboxes) in enumerate(
+        profiler.profile_loader(val_loader, cfg, "val", cur_epoch)
+    ):
         if cfg.NUM_GPUS:
-            if isinstance(inputs, (list,)):
-                for i in range(len(inputs)):
-                    if isinstance(inputs[i], (list,)):
-                        for j in range(len(inputs[i])):
-                            inputs[i][j] = inputs[i][j].cuda(non_blocking=True)
-                    else:
-                        inputs[i] = inputs[i].cuda(non_blocking=True)
-            else:
-                print("not list")
-                inputs = inputs.cuda(non_blocking=True)
-            labels = labels.cuda()
-            for key, val in meta.items():
-                if isinstance(val, (list,)):
-                    for i in range(len(val)):
-                        val[i] = val[i].cuda(non_blocking=True)
-                else:
-                    meta[key] = val.cuda(non_blocking=True)
-            index = index.cuda()
-            time = time.cuda()
-            bboxes = bboxes.cuda()
+            with record_function("h2d"):
+                inputs, labels, index, time, meta, bboxes = copy_to_gpu(
+                    inputs, labels, index, time, meta, bboxes
+                )
         batch_size = (
             inputs[0][0].size(0)
             if isinstance(inputs[0], list)
@@ -328,9 +368,9 @@ def eval_epoch(
         val_meter.data_toc()
 
         if cfg.DETECTION.ENABLE:
-            print("DETECTION ENABLED")
             # Compute the predictions.
-            preds = model(inputs, meta["boxes"])
+            with record_function("forward"):
+                preds = model(inputs, meta["boxes"])
             ori_boxes = meta["ori_boxes"]
             metadata = meta["metadata"]
 
@@ -350,7 +390,6 @@ def eval_epoch(
 
         else:
             if cfg.TASK == "ssl" and cfg.MODEL.MODEL_NAME == "ContrastiveModel":
-                print("CSSL")
                 if not cfg.CONTRASTIVE.KNN_ON:
                     return
                 train_labels = (
@@ -374,8 +413,8 @@ def eval_epoch(
                 )
                 preds = torch.sum(probs, 1)
             else:
-                print("forward pass")
-                preds = model(inputs, bboxes)
+                with record_function("forward"):
+                    preds = model(inputs, bboxes)
 
             if cfg.DATA.MULTI_LABEL:
                 if cfg.NUM_GPUS > 1:
@@ -425,6 +464,10 @@ def eval_epoch(
                     )
 
             val_meter.update_predictions(preds, labels)
+            if val_meter.binary_metrics is not None:
+                val_meter.update_binary_stats(
+                    positive_scores(preds, preds_are_probs), labels
+                )
 
         val_meter.log_iter_stats(cur_epoch, cur_iter)
         val_meter.iter_tic()
@@ -448,6 +491,13 @@ def eval_epoch(
             writer.plot_eval(
                 preds=all_preds, labels=all_labels, global_step=cur_epoch
             )
+            writer.add_scalars(
+                {
+                    "Val/" + name: value
+                    for name, value in val_meter.binary_stats.items()
+                },
+                global_step=cur_epoch,
+            )
     val_meter.reset()
     return last_val_acc
 
@@ -550,6 +600,14 @@ def build_trainer(cfg):
     if du.is_master_proc() and cfg.LOG_MODEL_INFO:
         misc.log_model_info(model, cfg, use_train_input=True)
 
+    # Freeze before building the optimizer, so that it only gets the
+    # trainable parameters.
+    if cfg.TRAIN.FROZEN_MODULES:
+        freeze_modules(
+            model.module if cfg.NUM_GPUS > 1 else model,
+            cfg.TRAIN.FROZEN_MODULES,
+        )
+
     # Construct the optimizer.
     optimizer = optim.construct_optimizer(model, cfg)
 
@@ -599,7 +657,7 @@ def train(cfg):
             cfg, _ = multigrid.update_long_cycle(cfg, cur_epoch=0)
     # Print config.
     logger.info("Train with config:")
-    logger.info(pprint.pformat(cfg))
+    logger.info(cfg)
 
     # Build the video model and print model statistics.
     model = build_model(cfg)
@@ -608,6 +666,13 @@ def train(cfg):
     #     misc.log_model_info(model, cfg, use_train_input=True)
 
     print(model)
+    # Freeze before building the optimizer, so that it only gets the
+    # trainable parameters.
+    if cfg.TRAIN.FROZEN_MODULES:
+        freeze_modules(
+            model.module if cfg.NUM_GPUS > 1 else model,
+            cfg.TRAIN.FROZEN_MODULES,
+        )
     # Construct the optimizer.
     optimizer = optim.construct_optimizer(model, cfg)
     # Create a GradScaler for mixed precision training
@@ -663,6 +728,10 @@ def train(cfg):
     else:
         start_epoch = 0
 
+    # Pick the train loader workers before creating the loaders.
+    if cfg.LOADER_MONITOR.AUTOTUNE:
+        loader_monitor.autotune(cfg)
+
     # Create the video train and val loaders.
     train_loader = loader.construct_loader(cfg, "train")
     val_loader = loader.construct_loader(cfg, "val")
@@ -682,6 +751,12 @@ def train(cfg):
         else:
             model.init_knn_labels(train_loader)
 
+    teacher = (
+        Teacher(cfg, len(train_loader.dataset))
+        if cfg.DISTILL.ENABLE
+        else None
+    )
+
     # Create meters.
     if cfg.DETECTION.ENABLE:
         train_meter = AVAMeter(len(train_loader), cfg, mode="train")
@@ -700,66 +775,18 @@ def train(cfg):
         
     
     
-    # freeze all the parameters
-    if (cfg.NUM_GPUS > 1):
-        for param in model.module.s1.parameters():
-            param.requires_grad = False
-        for param in model.module.s2.parameters():
-            param.requires_grad = False
-        for param in model.module.s3.parameters():
-            param.requires_grad = False
-        for param in model.module.s4.parameters():
-            param.requires_grad = False
-        for param in model.module.s5.parameters():
-            param.requires_grad = False
-
-        print("All parameters frozen")
-        print(model.children())
-        '''
-        for param in model.module.vit_proj.parameters():
-            param.requires_grad = True
-        for param in model.module.vit.parameters():
-            param.requires_grad = True
-            '''
-    else:
-        '''
-        for param in model.s1.parameters():
-            param.requires_grad = False
-        for param in model.s2.parameters():
-            param.requires_grad = False
-        for param in model.s3.parameters():
-            param.requires_grad = False
-        for param in model.s4.parameters():
-            param.requires_grad = False
-        for param in model.s5.parameters():
-            param.requires_grad = False
-        print(model)
-        '''
-        print("Num Params", sum(p.numel() for p in model.parameters() if p.requires_grad))
-        #print("Num Params att", sum(p.numel() for p in model.temporal_attention.parameters() if p.requires_grad))
-        #print("Num Params resnet", sum(p.numel() for p in model.resnet.parameters() if p.requires_grad))
-        
-        for param in model.resnet.parameters():
-            print("Backbone frozen")
-            param.requires_grad_(False) 
-        print(model.resnet)
-        
-        print("Num Params", sum(p.numel() for p in model.parameters() if p.requires_grad))
-        #print("Num Params in Resnet after freeze", sum(p.numel() for p in model.resnet.parameters() if p.requires_grad))
-        print("All parameters frozen")
-        print(model)
-        '''
-        
-        for param in model.vit_proj.parameters():
-            param.requires_grad = True
-        for param in model.vit.parameters():
-            param.requires_grad = True
-            '''
-    
     logger.info("Start epoch: {}".format(start_epoch + 1))
 
     epoch_timer = EpochTimer()
-    
+    # Record of the run for the results store.
+    record = None
+    if (
+        cfg.RESULTS_STORE.ENABLE
+        and results_store.is_available()
+        and du.is_master_proc(cfg.NUM_GPUS * cfg.NUM_SHARDS)
+    ):
+        record = results_store.RunRecord(cfg, "train")
+
     avg_val = []
     for cur_epoch in range(start_epoch, cfg.SOLVER.MAX_EPOCH):
 
@@ -817,8 +844,13 @@ def train(cfg):
             cur_epoch,
             cfg,
             writer,
+            teacher,
         )
         epoch_timer.epoch_toc()
+        if teacher is not None:
+            teacher.save()
+        if record is not None:
+            record.add_stats(train_meter.epoch_stats)
         logger.info(
             f"Epoch {cur_epoch} takes {epoch_timer.last_epoch_time():.2f}s. Epochs "
             f"from {start_epoch} to {cur_epoch} take "
@@ -883,6 +915,8 @@ def train(cfg):
             )
         if eval_out is not None:
             avg_val.append(eval_out)
+        if is_eval_epoch and record is not None:
+            record.add_stats(val_meter.epoch_stats)
             
     if writer is not None:
         writer.close()
@@ -892,5 +926,16 @@ def train(cfg):
         misc.gpu_mem_usage(),
     )
     logger.info("training done: {}".format(result_string))
+    if record is not None:
+        record.add_stats(
+            {
+                "split": "train_final",
+                "top1_acc": 100 - val_meter.min_top1_err,
+                "top5_acc": 100 - val_meter.min_top5_err,
+            }
+        )
+        results_store.ResultsStore(
+            cfg.RESULTS_STORE.PATH, cfg.RESULTS_STORE.MAX_PARTS
+        ).append(record)
     print(np.mean(avg_val))
     return result_string
\ No newline at end of file